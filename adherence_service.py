@@ -0,0 +1,188 @@
+import heapq
+import pandas as pd
+from datetime import datetime, timedelta
+from database import get_db_connection, REMINDER_DOSES_PER_DAY_SQL
+from write_queue import run_write
+
+DOSE_STATUSES = ["Taken", "Late", "Skipped"]
+
+# A dose logged more than this long after its slot counts as late
+LATE_AFTER_MINUTES = 60
+
+# Window for adherence percentages, and how far back the first daily job fills in scheduled doses
+ADHERENCE_DAYS = 90
+SCHEDULE_FILL_DAYS = 7
+
+# background_jobs name for fill_adherence_schedule; its last run date is where the next fill resumes
+SCHEDULE_FILL_JOB = "adherence_schedule"
+
+# How far ahead the family dose timeline looks
+TIMELINE_HOURS = 24
+
+def dose_status_for(scheduled_date, scheduled_time, now=None):
+    """Return 'Taken' or 'Late' for a dose taken now against its scheduled slot"""
+    now = now or datetime.now()
+    scheduled = datetime.strptime(f"{scheduled_date} {scheduled_time}", "%Y-%m-%d %H:%M")
+    return "Late" if now > scheduled + timedelta(minutes=LATE_AFTER_MINUTES) else "Taken"
+
+def log_dose(reminder_id, scheduled_date, scheduled_time, status=None):
+    """Record a dose for one scheduled slot; logging the same slot again replaces its status.
+    
+    Without a status the dose is recorded as taken, or late if the slot has passed.
+    The adherence_rollups triggers update the day's counts in the same statement.
+    """
+    status = status or dose_status_for(scheduled_date, scheduled_time)
+    
+    run_write(lambda cursor: cursor.execute('''
+        INSERT INTO dose_events (reminder_id, scheduled_date, scheduled_time, status)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (reminder_id, scheduled_date, scheduled_time) DO UPDATE SET
+            status = excluded.status,
+            logged_at = CURRENT_TIMESTAMP
+    ''', (reminder_id, scheduled_date, scheduled_time, status)))
+    
+    return status
+
+def clear_dose(reminder_id, scheduled_date, scheduled_time):
+    """Remove the logged dose for one slot (the rollup counts are reversed by trigger)"""
+    run_write(lambda cursor: cursor.execute('''
+        DELETE FROM dose_events
+        WHERE reminder_id = ? AND scheduled_date = ? AND scheduled_time = ?
+    ''', (reminder_id, scheduled_date, scheduled_time)))
+
+def get_todays_doses(patient_id):
+    """Return today's scheduled dose slots for a patient's family with any logged status, by time"""
+    today = datetime.now().date().isoformat()
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT mr.id, mr.medicine_name, mr.dosage, mr.reminder_times,
+               COALESCE(fm.name, 'Self') AS person
+        FROM medicine_reminders mr
+        LEFT JOIN family_members fm ON mr.family_member_id = fm.id
+        WHERE mr.patient_id = ? AND mr.is_active = 1
+          AND mr.start_date <= ? AND (mr.end_date IS NULL OR mr.end_date >= ?)
+    ''', (patient_id, today, today))
+    reminders = cursor.fetchall()
+    
+    cursor.execute('''
+        SELECT de.reminder_id, de.scheduled_time, de.status
+        FROM dose_events de
+        JOIN medicine_reminders mr ON mr.id = de.reminder_id
+        WHERE mr.patient_id = ? AND de.scheduled_date = ?
+    ''', (patient_id, today))
+    logged = {(row['reminder_id'], row['scheduled_time']): row['status'] for row in cursor.fetchall()}
+    
+    conn.close()
+    
+    doses = []
+    for reminder in reminders:
+        for scheduled_time in reminder['reminder_times'].split(','):
+            doses.append({
+                'reminder_id': reminder['id'],
+                'person': reminder['person'],
+                'medicine_name': reminder['medicine_name'],
+                'dosage': reminder['dosage'],
+                'scheduled_date': today,
+                'scheduled_time': scheduled_time,
+                'status': logged.get((reminder['id'], scheduled_time))
+            })
+    
+    return sorted(doses, key=lambda dose: (dose['scheduled_time'], dose['person']))
+
+def _reminder_doses(reminder, start, end):
+    """Yield a reminder's dose instants in [start, end) in time order, as (instant, person, medicine, dosage)"""
+    times = sorted({time.strip() for time in reminder['reminder_times'].split(',') if time.strip()})
+    first_day = max(start.date(), datetime.strptime(reminder['start_date'], '%Y-%m-%d').date())
+    last_day = end.date()
+    if reminder['end_date']:
+        last_day = min(last_day, datetime.strptime(reminder['end_date'], '%Y-%m-%d').date())
+    
+    day = first_day
+    while day <= last_day:
+        for time in times:
+            instant = datetime.combine(day, datetime.strptime(time, '%H:%M').time())
+            if start <= instant < end:
+                yield instant, reminder['person'], reminder['medicine_name'], reminder['dosage']
+        day += timedelta(days=1)
+
+def get_dose_timeline(patient_id, hours=TIMELINE_HOURS, now=None):
+    """Return every dose due for a patient's family in the next N hours, merged in time order.
+    
+    The active reminders are read in one query; each reminder expands to an
+    already sorted run of instants and the runs are combined with a k-way heap merge.
+    """
+    start = now or datetime.now()
+    end = start + timedelta(hours=hours)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT mr.medicine_name, mr.dosage, mr.reminder_times, mr.start_date, mr.end_date,
+               COALESCE(fm.name, 'Self') AS person
+        FROM medicine_reminders mr
+        LEFT JOIN family_members fm ON mr.family_member_id = fm.id
+        WHERE mr.patient_id = ? AND mr.is_active = 1
+          AND mr.start_date <= ? AND (mr.end_date IS NULL OR mr.end_date >= ?)
+    ''', (patient_id, end.date().isoformat(), start.date().isoformat()))
+    reminders = cursor.fetchall()
+    conn.close()
+    
+    return list(heapq.merge(*(_reminder_doses(reminder, start, end) for reminder in reminders)))
+
+def fill_adherence_schedule(conn):
+    """Add rollup rows (with the day's scheduled doses) for active reminders since the last fill.
+    
+    Days with no logged doses still need a row so missed doses count against
+    adherence. Filling resumes from the job's last run date, so days the
+    scheduler was down are still covered (back to ADHERENCE_DAYS). The first
+    fill goes back SCHEDULE_FILL_DAYS, and never before the day tracking
+    started, so reminders that predate dose logging are not marked as missed.
+    """
+    cursor = conn.cursor()
+    changes_before = conn.total_changes
+    cursor.execute(f'''
+        WITH RECURSIVE days(day) AS (
+            SELECT MAX(DATE('now', 'localtime', ?), COALESCE(
+                -- The last run's day is filled again for reminders added after that run
+                (SELECT last_run_date FROM job_runs WHERE job_name = ?),
+                MAX(DATE('now', 'localtime', ?),
+                    COALESCE((SELECT MIN(day) FROM adherence_rollups), DATE('now', 'localtime')))
+            ))
+            UNION ALL
+            SELECT DATE(day, '+1 day') FROM days WHERE day < DATE('now', 'localtime')
+        )
+        INSERT INTO adherence_rollups (reminder_id, day, patient_id, family_member_id, scheduled_doses)
+        SELECT r.id, days.day, r.patient_id, r.family_member_id, {REMINDER_DOSES_PER_DAY_SQL}
+        FROM days
+        JOIN medicine_reminders r
+          ON r.start_date <= days.day AND (r.end_date IS NULL OR r.end_date >= days.day)
+        WHERE r.is_active = 1 AND days.day >= DATE(r.created_at, 'localtime')
+        ON CONFLICT (reminder_id, day) DO NOTHING
+    ''', (f"-{ADHERENCE_DAYS} days", SCHEDULE_FILL_JOB, f"-{SCHEDULE_FILL_DAYS} days"))
+    
+    # rowcount is not reported for statements that start with WITH
+    return conn.total_changes - changes_before
+
+def get_family_adherence(patient_id, days=ADHERENCE_DAYS):
+    """Return adherence per family member over the last N completed days, from the daily rollups"""
+    conn = get_db_connection()
+    adherence = pd.read_sql_query('''
+        SELECT COALESCE(fm.name, 'Self') AS person,
+               SUM(ar.scheduled_doses) AS scheduled,
+               SUM(ar.taken) AS taken,
+               SUM(ar.late) AS late,
+               SUM(ar.skipped) AS skipped,
+               ROUND(100.0 * (SUM(ar.taken) + SUM(ar.late)) / NULLIF(SUM(ar.scheduled_doses), 0), 1) AS adherence_pct,
+               ROUND(100.0 * SUM(ar.taken) / NULLIF(SUM(ar.scheduled_doses), 0), 1) AS on_time_pct
+        FROM adherence_rollups ar
+        LEFT JOIN family_members fm ON fm.id = ar.family_member_id
+        WHERE ar.patient_id = ? AND ar.day >= DATE('now', 'localtime', ?) AND ar.day < DATE('now', 'localtime')
+        GROUP BY ar.family_member_id
+        ORDER BY ar.family_member_id IS NOT NULL, person
+    ''', conn, params=(patient_id, f"-{int(days)} days"))
+    conn.close()
+    
+    return adherence
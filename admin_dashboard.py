@@ -0,0 +1,126 @@
+import streamlit as st
+import pandas as pd
+import query_metrics
+import render_profiler
+import data_cache
+from render_profiler import profile_section
+
+@profile_section
+def admin_panel():
+    """Operational tools for the users listed in PILLSCARE_ADMIN_USERS"""
+    with st.expander("🛠️ Admin: Query Metrics"):
+        query_metrics_panel()
+    with st.expander("⏱️ Admin: Render Profiling"):
+        render_profiling_panel()
+    with st.expander("🗄️ Admin: Data Cache"):
+        data_cache_panel()
+
+def query_metrics_panel():
+    """Per-query latency and row histograms recorded by the traced connection"""
+    enabled = st.toggle("Trace database queries", value=query_metrics.enabled,
+                        help="Applies to every session in this process; new connections pick it up immediately.")
+    if enabled != query_metrics.enabled:
+        query_metrics.set_enabled(enabled)
+        st.rerun()
+    
+    metrics = pd.DataFrame(query_metrics.get_statement_metrics())
+    if metrics.empty:
+        st.info("No queries recorded yet. Turn tracing on and use the app to collect metrics.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Statements", f"{int(metrics['calls'].sum()):,}")
+    with col2:
+        st.metric("Total Query Time", f"{metrics['total_ms'].sum():,.1f} ms")
+    with col3:
+        st.metric("Rows Returned", f"{int(metrics['rows'].sum()):,}")
+    
+    st.write("**Time by calling function**")
+    by_caller = metrics.groupby('caller')['total_ms'].sum().sort_values(ascending=False)
+    st.bar_chart(by_caller)
+    
+    st.write("**Statements (slowest total first)**")
+    st.dataframe(metrics, width="stretch", hide_index=True)
+    
+    sqlite_counts = query_metrics.get_sqlite_statement_counts()
+    if sqlite_counts:
+        st.caption("Statements run by SQLite (including transactions and trigger steps): " +
+                   ", ".join(f"{kind} {count:,}" for kind, count in sorted(sqlite_counts.items())))
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Download Prometheus metrics", query_metrics.prometheus_text(),
+                           file_name="query_metrics.prom", mime="text/plain")
+    with col2:
+        if st.button("Write metrics file"):
+            st.success(f"Written to {query_metrics.write_prometheus_file()}")
+    with col3:
+        if st.button("Reset metrics"):
+            query_metrics.reset_metrics()
+            st.rerun()
+
+def render_profiling_panel():
+    """Section timings of the slowest profiled reruns for each role"""
+    col1, col2 = st.columns(2)
+    with col1:
+        enabled = st.toggle("Profile reruns", value=render_profiler.enabled,
+                            help="Times each dashboard section of every rerun, in every session.")
+    with col2:
+        capture = st.toggle("Save cProfile of each rerun", value=render_profiler.capture_cprofile,
+                            help=f"Writes .prof files to {render_profiler.PROFILE_DIR}/ (open with snakeviz or pstats).")
+    if enabled != render_profiler.enabled or capture != render_profiler.capture_cprofile:
+        render_profiler.set_enabled(enabled)
+        render_profiler.set_capture_cprofile(capture)
+        st.rerun()
+    
+    roles = render_profiler.get_profiled_roles()
+    if not roles:
+        st.info("No reruns profiled yet. Turn profiling on and use the app to collect timings.")
+        return
+    
+    role = st.selectbox("Role", roles)
+    reruns = render_profiler.get_slowest_reruns(role)
+    
+    st.write(f"**Slowest {len(reruns)} reruns for {role}**")
+    for rerun in reruns:
+        label = f"{rerun.root.total * 1000:.0f} ms — {rerun.started_at.strftime('%Y-%m-%d %H:%M:%S')}"
+        with st.expander(label):
+            st.code("\n".join(render_profiler.flame_lines(rerun)), language=None)
+            if rerun.cprofile_path:
+                st.caption(f"cProfile: {rerun.cprofile_path}")
+    
+    if st.button("Reset profiles"):
+        render_profiler.reset_profiles()
+        st.rerun()
+
+def data_cache_panel():
+    """Hit/miss counters for the write-version-keyed dashboard cache"""
+    backend = st.selectbox("Cache backend", data_cache.BACKENDS, index=data_cache.BACKENDS.index(data_cache.backend),
+                           help="process: one store shared by every session; streamlit: st.cache_data; off: always query.")
+    if backend != data_cache.backend:
+        data_cache.set_backend(backend)
+        st.rerun()
+    
+    stats, entries = data_cache.get_cache_stats()
+    if not stats:
+        st.info("No cached reads yet. Use the dashboards to fill the cache.")
+        return
+    
+    stats = pd.DataFrame(stats)
+    hits, misses = int(stats['hits'].sum()), int(stats['misses'].sum())
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Hit Rate", f"{100 * hits / max(hits + misses, 1):.1f}%")
+    with col2:
+        st.metric("Hits / Misses", f"{hits:,} / {misses:,}")
+    with col3:
+        st.metric("Stored Results", f"{entries:,} / {data_cache.CACHE_MAX_ENTRIES:,}")
+    
+    st.dataframe(stats, width="stretch", hide_index=True)
+    st.caption("stale: reloaded because a write bumped the owner's version; evictions: dropped as least recently used.")
+    
+    if st.button("Clear data cache"):
+        data_cache.clear_data_cache()
+        st.rerun()
@@ -1,15 +1,25 @@
+import importlib
 import streamlit as st
-import sqlite3
-from datetime import datetime
-import hashlib
-import os
 
 # Import custom modules
 from database import init_database
+from background_jobs import start_background_jobs
 from auth import login_page, register_page
-from patient_dashboard import patient_dashboard
-from doctor_dashboard import doctor_dashboard
-from pharmacy_dashboard import pharmacy_dashboard
+from query_metrics import is_admin
+from render_profiler import profile_rerun, section
+
+# Role dashboards (and pandas behind them) are imported the first time a user of that role
+# logs in, so the login page does not load every dashboard (user type -> module, entry point)
+ROLE_DASHBOARDS = {
+    "Patient": ("patient_dashboard", "patient_dashboard"),
+    "Doctor": ("doctor_dashboard", "doctor_dashboard"),
+    "Pharmacy": ("pharmacy_dashboard", "pharmacy_dashboard"),
+}
+
+def load_dashboard(user_type):
+    """Return a role's dashboard function, importing its module on first use"""
+    module_name, function_name = ROLE_DASHBOARDS[user_type]
+    return getattr(importlib.import_module(module_name), function_name)
 
 # Initialize the application
 def main():
@@ -23,8 +33,19 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Time the whole rerun when render profiling is on (a no-op otherwise)
+    with profile_rerun(st.session_state.get('user_type')):
+        render_app()
+
+def render_app():
+    """Render one rerun of the app for the current session"""
+    
     # Initialize database
-    init_database()
+    with section("init_database"):
+        init_database()
+    
+    # Start daily background jobs (expiry sweep) once per process
+    start_background_jobs()
     
     # Initialize session state
     if 'logged_in' not in st.session_state:
@@ -63,12 +84,14 @@ def main():
                 st.rerun()
         
         # Route to appropriate dashboard based on user type
-        if st.session_state.user_type == "Patient":
-            patient_dashboard()
-        elif st.session_state.user_type == "Doctor":
-            doctor_dashboard()
-        elif st.session_state.user_type == "Pharmacy":
-            pharmacy_dashboard()
+        if st.session_state.user_type in ROLE_DASHBOARDS:
+            with section("load_dashboard"):
+                dashboard = load_dashboard(st.session_state.user_type)
+            dashboard()
+        
+        if is_admin(st.session_state.username):
+            from admin_dashboard import admin_panel
+            admin_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,8 @@
 import streamlit as st
 from database import create_user, authenticate_user
+from render_profiler import profile_section
 
+@profile_section
 def login_page():
     """Display login form"""
     st.subheader("Login to PillsCare")
@@ -28,6 +30,7 @@ def login_page():
             else:
                 st.error("Please enter both username and password")
 
+@profile_section
 def register_page():
     """Display registration form"""
     st.subheader("Register for PillsCare")
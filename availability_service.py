@@ -0,0 +1,69 @@
+import threading
+import time
+import pandas as pd
+from database import get_db_connection
+from medicine_catalogue import normalize_medicine_name
+
+# Search results are reused for this long before the index is queried again (seconds)
+AVAILABILITY_CACHE_TTL_SECONDS = 30
+AVAILABILITY_CACHE_SIZE = 256
+MAX_AVAILABILITY_RESULTS = 50
+
+_availability_cache = {}
+_availability_cache_lock = threading.Lock()
+
+def _prefix_range(prefix):
+    """Return the [low, high) key range covering every key that starts with prefix"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _query_availability(search_term, limit):
+    """Query the availability index for medicines whose normalized name starts with search_term"""
+    low, high = _prefix_range(search_term)
+    
+    conn = get_db_connection()
+    results = pd.read_sql_query('''
+        SELECT ma.medicine_name, ma.pharmacy_id, p.pharmacy_name, p.address,
+               ma.available_quantity, ma.min_price, ma.next_expiry
+        FROM medicine_availability ma
+        JOIN pharmacies p ON p.id = ma.pharmacy_id
+        WHERE ma.medicine_key >= ? AND ma.medicine_key < ?
+        ORDER BY ma.medicine_key, ma.min_price, ma.available_quantity DESC
+        LIMIT ?
+    ''', conn, params=(low, high, limit))
+    conn.close()
+    
+    return results
+
+def search_medicine_availability(search_term, limit=MAX_AVAILABILITY_RESULTS):
+    """Find pharmacies with in-stock, unexpired batches of catalogue medicines matching a name prefix.
+    
+    Results come from the medicine_availability index and are cached for
+    AVAILABILITY_CACHE_TTL_SECONDS, so repeated searches skip the database.
+    """
+    search_term = normalize_medicine_name(search_term)
+    if not search_term:
+        return pd.DataFrame()
+    
+    key = (search_term, limit)
+    now = time.monotonic()
+    
+    with _availability_cache_lock:
+        cached = _availability_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1].copy()
+    
+    results = _query_availability(search_term, limit)
+    
+    with _availability_cache_lock:
+        if len(_availability_cache) >= AVAILABILITY_CACHE_SIZE:
+            expired = [k for k, (expires_at, _) in _availability_cache.items() if expires_at <= now]
+            for k in expired or list(_availability_cache)[:AVAILABILITY_CACHE_SIZE // 4]:
+                del _availability_cache[k]
+        _availability_cache[key] = (now + AVAILABILITY_CACHE_TTL_SECONDS, results)
+    
+    return results.copy()
+
+def clear_availability_cache():
+    """Drop all cached availability searches"""
+    with _availability_cache_lock:
+        _availability_cache.clear()
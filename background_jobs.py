@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import datetime
+from database import get_db_connection, rebuild_medicine_availability
+from medicine_catalogue import backfill_medicine_ids
+import query_metrics
+
+# How often the scheduler wakes up to check for due jobs (seconds)
+CHECK_INTERVAL_SECONDS = 15 * 60
+
+# These job modules import pandas, so they are imported on the scheduler thread when the jobs
+# first run rather than when app.py starts the scheduler
+def _expiry_sweep(conn):
+    from stock_service import run_expiry_sweep
+    run_expiry_sweep(conn=conn)
+
+def _stock_snapshot(conn):
+    from stock_ledger import take_stock_snapshot_if_due
+    take_stock_snapshot_if_due(conn)
+
+def _adherence_schedule(conn):
+    from adherence_service import fill_adherence_schedule
+    fill_adherence_schedule(conn)
+
+# Jobs that run once per day (job name -> function taking a connection)
+DAILY_JOBS = {
+    "expiry_sweep": _expiry_sweep,
+    "stock_snapshot": _stock_snapshot,
+    # Batches that expired overnight drop out of the availability index
+    "availability_refresh": lambda conn: rebuild_medicine_availability(conn.cursor()),
+    # Rows written without going through the catalogue (e.g. direct SQL) get linked here
+    "medicine_catalogue_backfill": lambda conn: backfill_medicine_ids(conn.cursor()),
+    # Must match adherence_service.SCHEDULE_FILL_JOB, which resumes from this job's last run date
+    "adherence_schedule": _adherence_schedule,
+}
+
+_scheduler_lock = threading.Lock()
+_scheduler_thread = None
+
+def run_daily_job_if_due(job_name, job):
+    """Run a daily job unless it has already run today; returns True if it ran"""
+    today = datetime.now().date().isoformat()
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Take the write lock first so only one process runs the job per day
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT last_run_date FROM job_runs WHERE job_name = ?', (job_name,))
+        last_run = cursor.fetchone()
+        
+        if last_run and last_run['last_run_date'] == today:
+            conn.rollback()
+            return False
+        
+        job(conn)
+        
+        cursor.execute('''
+            INSERT INTO job_runs (job_name, last_run_date, completed_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(job_name) DO UPDATE SET
+                last_run_date = excluded.last_run_date,
+                completed_at = excluded.completed_at
+        ''', (job_name, today))
+        
+        conn.commit()
+        return True
+    
+    except Exception as e:
+        conn.rollback()
+        print(f"Error running background job {job_name}: {str(e)}")
+        return False
+    
+    finally:
+        conn.close()
+
+def run_due_jobs():
+    """Run every daily job that has not yet run today"""
+    for job_name, job in DAILY_JOBS.items():
+        run_daily_job_if_due(job_name, job)
+
+def _scheduler_loop():
+    """Check for due jobs forever"""
+    while True:
+        run_due_jobs()
+        if query_metrics.enabled:
+            try:
+                query_metrics.write_prometheus_file()
+            except OSError as e:
+                print(f"Error writing query metrics: {str(e)}")
+        time.sleep(CHECK_INTERVAL_SECONDS)
+
+def start_background_jobs():
+    """Start the background job scheduler once per process"""
+    global _scheduler_thread
+    
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_thread = threading.Thread(target=_scheduler_loop, name="pillscare-jobs", daemon=True)
+            _scheduler_thread.start()
@@ -0,0 +1,215 @@
+"""Benchmark every data-access path used by the chat system and the dashboards.
+
+Seeds a database per scale with benchmarks/seed_data.py, picks realistic
+subjects (the busiest pharmacy, a patient with family and reminders, the
+doctor with the most conversations) and times each data-access function.
+Reports the median and 95th percentile per function and scale.
+
+Results can be saved as JSON and compared against an earlier run; any
+function slower than the baseline by more than the threshold is reported as
+a regression and the script exits with status 1.
+
+    python benchmarks/bench_data_paths.py --scales small medium --save before.json
+    python benchmarks/bench_data_paths.py --scales small medium --compare before.json
+
+Seeded databases are kept in --data-dir (when given) and reused by later runs.
+The write-version data cache is switched off so every call reaches SQLite;
+pass --cache to time the cached loaders as the dashboards see them.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import data_cache
+from database import get_db_connection, authenticate_user, get_patient_id
+from seed_data import SCALES, seed_database, PASSWORD, MEDICINES
+
+def pick_subjects():
+    """Choose the ids each benchmark runs against, favouring the busiest rows"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT pharmacy_id FROM orders GROUP BY pharmacy_id ORDER BY COUNT(*) DESC LIMIT 1')
+    pharmacy_id = cursor.fetchone()['pharmacy_id']
+    
+    cursor.execute('''
+        SELECT p.id, p.user_id, p.latitude, p.longitude, u.username
+        FROM patients p
+        JOIN users u ON u.id = p.user_id
+        JOIN medicine_reminders mr ON mr.patient_id = p.id AND mr.is_active = 1
+        GROUP BY p.id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    ''')
+    patient = cursor.fetchone()
+    
+    cursor.execute('''
+        SELECT receiver_id AS doctor_user_id, sender_id AS patient_user_id
+        FROM chat_messages
+        WHERE receiver_id IN (SELECT user_id FROM doctors)
+        GROUP BY receiver_id, sender_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    ''')
+    chat = cursor.fetchone()
+    
+    conn.close()
+    
+    return {
+        'pharmacy_id': pharmacy_id,
+        'patient_id': patient['id'],
+        'patient_user_id': patient['user_id'],
+        'patient_username': patient['username'],
+        'latitude': patient['latitude'],
+        'longitude': patient['longitude'],
+        'doctor_user_id': chat['doctor_user_id'],
+        'chat_patient_user_id': chat['patient_user_id'],
+    }
+
+def build_cases(subjects):
+    """Return {case name: zero-argument callable}"""
+    from chat_system import (get_chat_doctors, get_doctor_conversations, get_chat_messages,
+                             get_unread_message_count, mark_messages_as_read, send_message)
+    from adherence_service import get_todays_doses, get_dose_timeline, get_family_adherence
+    from drug_interactions import get_family_interactions
+    from availability_service import search_medicine_availability, clear_availability_cache
+    from location_service import find_nearest_pharmacies
+    from order_service import get_order_statistics, get_pharmacy_orders, get_patient_orders
+    from stock_service import search_medicine_stock, get_stock_summary, get_expiring_stock, get_expiry_alert_counts
+    from stock_ledger import get_stock_movements
+    from report_service import get_revenue_report, get_medicine_sales_report
+    from forecast_service import get_reorder_suggestions
+    
+    pharmacy_id = subjects['pharmacy_id']
+    patient_id = subjects['patient_id']
+    doctor = subjects['doctor_user_id']
+    chat_patient = subjects['chat_patient_user_id']
+
+    def uncached_availability():
+        clear_availability_cache()
+        return search_medicine_availability("para")
+
+    return {
+        # Authentication and session setup
+        'auth.authenticate_user': lambda: authenticate_user(subjects['patient_username'], PASSWORD),
+        'database.get_patient_id': lambda: get_patient_id(subjects['patient_user_id']),
+        # Chat
+        'chat.get_chat_doctors': get_chat_doctors,
+        'chat.get_doctor_conversations': lambda: get_doctor_conversations(doctor),
+        'chat.get_chat_messages': lambda: get_chat_messages(chat_patient, doctor),
+        'chat.get_unread_message_count': lambda: get_unread_message_count(doctor),
+        'chat.mark_messages_as_read': lambda: mark_messages_as_read(chat_patient, doctor),
+        'chat.send_message': lambda: send_message(chat_patient, doctor, "Benchmark message"),
+        # Patient dashboard
+        'patient.get_todays_doses': lambda: get_todays_doses(patient_id),
+        'patient.get_dose_timeline': lambda: get_dose_timeline(patient_id),
+        'patient.get_family_adherence': lambda: get_family_adherence(patient_id),
+        'patient.get_family_interactions': lambda: get_family_interactions(patient_id),
+        'patient.get_patient_orders': lambda: get_patient_orders(patient_id),
+        'patient.search_medicine_availability': uncached_availability,
+        'patient.find_nearest_pharmacies': lambda: find_nearest_pharmacies(
+            subjects['latitude'], subjects['longitude'], MEDICINES[0]),
+        # Pharmacy dashboard
+        'pharmacy.search_medicine_stock': lambda: search_medicine_stock(pharmacy_id),
+        'pharmacy.search_medicine_stock_term': lambda: search_medicine_stock(pharmacy_id, "amox"),
+        'pharmacy.get_stock_summary': lambda: get_stock_summary(pharmacy_id),
+        'pharmacy.get_expiring_stock': lambda: get_expiring_stock(pharmacy_id),
+        'pharmacy.get_expiry_alert_counts': lambda: get_expiry_alert_counts(pharmacy_id),
+        'pharmacy.get_stock_movements': lambda: get_stock_movements(pharmacy_id),
+        'pharmacy.get_order_statistics': lambda: get_order_statistics(pharmacy_id),
+        'pharmacy.get_pharmacy_orders': lambda: get_pharmacy_orders(pharmacy_id),
+        'pharmacy.get_pharmacy_orders_pending': lambda: get_pharmacy_orders(pharmacy_id, status="Pending"),
+        'pharmacy.get_revenue_report': lambda: get_revenue_report(pharmacy_id),
+        'pharmacy.get_medicine_sales_report': lambda: get_medicine_sales_report(pharmacy_id),
+        'pharmacy.get_reorder_suggestions': lambda: get_reorder_suggestions(pharmacy_id),
+    }
+
+def time_case(func, repeat):
+    """Run func once to warm up, then repeat times; returns sorted latencies in seconds"""
+    func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+def summarize(latencies):
+    return {
+        'median_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+    }
+
+def run_scale(scale, data_dir, repeat, only, seed):
+    """Seed (or reuse) the scale's database and time every case; returns {case: summary}"""
+    database.DB_PATH = os.path.join(data_dir, f"bench_{scale}.db")
+    if not os.path.exists(database.DB_PATH):
+        start = time.perf_counter()
+        seed_database(seed=seed, **SCALES[scale])
+        print(f"[{scale}] seeded in {time.perf_counter() - start:.1f}s")
+    
+    results = {}
+    for name, func in build_cases(pick_subjects()).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = summarize(time_case(func, repeat))
+        print(f"[{scale}] {name:42} median {results[name]['median_ms']:9.3f}ms  p95 {results[name]['p95_ms']:9.3f}ms")
+    
+    return results
+
+def compare(results, baseline, threshold):
+    """Print cases slower than the baseline by more than threshold; returns the number of regressions"""
+    regressions = 0
+    for scale, cases in results.items():
+        for name, summary in cases.items():
+            before = baseline.get(scale, {}).get(name)
+            if not before:
+                continue
+            ratio = summary['median_ms'] / max(before['median_ms'], 1e-6)
+            if ratio > threshold:
+                regressions += 1
+                print(f"REGRESSION [{scale}] {name}: {before['median_ms']:.3f}ms -> {summary['median_ms']:.3f}ms "
+                      f"({ratio:.2f}x)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these strings")
+    parser.add_argument("--data-dir", help="keep seeded databases here and reuse them (default: a temporary directory)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare medians against a JSON file from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", action="store_true", help="keep the data cache on (process backend)")
+    args = parser.parse_args()
+    
+    data_cache.set_backend("process" if args.cache else "off")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        results = {scale: run_scale(scale, data_dir, args.repeat, args.only, args.seed) for scale in args.scales}
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"results written to {args.save}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        print(f"{regressions} regression(s) over {args.threshold:.2f}x" if regressions else "no regressions")
+        return 1 if regressions else 0
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Report what the login page and each role cost to import, using python -X importtime.
+
+Each scenario imports a set of modules in a fresh interpreter with -X importtime
+and reports the total import time, the peak resident memory, how many modules
+were loaded, whether pandas/numpy came in and the slowest top-level imports:
+
+    baseline  the bare interpreter
+    login     app.py, which is all the login page needs
+    eager     app.py plus everything it used to import up front (every role
+              dashboard, the admin panel and the background job modules)
+    patient / doctor / pharmacy
+              app.py plus one role's dashboard, loaded the way app.py loads it
+
+    python benchmarks/bench_import_time.py --repeat 5
+    python benchmarks/bench_import_time.py --scenarios login eager --top 10 --save imports.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'baseline': "",
+    'login': "import app",
+    'eager': ("import app, patient_dashboard, doctor_dashboard, pharmacy_dashboard, admin_dashboard, "
+              "stock_service, stock_ledger, adherence_service"),
+    'patient': "import app; app.load_dashboard('Patient')",
+    'doctor': "import app; app.load_dashboard('Doctor')",
+    'pharmacy': "import app; app.load_dashboard('Pharmacy')",
+}
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow")
+
+# Printed by the child after its imports; peak RSS is in KiB on Linux
+REPORT = '''
+import json, resource, sys
+print(json.dumps({
+    "rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "heavy": [name for name in %r if name in sys.modules],
+}))
+''' % (HEAVY_MODULES,)
+
+def parse_importtime(stderr):
+    """Return [(module, cumulative microseconds)] for the top-level imports in -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented under the module that imported them
+        if not name[1:].startswith(" "):
+            imports.append((name.strip(), int(cumulative)))
+    return imports
+
+def run_scenario(code):
+    """Import code's modules in a fresh interpreter; returns (top-level imports, child report)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code + "\n" + REPORT],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr), json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure(code, repeat):
+    """Median import time (ms) and peak RSS (MiB) over repeat runs, with the last run's details"""
+    totals, peaks = [], []
+    for _ in range(repeat):
+        imports, report = run_scenario(code)
+        totals.append(sum(cumulative for _, cumulative in imports) / 1000)
+        peaks.append(report['rss_kib'] / 1024)
+    slowest = sorted(imports, key=lambda item: item[1], reverse=True)
+    return {
+        'import_ms': round(statistics.median(totals), 1),
+        'peak_rss_mib': round(statistics.median(peaks), 1),
+        'modules': report['modules'],
+        'heavy': report['heavy'],
+        'slowest': [(name, round(cumulative / 1000, 1)) for name, cumulative in slowest],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per scenario (medians are reported)")
+    parser.add_argument("--top", type=int, default=5, help="slowest top-level imports to list per scenario")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    results = {}
+    print(f"{'scenario':10} {'import':>10} {'peak RSS':>10} {'modules':>8}  heavy")
+    for name in args.scenarios:
+        summary = results[name] = measure(SCENARIOS[name], args.repeat)
+        summary['slowest'] = summary['slowest'][:args.top]
+        print(f"{name:10} {summary['import_ms']:8.1f}ms {summary['peak_rss_mib']:7.1f}MiB {summary['modules']:8}  "
+              f"{', '.join(summary['heavy']) or '-'}")
+        for module, cumulative in summary['slowest']:
+            print(f"{'':12}{cumulative:8.1f}ms  {module}")
+    
+    if 'login' in results and 'eager' in results:
+        login, eager = results['login'], results['eager']
+        print(f"login vs eager: {eager['import_ms'] - login['import_ms']:.1f}ms and "
+              f"{eager['peak_rss_mib'] - login['peak_rss_mib']:.1f}MiB less before the login page renders")
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.save}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
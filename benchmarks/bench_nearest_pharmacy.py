@@ -0,0 +1,125 @@
+"""Benchmark the R*Tree nearest-pharmacy lookup against a linear haversine scan.
+
+Seeds a throwaway database with pharmacies scattered over a city, a share of
+which stock the benchmark medicine, then runs the same k-nearest queries
+through find_nearest_pharmacies and through a full scan that computes the
+haversine distance to every stocking pharmacy. Checks both return the same
+pharmacies and reports per-query latency.
+
+    python benchmarks/bench_nearest_pharmacy.py --pharmacies 50000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import get_db_connection, init_database
+from location_service import find_nearest_pharmacies, haversine_km
+from medicine_catalogue import normalize_medicine_name, resolve_medicine_id
+
+MEDICINE = "Paracetamol 500mg"
+
+# Centre and spread (degrees) of the simulated city
+CITY_LAT, CITY_LON = 19.07, 72.88
+CITY_SPREAD = 0.4
+
+def seed(pharmacies, stocking_share, rng):
+    """Create pharmacies with random coordinates; some stock the benchmark medicine"""
+    init_database()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.executemany('''
+        INSERT INTO pharmacies (user_id, pharmacy_name, license_number, address, latitude, longitude)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(i, f"Pharmacy {i}", f"L{i}", f"Street {i}",
+           CITY_LAT + rng.uniform(-CITY_SPREAD, CITY_SPREAD),
+           CITY_LON + rng.uniform(-CITY_SPREAD, CITY_SPREAD))
+          for i in range(1, pharmacies + 1)])
+    
+    expiry = (date.today() + timedelta(days=365)).isoformat()
+    medicine_id = resolve_medicine_id(cursor, MEDICINE)
+    cursor.executemany('''
+        INSERT INTO medicine_stock (pharmacy_id, medicine_name, batch_number, expiry_date, quantity, price, medicine_id)
+        VALUES (?, ?, 'B1', ?, ?, 2.5, ?)
+    ''', [(i, MEDICINE, expiry, rng.randint(1, 100), medicine_id)
+          for i in range(1, pharmacies + 1) if rng.random() < stocking_share])
+    
+    conn.commit()
+    conn.close()
+
+def linear_nearest(latitude, longitude, medicine_name, k):
+    """Baseline: compute the distance to every stocking pharmacy and sort"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT p.id, p.latitude, p.longitude
+        FROM pharmacies p
+        JOIN medicine_availability ma ON ma.pharmacy_id = p.id AND ma.medicine_key = ?
+        WHERE p.latitude IS NOT NULL AND p.longitude IS NOT NULL AND ma.available_quantity >= 1
+    ''', (normalize_medicine_name(medicine_name),))
+    rows = cursor.fetchall()
+    conn.close()
+    
+    distances = sorted((haversine_km(latitude, longitude, row['latitude'], row['longitude']), row['id'])
+                       for row in rows)
+    return [pharmacy_id for _, pharmacy_id in distances[:k]]
+
+def time_queries(points, lookup):
+    """Run lookup for every point and return (results, sorted latencies in seconds)"""
+    results = []
+    latencies = []
+    for latitude, longitude in points:
+        start = time.perf_counter()
+        results.append(lookup(latitude, longitude))
+        latencies.append(time.perf_counter() - start)
+    return results, sorted(latencies)
+
+def describe(latencies):
+    """Format mean, median and 95th percentile latency"""
+    return (f"mean={sum(latencies) / len(latencies) * 1000:.2f}ms "
+            f"p50={latencies[len(latencies) // 2] * 1000:.2f}ms "
+            f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pharmacies", type=int, default=50000)
+    parser.add_argument("--stocking-share", type=float, default=0.3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    points = [(CITY_LAT + rng.uniform(-CITY_SPREAD, CITY_SPREAD), CITY_LON + rng.uniform(-CITY_SPREAD, CITY_SPREAD))
+              for _ in range(args.queries)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        seed(args.pharmacies, args.stocking_share, rng)
+        
+        rtree_results, rtree_latencies = time_queries(
+            points, lambda lat, lon: find_nearest_pharmacies(lat, lon, MEDICINE, k=args.k)['pharmacy_id'].tolist()
+        )
+        linear_results, linear_latencies = time_queries(
+            points, lambda lat, lon: linear_nearest(lat, lon, MEDICINE, args.k)
+        )
+    
+    mismatches = sum(1 for rtree, linear in zip(rtree_results, linear_results) if rtree != linear or not rtree)
+    
+    print(f"pharmacies={args.pharmacies} stocking={args.stocking_share:.0%} queries={args.queries} k={args.k}")
+    print(f"rtree:  {describe(rtree_latencies)}")
+    print(f"linear: {describe(linear_latencies)}")
+    print(f"speedup (mean): {sum(linear_latencies) / sum(rtree_latencies):.1f}x")
+    print("result check: " + ("OK" if not mismatches else f"FAILED - {mismatches} queries differ"))
+    
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
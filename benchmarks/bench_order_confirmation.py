@@ -0,0 +1,121 @@
+"""Benchmark concurrent order confirmation with FEFO stock allocation.
+
+Seeds a throwaway database with one pharmacy, several stock batches and more
+pending orders than the stock can cover, then confirms all orders at once from
+several threads or processes. Reports throughput and latency, and checks that
+no batch was oversold.
+
+    python benchmarks/bench_order_confirmation.py --workers 8 --mode process
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import get_db_connection, init_database
+
+MEDICINE = "Paracetamol 500mg"
+
+def seed(batches, batch_quantity, orders, order_quantity):
+    """Create one pharmacy with stock batches and pending orders"""
+    init_database()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("INSERT INTO pharmacies (user_id, pharmacy_name, license_number, address) VALUES (1, 'Bench', 'B1', 'Here')")
+    pharmacy_id = cursor.lastrowid
+    
+    today = date.today()
+    cursor.executemany('''
+        INSERT INTO medicine_stock (pharmacy_id, medicine_name, batch_number, expiry_date, quantity, price)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(pharmacy_id, MEDICINE, f"B{i}", (today + timedelta(days=30 + i)).isoformat(), batch_quantity, 2.5)
+          for i in range(batches)])
+    
+    cursor.executemany('''
+        INSERT INTO orders (patient_id, pharmacy_id, medicine_name, quantity)
+        VALUES (1, ?, ?, ?)
+    ''', [(pharmacy_id, MEDICINE, order_quantity) for _ in range(orders)])
+    
+    conn.commit()
+    conn.close()
+
+def _init_worker(db_path):
+    database.DB_PATH = db_path
+
+def confirm(order_id):
+    """Confirm one order and return (success, message, latency_seconds)"""
+    from order_service import update_order_status
+    
+    start = time.perf_counter()
+    success, message = update_order_status(order_id, "Confirmed")
+    return success, message, time.perf_counter() - start
+
+def check_invariants(initial_units):
+    """Verify stock, allocations and confirmed orders agree and nothing is oversold"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT MIN(quantity) AS min_qty, SUM(quantity) AS remaining FROM medicine_stock')
+    stock = cursor.fetchone()
+    cursor.execute('SELECT COALESCE(SUM(quantity), 0) AS allocated FROM order_allocations WHERE released_at IS NULL')
+    allocated = cursor.fetchone()['allocated']
+    cursor.execute("SELECT COALESCE(SUM(quantity), 0) AS confirmed FROM orders WHERE status = 'Confirmed'")
+    confirmed = cursor.fetchone()['confirmed']
+    
+    conn.close()
+    
+    problems = []
+    if stock['min_qty'] < 0:
+        problems.append(f"negative batch quantity {stock['min_qty']}")
+    if allocated != confirmed:
+        problems.append(f"allocated {allocated} != confirmed {confirmed}")
+    if stock['remaining'] + allocated != initial_units:
+        problems.append(f"remaining {stock['remaining']} + allocated {allocated} != initial {initial_units}")
+    
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch-quantity", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--order-quantity", type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        seed(args.batches, args.batch_quantity, args.orders, args.order_quantity)
+        
+        executor_class = ThreadPoolExecutor if args.mode == "thread" else ProcessPoolExecutor
+        kwargs = {} if args.mode == "thread" else {"initializer": _init_worker, "initargs": (database.DB_PATH,)}
+        
+        start = time.perf_counter()
+        with executor_class(max_workers=args.workers, **kwargs) as executor:
+            results = list(executor.map(confirm, range(1, args.orders + 1)))
+        elapsed = time.perf_counter() - start
+        
+        latencies = sorted(result[2] for result in results)
+        confirmed = sum(1 for result in results if result[0])
+        errors = [result[1] for result in results if not result[0] and "Insufficient stock" not in result[1]]
+        problems = check_invariants(args.batches * args.batch_quantity)
+    
+    print(f"mode={args.mode} workers={args.workers} orders={args.orders}")
+    print(f"throughput: {len(results) / elapsed:.0f} confirmations/s ({elapsed:.2f}s total)")
+    print(f"latency: p50={latencies[len(latencies) // 2] * 1000:.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms max={latencies[-1] * 1000:.2f}ms")
+    print(f"confirmed: {confirmed}  rejected for stock: {len(results) - confirmed - len(errors)}  errors: {len(errors)}")
+    print("oversell check: " + ("OK" if not problems else "FAILED - " + "; ".join(problems)))
+    
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Benchmark small dashboard lookups read as DataFrames against namedtuple records.
+
+For each dashboard's small reads (profiles, the doctor's patient detail view,
+chat pickers and history, family dropdowns) runs the same queries two ways and
+consumes the rows the way the dashboard does:
+
+    pandas   pd.read_sql_query, then iterrows() / iloc per row (the old path)
+    records  records.fetch_records / fetch_record, then attribute access
+
+Both must produce the same output. Reports median latency and the peak memory
+allocated per call (tracemalloc) for each case, grouped by dashboard. The data
+cache is off so every call reaches SQLite.
+
+    python benchmarks/bench_row_access.py --scale small --repeat 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import data_cache
+from database import get_db_connection
+from records import fetch_record
+from seed_data import SCALES, seed_database
+from bench_data_paths import pick_subjects
+
+PATIENT_QUERY = '''
+    SELECT u.full_name, u.email, u.phone, p.id AS patient_id, p.date_of_birth, p.gender, p.address,
+           p.emergency_contact, p.emergency_email
+    FROM users u
+    JOIN patients p ON u.id = p.user_id
+    WHERE u.id = ?
+'''
+DOCTOR_QUERY = '''
+    SELECT u.full_name, u.email, u.phone, d.specialization, d.license_number, d.clinic_address, d.consultation_fee
+    FROM users u
+    JOIN doctors d ON u.id = d.user_id
+    WHERE u.id = ?
+'''
+PHARMACY_QUERY = '''
+    SELECT u.full_name, u.email, u.phone, ph.pharmacy_name, ph.license_number, ph.address, ph.latitude, ph.longitude
+    FROM users u
+    JOIN pharmacies ph ON u.id = ph.user_id
+    WHERE u.id = ?
+'''
+FAMILY_QUERY = 'SELECT * FROM family_members WHERE patient_id = ? ORDER BY created_at DESC, id DESC'
+ILLNESS_QUERY = '''
+    SELECT ih.*, fm.name as family_member_name
+    FROM illness_history ih
+    LEFT JOIN family_members fm ON ih.family_member_id = fm.id
+    WHERE ih.patient_id = ?
+    ORDER BY ih.illness_date DESC
+    LIMIT 5
+'''
+REMINDERS_QUERY = '''
+    SELECT mr.*, fm.name as family_member_name
+    FROM medicine_reminders mr
+    LEFT JOIN family_members fm ON mr.family_member_id = fm.id
+    WHERE mr.patient_id = ? AND mr.is_active = 1
+    ORDER BY mr.created_at DESC
+'''
+
+def read_frame(sql, params=()):
+    conn = get_db_connection()
+    frame = pd.read_sql_query(sql, conn, params=params)
+    conn.close()
+    return frame
+
+def read_record(sql, params=()):
+    conn = get_db_connection()
+    record = fetch_record(conn, sql, params)
+    conn.close()
+    return record
+
+def pharmacy_user_id(pharmacy_id):
+    conn = get_db_connection()
+    user_id = conn.execute('SELECT user_id FROM pharmacies WHERE id = ?', (pharmacy_id,)).fetchone()['user_id']
+    conn.close()
+    return user_id
+
+def build_cases(subjects):
+    """{dashboard: {case: (pandas version, records version)}}; each returns the text the dashboard shows"""
+    from chat_system import get_chat_doctors, get_doctor_conversations, get_chat_messages
+    from family_service import get_family_members, get_illness_history, get_active_reminders
+    
+    patient_user = subjects['chat_patient_user_id']
+    doctor_user = subjects['doctor_user_id']
+    pharmacy_user = pharmacy_user_id(subjects['pharmacy_id'])
+    family_patient = subjects['patient_id']
+
+    def patient_details_pandas():
+        patient = read_frame(PATIENT_QUERY, (patient_user,)).iloc[0]
+        lines = [patient['full_name'], patient['email'], patient['phone'] or "", patient['address'] or ""]
+        patient_id = int(patient['patient_id'])
+        for _, member in read_frame(FAMILY_QUERY, (patient_id,)).iterrows():
+            lines.append(f"{member['name']} ({member['relationship']})")
+        for _, record in read_frame(ILLNESS_QUERY, (patient_id,)).iterrows():
+            lines.append(f"{record['illness_name']} ({record['family_member_name'] or 'Patient'})")
+        for _, reminder in read_frame(REMINDERS_QUERY, (patient_id,)).iterrows():
+            lines.append(f"{reminder['medicine_name']} ({reminder['dosage']}) - {reminder['family_member_name'] or 'Patient'}")
+        return lines
+
+    def patient_details_records():
+        patient = read_record(PATIENT_QUERY, (patient_user,))
+        lines = [patient.full_name, patient.email, patient.phone or "", patient.address or ""]
+        for member in get_family_members.uncached(patient.patient_id):
+            lines.append(f"{member.name} ({member.relationship})")
+        for record in get_illness_history.uncached(patient.patient_id, limit=5):
+            lines.append(f"{record.illness_name} ({record.family_member_name or 'Patient'})")
+        for reminder in get_active_reminders.uncached(patient.patient_id):
+            lines.append(f"{reminder.medicine_name} ({reminder.dosage}) - {reminder.family_member_name or 'Patient'}")
+        return lines
+
+    def doctor_profile_pandas():
+        doctor = read_frame(DOCTOR_QUERY, (doctor_user,)).iloc[0]
+        return [doctor['full_name'], doctor['specialization'], doctor['license_number'], str(doctor['consultation_fee'])]
+
+    def doctor_profile_records():
+        doctor = read_record(DOCTOR_QUERY, (doctor_user,))
+        return [doctor.full_name, doctor.specialization, doctor.license_number, str(doctor.consultation_fee)]
+
+    def conversations_pandas():
+        conversations = read_frame('''
+            SELECT DISTINCT u.id, u.full_name,
+                   MAX(cm.timestamp) as last_message_time,
+                   COUNT(CASE WHEN cm.is_read = 0 AND cm.receiver_id = ? THEN 1 END) as unread_count
+            FROM chat_messages cm
+            JOIN users u ON cm.sender_id = u.id
+            WHERE cm.receiver_id = ? OR cm.sender_id = ?
+            GROUP BY u.id, u.full_name
+            ORDER BY last_message_time DESC
+        ''', (doctor_user, doctor_user, doctor_user))
+        return [f"{row['full_name']} ({row['unread_count']})" for _, row in conversations.iterrows()]
+
+    def conversations_records():
+        return [f"{row.full_name} ({row.unread_count})" for row in get_doctor_conversations(doctor_user)]
+
+    def messages_pandas():
+        messages = read_frame('''
+            SELECT cm.*, u.full_name as sender_name
+            FROM chat_messages cm
+            JOIN users u ON cm.sender_id = u.id
+            WHERE (cm.sender_id = ? AND cm.receiver_id = ?)
+               OR (cm.sender_id = ? AND cm.receiver_id = ?)
+            ORDER BY cm.timestamp ASC
+        ''', (patient_user, doctor_user, doctor_user, patient_user))
+        return [f"{message['sender_name']} {message['timestamp']}: {message['message']}"
+                for _, message in messages.iterrows()]
+
+    def messages_records():
+        return [f"{message.sender_name} {message.timestamp}: {message.message}"
+                for message in get_chat_messages(patient_user, doctor_user)]
+
+    def chat_doctors_pandas():
+        doctors = read_frame('''
+            SELECT u.id, u.full_name, d.specialization
+            FROM users u
+            JOIN doctors d ON u.id = d.user_id
+            WHERE u.user_type = 'Doctor'
+            ORDER BY u.full_name
+        ''')
+        return [f"{doc['full_name']} ({doc['specialization']})" for _, doc in doctors.iterrows()]
+
+    def chat_doctors_records():
+        return [f"{doc.full_name} ({doc.specialization})" for doc in get_chat_doctors()]
+
+    def family_dropdown_pandas():
+        family_members = read_frame(FAMILY_QUERY, (family_patient,))
+        return ["Self"] + family_members['name'].tolist() if not family_members.empty else ["Self"]
+
+    def family_dropdown_records():
+        return ["Self"] + [member.name for member in get_family_members.uncached(family_patient)]
+
+    def pharmacy_profile_pandas():
+        pharmacy = read_frame(PHARMACY_QUERY, (pharmacy_user,)).iloc[0]
+        return [pharmacy['pharmacy_name'], pharmacy['license_number'], pharmacy['address'],
+                None if pd.isna(pharmacy['latitude']) else float(pharmacy['latitude'])]
+
+    def pharmacy_profile_records():
+        pharmacy = read_record(PHARMACY_QUERY, (pharmacy_user,))
+        return [pharmacy.pharmacy_name, pharmacy.license_number, pharmacy.address,
+                None if pharmacy.latitude is None else float(pharmacy.latitude)]
+    
+    return {
+        'doctor': {
+            'patient_details': (patient_details_pandas, patient_details_records),
+            'profile': (doctor_profile_pandas, doctor_profile_records),
+            'conversations': (conversations_pandas, conversations_records),
+            'chat_messages': (messages_pandas, messages_records),
+        },
+        'patient': {
+            'chat_doctors': (chat_doctors_pandas, chat_doctors_records),
+            'family_dropdown': (family_dropdown_pandas, family_dropdown_records),
+        },
+        'pharmacy': {
+            'profile': (pharmacy_profile_pandas, pharmacy_profile_records),
+        },
+    }
+
+def measure(func, repeat):
+    """Median latency (ms) over repeat calls, then the peak memory (KiB) one call allocates"""
+    func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return latencies[len(latencies) // 2] * 1000, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--db", help="seeded database to use (default: seed a temporary one)")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    data_cache.set_backend("off")
+    mismatches = []
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = args.db or os.path.join(tmp, "bench.db")
+        if not args.db:
+            seed_database(seed=args.seed, **SCALES[args.scale])
+        
+        print(f"{'dashboard':10} {'case':16} {'pandas':>10} {'records':>10} {'speedup':>8} "
+              f"{'pandas peak':>12} {'records peak':>13}")
+        for dashboard, cases in build_cases(pick_subjects()).items():
+            for name, (pandas_version, records_version) in cases.items():
+                if pandas_version() != records_version():
+                    mismatches.append(f"{dashboard}.{name}")
+                pandas_ms, pandas_kib = measure(pandas_version, args.repeat)
+                records_ms, records_kib = measure(records_version, args.repeat)
+                print(f"{dashboard:10} {name:16} {pandas_ms:8.3f}ms {records_ms:8.3f}ms {pandas_ms / records_ms:7.1f}x "
+                      f"{pandas_kib:9.1f}KiB {records_kib:10.1f}KiB")
+    
+    print("result check: " + ("OK" if not mismatches else "FAILED - " + ", ".join(mismatches)))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
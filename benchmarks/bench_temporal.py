@@ -0,0 +1,179 @@
+"""Benchmark the dashboards' date columns: per-row Python against temporal.py and SQL.
+
+Builds a frame of synthetic rows with a birth date, an illness date, a stock
+expiry date and a reminder start/end date, then derives the same columns the
+dashboards show (age, days since, recency, days to expiry, expiry status and
+whether the reminder runs today) three ways:
+
+    rowwise     strptime and if/elif per row, as the dashboards did inside their render loops
+    vectorized  temporal.py over whole columns
+    sql         julianday() and CASE in a query over the rows stored in SQLite
+                (timed with the read, next to the plain read it replaces)
+
+Checks every method returns the same values and reports per-frame latency.
+
+    python benchmarks/bench_temporal.py --rows 10000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import temporal
+from stock_service import EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS
+
+COLUMNS = ['age', 'days_since', 'recency', 'days_to_expiry', 'expiry_status', 'running']
+
+def build_rows(rows, rng):
+    """Random dates around today; a few birth dates and reminder end dates are missing"""
+    today = date.today()
+    
+    def day(low, high):
+        return (today + timedelta(days=rng.randint(low, high))).isoformat()
+    
+    return pd.DataFrame({
+        'date_of_birth': [day(-90 * 365, -365) if rng.random() > 0.05 else None for _ in range(rows)],
+        'illness_date': [day(-400, 0) for _ in range(rows)],
+        'expiry_date': [day(-30, 400) for _ in range(rows)],
+        'start_date': [day(-120, 30) for _ in range(rows)],
+        'end_date': [day(-30, 120) if rng.random() > 0.3 else None for _ in range(rows)],
+    })
+
+def rowwise(frame):
+    """Baseline: parse and bucket one row at a time"""
+    today = datetime.now().date()
+    today_text = today.isoformat()
+    expiry_names = temporal.expiry_labels([-1, 0, EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS],
+                                          EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS).tolist()
+    result = {column: [] for column in COLUMNS}
+    
+    for _, row in frame.iterrows():
+        if row['date_of_birth']:
+            birth = datetime.strptime(row['date_of_birth'], '%Y-%m-%d').date()
+            result['age'].append(today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day)))
+        else:
+            result['age'].append(None)
+        
+        days_since = (today - datetime.strptime(row['illness_date'], '%Y-%m-%d').date()).days
+        result['days_since'].append(days_since)
+        if days_since < temporal.RECENT_DAYS:
+            result['recency'].append(temporal.RECENCY_LABELS[0])
+        elif days_since < temporal.MODERATE_DAYS:
+            result['recency'].append(temporal.RECENCY_LABELS[1])
+        else:
+            result['recency'].append(temporal.RECENCY_LABELS[2])
+        
+        days_to_expiry = (datetime.strptime(row['expiry_date'], '%Y-%m-%d').date() - today).days
+        result['days_to_expiry'].append(days_to_expiry)
+        if days_to_expiry < 0:
+            result['expiry_status'].append(expiry_names[0])
+        elif days_to_expiry < EXPIRY_CRITICAL_DAYS:
+            result['expiry_status'].append(expiry_names[1])
+        elif days_to_expiry < EXPIRY_WARNING_DAYS:
+            result['expiry_status'].append(expiry_names[2])
+        else:
+            result['expiry_status'].append(expiry_names[3])
+        
+        result['running'].append(row['start_date'] <= today_text and (not row['end_date'] or row['end_date'] >= today_text))
+    
+    return pd.DataFrame(result)
+
+def vectorized(frame):
+    """temporal.py over whole columns"""
+    result = pd.DataFrame({'age': temporal.ages(frame['date_of_birth'])})
+    result['days_since'] = temporal.days_since(frame['illness_date'])
+    result['recency'] = temporal.recency_labels(result['days_since'])
+    result['days_to_expiry'] = temporal.days_until(frame['expiry_date'])
+    result['expiry_status'] = temporal.expiry_labels(result['days_to_expiry'], EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS)
+    result['running'] = temporal.running_today(frame['start_date'], frame['end_date'])
+    return result
+
+def sql_query():
+    """The same columns computed by SQLite while the rows are read"""
+    labels = temporal.expiry_labels([-1, 0, EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS],
+                                    EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS).tolist()
+    return f'''
+        SELECT CAST(strftime('%Y', 'now', 'localtime') AS INTEGER) - CAST(strftime('%Y', date_of_birth) AS INTEGER)
+                   - (strftime('%m-%d', 'now', 'localtime') < strftime('%m-%d', date_of_birth)) AS age,
+               days_since,
+               CASE WHEN days_since < {temporal.RECENT_DAYS} THEN '{temporal.RECENCY_LABELS[0]}'
+                    WHEN days_since < {temporal.MODERATE_DAYS} THEN '{temporal.RECENCY_LABELS[1]}'
+                    ELSE '{temporal.RECENCY_LABELS[2]}' END AS recency,
+               days_to_expiry,
+               CASE WHEN days_to_expiry < 0 THEN '{labels[0]}'
+                    WHEN days_to_expiry < {EXPIRY_CRITICAL_DAYS} THEN '{labels[1]}'
+                    WHEN days_to_expiry < {EXPIRY_WARNING_DAYS} THEN '{labels[2]}'
+                    ELSE '{labels[3]}' END AS expiry_status,
+               start_date <= DATE('now', 'localtime')
+                   AND (end_date IS NULL OR end_date >= DATE('now', 'localtime')) AS running
+        FROM (
+            SELECT *,
+                   CAST(julianday(DATE('now', 'localtime')) - julianday(illness_date) AS INTEGER) AS days_since,
+                   CAST(julianday(expiry_date) - julianday(DATE('now', 'localtime')) AS INTEGER) AS days_to_expiry
+            FROM temporal_rows
+        )
+    '''
+
+def normalize(result):
+    """Make the three methods' dtypes comparable"""
+    result = result[COLUMNS].copy()
+    for column in ('age', 'days_since', 'days_to_expiry'):
+        result[column] = pd.to_numeric(result[column]).astype('Int64')
+    result['running'] = result['running'].astype(bool)
+    return result.reset_index(drop=True)
+
+def time_method(method, repeat):
+    """Run method repeat times; returns (last result, sorted latencies in seconds)"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = method()
+        latencies.append(time.perf_counter() - start)
+    return result, sorted(latencies)
+
+def describe(latencies):
+    """Format median and best latency"""
+    return f"p50={latencies[len(latencies) // 2] * 1000:8.2f}ms  min={latencies[0] * 1000:8.2f}ms"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    frame = build_rows(args.rows, random.Random(args.seed))
+    conn = sqlite3.connect(":memory:")
+    frame.to_sql("temporal_rows", conn, index=False)
+    
+    rowwise_result, rowwise_latencies = time_method(lambda: rowwise(frame), max(1, args.repeat // 5))
+    vectorized_result, vectorized_latencies = time_method(lambda: vectorized(frame), args.repeat)
+    sql_result, sql_latencies = time_method(lambda: pd.read_sql_query(sql_query(), conn), args.repeat)
+    _, read_latencies = time_method(lambda: pd.read_sql_query("SELECT * FROM temporal_rows", conn), args.repeat)
+    conn.close()
+    
+    expected = normalize(rowwise_result)
+    mismatches = {name: int((normalize(result) != expected).any(axis=1).sum())
+                  for name, result in (("vectorized", vectorized_result), ("sql", sql_result))}
+    
+    print(f"rows={args.rows} repeat={args.repeat}")
+    print(f"rowwise:    {describe(rowwise_latencies)}")
+    print(f"vectorized: {describe(vectorized_latencies)}")
+    print(f"sql:        {describe(sql_latencies)}  (plain read: {describe(read_latencies)})")
+    print(f"speedup (p50, rowwise/vectorized): "
+          f"{rowwise_latencies[len(rowwise_latencies) // 2] / vectorized_latencies[len(vectorized_latencies) // 2]:.0f}x")
+    failed = {name: count for name, count in mismatches.items() if count}
+    print("result check: " + ("OK" if not failed else "FAILED - " + ", ".join(
+        f"{name} differs on {count} rows" for name, count in failed.items())))
+    
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Benchmark write throughput and tail latency under concurrent sessions.
+
+Runs the same mix of small session writes (chat messages, read receipts and
+dose logging) from several processes with several threads each, while reader
+threads keep querying chat history, in three modes:
+
+    legacy   rollback journal, a new connection and implicit transaction per write
+             (how every write worked before the writer thread)
+    direct   WAL, a new connection per write with BEGIN IMMEDIATE and jittered retries
+             (PILLSCARE_WRITE_QUEUE=0)
+    queue    WAL, one writer thread per process that group-commits queued writes
+
+Reports writes per second, latency percentiles and how many writes failed.
+
+    python benchmarks/bench_writes.py --processes 4 --threads 8 --writes 200
+    python benchmarks/bench_writes.py --modes legacy queue --save writes.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import get_db_connection
+from seed_data import SCALES, seed_database
+
+MODES = ["legacy", "direct", "queue"]
+
+def pick_targets():
+    """Return user id pairs to chat between and dose slots to log"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT p.user_id AS patient_user_id, d.user_id AS doctor_user_id
+        FROM patients p, doctors d
+        LIMIT 50
+    ''')
+    pairs = [(row['patient_user_id'], row['doctor_user_id']) for row in cursor.fetchall()]
+    
+    cursor.execute('SELECT id, reminder_times FROM medicine_reminders WHERE is_active = 1 LIMIT 50')
+    reminders = [(row['id'], row['reminder_times'].split(',')[0]) for row in cursor.fetchall()]
+    
+    conn.close()
+    
+    return pairs, reminders
+
+def write_statements(pairs, reminders, worker, count):
+    """The (sql, params) of each write a session thread performs"""
+    statements = []
+    for n in range(count):
+        patient, doctor = pairs[(worker + n) % len(pairs)]
+        reminder_id, slot = reminders[(worker + n) % len(reminders)]
+        kind = n % 3
+        if kind == 0:
+            statements.append(('INSERT INTO chat_messages (sender_id, receiver_id, message) VALUES (?, ?, ?)',
+                               (patient, doctor, f"bench {worker}-{n}")))
+        elif kind == 1:
+            statements.append(('UPDATE chat_messages SET is_read = 1 WHERE sender_id = ? AND receiver_id = ? AND is_read = 0',
+                               (patient, doctor)))
+        else:
+            statements.append(('''
+                INSERT INTO dose_events (reminder_id, scheduled_date, scheduled_time, status)
+                VALUES (?, DATE('now', ?), ?, 'Taken')
+                ON CONFLICT (reminder_id, scheduled_date, scheduled_time) DO UPDATE SET status = excluded.status
+            ''', (reminder_id, f"-{n % 30} days", slot)))
+    return statements
+
+def legacy_write(sql, params):
+    conn = get_db_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+def run_worker(db_path, mode, threads, writes, readers, worker, start_barrier):
+    """Run one process's session and reader threads; returns [(latency seconds, error or None)]"""
+    database.DB_PATH = db_path
+    import write_queue
+    write_queue.enabled = mode == "queue"
+    
+    pairs, reminders = pick_targets()
+    results = []
+    results_lock = threading.Lock()
+    done = threading.Event()
+
+    def session(thread_number):
+        timings = []
+        for sql, params in write_statements(pairs, reminders, worker * threads + thread_number, writes):
+            start = time.perf_counter()
+            error = None
+            try:
+                if mode == "legacy":
+                    legacy_write(sql, params)
+                else:
+                    write_queue.run_write(lambda cursor: cursor.execute(sql, params))
+            except Exception as e:
+                error = str(e)
+            timings.append((time.perf_counter() - start, error))
+        with results_lock:
+            results.extend(timings)
+
+    def reader(thread_number):
+        from chat_system import get_chat_messages
+        patient, doctor = pairs[thread_number % len(pairs)]
+        while not done.is_set():
+            try:
+                get_chat_messages(patient, doctor)
+            except Exception:
+                pass
+    
+    sessions = [threading.Thread(target=session, args=(n,)) for n in range(threads)]
+    reader_threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    
+    start_barrier.wait()
+    started = time.time()
+    for thread in reader_threads + sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+    ended = time.time()
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+    write_queue.shutdown()
+    
+    return results, started, ended
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+def run_mode(template_path, work_dir, mode, processes, threads, writes, readers):
+    """Copy the seeded database, set its journal mode and run every worker; returns a summary"""
+    db_path = os.path.join(work_dir, f"writes_{mode}.db")
+    shutil.copyfile(template_path, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode={'DELETE' if mode == 'legacy' else 'WAL'}")
+    conn.close()
+    
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=processes) as executor:
+        start_barrier = manager.Barrier(processes)
+        futures = [executor.submit(run_worker, db_path, mode, threads, writes, readers, worker, start_barrier)
+                   for worker in range(processes)]
+        outcomes = [future.result() for future in futures]
+    
+    timings = [timing for results, _, _ in outcomes for timing in results]
+    elapsed = max(ended for _, _, ended in outcomes) - min(started for _, started, _ in outcomes)
+    latencies = sorted(seconds * 1000 for seconds, error in timings if error is None)
+    errors = [error for _, error in timings if error]
+    
+    return {
+        'writes': len(timings),
+        'writes_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+        'max_ms': round(latencies[-1], 2) if latencies else None,
+        'errors': len(errors),
+        'sample_errors': sorted(set(errors))[:3],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="seeded database to copy for each mode (default: seed a temporary one)")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="scale to seed when --db is not given")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--processes", type=int, default=4, help="server processes")
+    parser.add_argument("--threads", type=int, default=8, help="writing sessions per process")
+    parser.add_argument("--readers", type=int, default=2, help="threads per process reading chat history meanwhile")
+    parser.add_argument("--writes", type=int, default=150, help="writes per session")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = args.db
+        if not template_path:
+            template_path = database.DB_PATH = os.path.join(tmp, "template.db")
+            seed_database(**SCALES[args.scale])
+        
+        results = {}
+        print(f"{args.processes} processes x {args.threads} sessions x {args.writes} writes, "
+              f"{args.readers} readers per process")
+        print(f"{'mode':>8} {'writes/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>7}")
+        for mode in args.modes:
+            summary = results[mode] = run_mode(template_path, tmp, mode, args.processes, args.threads,
+                                               args.writes, args.readers)
+            cells = [f"{summary[key]:>7.1f}ms" if summary[key] is not None else f"{'-':>9}"
+                     for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+            print(f"{mode:>8} {summary['writes_per_second']:>9.1f} {' '.join(cells)} {summary['errors']:>7}")
+            for error in summary['sample_errors']:
+                print(f"{'':>8} error: {error}")
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.save}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Load-test app.py with many concurrent sessions driven through Streamlit's AppTest.
+
+Each simulated user runs a scripted journey for their role against a seeded
+database (see benchmarks/seed_data.py):
+
+    patient   log in, reload the dashboard, send a chat message, take a due dose
+    doctor    log in, reload the dashboard, reply in the chat
+    pharmacy  log in, reload the dashboard, select and confirm a pending order, then deliver a confirmed one
+
+Every rerun after the first page load is timed. For each concurrency level
+the harness reports rerun latency percentiles per role, throughput, and how
+many reruns failed with SQLite lock contention ("database is locked"/"busy")
+or other errors.
+
+AppTest swaps a process-wide mock runtime in and out around every run, so two
+AppTests cannot run at once in one process. Each session therefore runs in its
+own worker process, and all sessions start their journeys together. A real
+Streamlit server runs its sessions as threads in one process, so the latency
+at a given level here is a lower bound: the server's sessions would also
+compete for the GIL.
+
+    python benchmarks/load_test.py --scale small --levels 1 4 8 16
+    python benchmarks/load_test.py --db bench.db --levels 2 4 8 --iterations 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import get_db_connection
+from seed_data import SCALES, seed_database, PASSWORD
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Seconds a single rerun may take before AppTest gives up
+RERUN_TIMEOUT = 120
+
+ROLES = ["Patient", "Doctor", "Pharmacy"]
+
+# Errors that mean SQLite could not get a lock in time
+LOCK_ERRORS = ("database is locked", "database table is locked", "busy")
+
+class Session:
+    """One simulated browser session; records the latency and any error of every rerun"""
+
+    def __init__(self, role, username):
+        from streamlit.testing.v1 import AppTest
+        
+        self.role = role
+        self.username = username
+        self.at = AppTest.from_file(APP_PATH, default_timeout=RERUN_TIMEOUT)
+        self.reruns = []
+
+    def rerun(self, step):
+        """Run the script once and record (role, step, seconds, error or None)"""
+        start = time.perf_counter()
+        error = None
+        try:
+            self.at.run()
+            if self.at.exception:
+                error = self.at.exception[0].message
+        except Exception as e:
+            error = str(e)
+        self.reruns.append((self.role, step, time.perf_counter() - start, error))
+
+    def widget(self, kind, label):
+        return next((w for w in getattr(self.at, kind) if w.label == label), None)
+
+    def button_with_key_prefix(self, prefix):
+        return next((b for b in self.at.button if b.key and b.key.startswith(prefix)), None)
+
+    def login(self):
+        self.widget("text_input", "Username").input(self.username)
+        self.widget("text_input", "Password").input(PASSWORD)
+        self.widget("button", "Login").click()
+        self.rerun("login")
+
+    def send_chat(self, label, text):
+        message_box = self.widget("text_area", label)
+        if message_box is not None:
+            message_box.input(text)
+            self.widget("button", "Send Message").click()
+            self.rerun("send_message")
+
+    def click(self, key_prefix, step):
+        button = self.button_with_key_prefix(key_prefix)
+        if button is not None:
+            button.click()
+            self.rerun(step)
+
+    def select_and_click(self, table, column, value, action, step):
+        """Select the first row of a list_view table where column == value, then click one of its actions"""
+        grid = next((d for d in self.at.dataframe if d.key and d.key.startswith(f"{table}_")), None)
+        if grid is None:
+            return
+        positions = [n for n, cell in enumerate(grid.value[column]) if cell == value]
+        if positions:
+            self.at.session_state[grid.key] = {"selection": {"rows": positions[:1], "columns": []}}
+            self.rerun(f"select_{step}")
+            self.click(f"{table}_{action}", step)
+
+def patient_journey(session, iteration):
+    session.rerun("reload")
+    session.send_chat("Type your message:", f"Load test message {iteration}")
+    session.click("take_dose_", "take_dose")
+
+def doctor_journey(session, iteration):
+    session.rerun("reload")
+    session.send_chat("Type your response:", f"Load test reply {iteration}")
+
+def pharmacy_journey(session, iteration):
+    session.rerun("reload")
+    session.select_and_click("pharmacy_orders", "status", "Pending", "confirm", "confirm_order")
+    session.select_and_click("pharmacy_orders", "status", "Confirmed", "deliver", "deliver_order")
+
+JOURNEYS = {"Patient": patient_journey, "Doctor": doctor_journey, "Pharmacy": pharmacy_journey}
+
+def run_session(db_path, role, username, iterations, start_barrier):
+    """Load the app, wait for every session, then log in and run the role's journey.
+    
+    Returns (reruns, journey start, journey end); the first page load only warms up
+    the process and is not counted.
+    """
+    database.DB_PATH = db_path
+    session = Session(role, username)
+    session.rerun("open")
+    session.reruns.clear()
+    start_barrier.wait()
+    
+    started = time.time()
+    session.login()
+    for iteration in range(iterations):
+        JOURNEYS[role](session, iteration)
+    return session.reruns, started, time.time()
+
+def pick_accounts(mix, sessions):
+    """Return (role, username) for each session, spreading roles by the mix and using distinct accounts"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    usernames = {}
+    for role in ROLES:
+        cursor.execute('SELECT username FROM users WHERE user_type = ? ORDER BY id LIMIT ?', (role, sessions))
+        usernames[role] = [row['username'] for row in cursor.fetchall()]
+    conn.close()
+    
+    # Give each new session to the role furthest behind its share, so small levels still mix roles
+    assigned = {role: 0 for role in ROLES}
+    accounts = []
+    for n in range(1, sessions + 1):
+        role = max(ROLES, key=lambda role: n * mix[ROLES.index(role)] / sum(mix) - assigned[role])
+        if not usernames[role]:
+            raise SystemExit(f"the database has no {role} accounts to log in with")
+        accounts.append((role, usernames[role][assigned[role] % len(usernames[role])]))
+        assigned[role] += 1
+    return accounts
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+def summarize(reruns, elapsed):
+    """Latency percentiles (ms) overall and per role, throughput and error counts"""
+    def latencies(role=None):
+        return sorted(seconds * 1000 for rerun_role, _, seconds, _ in reruns if role in (None, rerun_role))
+
+    def describe(values):
+        if not values:
+            return None
+        return {'reruns': len(values), 'p50_ms': round(percentile(values, 0.5), 1),
+                'p95_ms': round(percentile(values, 0.95), 1), 'p99_ms': round(percentile(values, 0.99), 1),
+                'max_ms': round(values[-1], 1)}
+    
+    errors = [error for _, _, _, error in reruns if error]
+    lock_errors = [error for error in errors if any(text in error.lower() for text in LOCK_ERRORS)]
+    
+    return {
+        'overall': describe(latencies()),
+        'by_role': {role: describe(latencies(role)) for role in ROLES if latencies(role)},
+        'reruns_per_second': round(len(reruns) / elapsed, 2),
+        'lock_errors': len(lock_errors),
+        'other_errors': len(errors) - len(lock_errors),
+        'sample_errors': sorted(set(errors))[:3],
+    }
+
+def run_level(db_path, concurrency, mix, iterations):
+    """Run `concurrency` sessions at once and summarize their reruns"""
+    accounts = pick_accounts(mix, concurrency)
+    
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=concurrency) as executor:
+        start_barrier = manager.Barrier(concurrency)
+        futures = [executor.submit(run_session, db_path, role, username, iterations, start_barrier)
+                   for role, username in accounts]
+        results = [future.result() for future in futures]
+    
+    reruns = [rerun for session_reruns, _, _ in results for rerun in session_reruns]
+    elapsed = max(ended for _, _, ended in results) - min(started for _, started, _ in results)
+    return summarize(reruns, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="seeded database to test against (default: seed a temporary one)")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="scale to seed when --db is not given")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrent sessions")
+    parser.add_argument("--mix", default="6:2:2", help="patient:doctor:pharmacy session ratio")
+    parser.add_argument("--iterations", type=int, default=3, help="journeys per session after logging in")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args()
+    
+    mix = [int(weight) for weight in args.mix.split(":")]
+    if len(mix) != len(ROLES) or sum(mix) == 0:
+        parser.error("--mix needs three ratios, e.g. 6:2:2")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "load.db")
+        database.DB_PATH = db_path
+        if not args.db:
+            seed_database(**SCALES[args.scale])
+        
+        results = {}
+        print(f"{'sessions':>8} {'reruns':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rerun/s':>8} {'locked':>7} {'errors':>7}")
+        for level in args.levels:
+            summary = results[level] = run_level(db_path, level, mix, args.iterations)
+            overall = summary['overall']
+            print(f"{level:>8} {overall['reruns']:>7} {overall['p50_ms']:>6.0f}ms {overall['p95_ms']:>6.0f}ms "
+                  f"{overall['p99_ms']:>6.0f}ms {summary['reruns_per_second']:>8.1f} "
+                  f"{summary['lock_errors']:>7} {summary['other_errors']:>7}")
+            for role, stats in summary['by_role'].items():
+                print(f"{'':>8} {role:<9} p50 {stats['p50_ms']:.0f}ms  p95 {stats['p95_ms']:.0f}ms  "
+                      f"({stats['reruns']} reruns)")
+            for error in summary['sample_errors']:
+                print(f"{'':>8} error: {error}")
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.save}")
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 from database import get_db_connection, get_patient_id, get_doctor_id
+from render_profiler import profile_section
+from write_queue import run_write
+from records import fetch_records
 
+@profile_section
 def patient_chat_interface():
     """Chat interface for patients to communicate with doctors"""
     st.subheader("💬 Chat with Doctor")
@@ -10,23 +13,16 @@ def patient_chat_interface():
     patient_id = get_patient_id(st.session_state.user_id)
     
     # Get list of doctors
-    conn = get_db_connection()
-    doctors = pd.read_sql_query('''
-        SELECT u.id, u.full_name, d.specialization
-        FROM users u
-        JOIN doctors d ON u.id = d.user_id
-        WHERE u.user_type = 'Doctor'
-        ORDER BY u.full_name
-    ''', conn)
+    doctors = get_chat_doctors()
     
-    if not doctors.empty:
+    if doctors:
         # Doctor selection
-        doctor_options = [f"{doc['full_name']} ({doc['specialization']})" for _, doc in doctors.iterrows()]
+        doctor_options = [f"{doc.full_name} ({doc.specialization})" for doc in doctors]
         selected_doctor_idx = st.selectbox("Select Doctor", range(len(doctor_options)), 
                                          format_func=lambda x: doctor_options[x])
         
-        selected_doctor_id = doctors.iloc[selected_doctor_idx]['id']
-        selected_doctor_name = doctors.iloc[selected_doctor_idx]['full_name']
+        selected_doctor_id = doctors[selected_doctor_idx].id
+        selected_doctor_name = doctors[selected_doctor_idx].full_name
         
         st.write(f"Chatting with: **Dr. {selected_doctor_name}**")
         
@@ -46,38 +42,27 @@ def patient_chat_interface():
                     st.error("Please enter a message")
     else:
         st.info("No doctors available for chat at the moment.")
-    
-    conn.close()
 
+@profile_section
 def doctor_chat_interface():
     """Chat interface for doctors to communicate with patients"""
     st.subheader("💬 Chat with Patients")
     
     # Get list of patients who have sent messages
-    conn = get_db_connection()
-    patients_with_messages = pd.read_sql_query('''
-        SELECT DISTINCT u.id, u.full_name, 
-               MAX(cm.timestamp) as last_message_time,
-               COUNT(CASE WHEN cm.is_read = 0 AND cm.receiver_id = ? THEN 1 END) as unread_count
-        FROM chat_messages cm
-        JOIN users u ON cm.sender_id = u.id
-        WHERE cm.receiver_id = ? OR cm.sender_id = ?
-        GROUP BY u.id, u.full_name
-        ORDER BY last_message_time DESC
-    ''', conn, params=(st.session_state.user_id, st.session_state.user_id, st.session_state.user_id))
+    patients_with_messages = get_doctor_conversations(st.session_state.user_id)
     
-    if not patients_with_messages.empty:
+    if patients_with_messages:
         # Patient selection
         patient_options = []
-        for _, patient in patients_with_messages.iterrows():
-            unread_indicator = f" ({patient['unread_count']} unread)" if patient['unread_count'] > 0 else ""
-            patient_options.append(f"{patient['full_name']}{unread_indicator}")
+        for patient in patients_with_messages:
+            unread_indicator = f" ({patient.unread_count} unread)" if patient.unread_count > 0 else ""
+            patient_options.append(f"{patient.full_name}{unread_indicator}")
         
         selected_patient_idx = st.selectbox("Select Patient", range(len(patient_options)), 
                                           format_func=lambda x: patient_options[x])
         
-        selected_patient_id = patients_with_messages.iloc[selected_patient_idx]['id']
-        selected_patient_name = patients_with_messages.iloc[selected_patient_idx]['full_name']
+        selected_patient_id = patients_with_messages[selected_patient_idx].id
+        selected_patient_name = patients_with_messages[selected_patient_idx].full_name
         
         st.write(f"Chatting with: **{selected_patient_name}**")
         
@@ -100,70 +85,92 @@ def doctor_chat_interface():
                     st.error("Please enter a message")
     else:
         st.info("No patient conversations yet. Patients will appear here when they start a chat.")
-    
-    conn.close()
 
+@profile_section
 def display_chat_messages(user1_id, user2_id):
     """Display chat messages between two users"""
-    conn = get_db_connection()
-    
-    messages = pd.read_sql_query('''
-        SELECT cm.*, u.full_name as sender_name
-        FROM chat_messages cm
-        JOIN users u ON cm.sender_id = u.id
-        WHERE (cm.sender_id = ? AND cm.receiver_id = ?) 
-           OR (cm.sender_id = ? AND cm.receiver_id = ?)
-        ORDER BY cm.timestamp ASC
-    ''', conn, params=(user1_id, user2_id, user2_id, user1_id))
+    messages = get_chat_messages(user1_id, user2_id)
     
-    if not messages.empty:
+    if messages:
         # Create a container for messages with scrolling
         chat_container = st.container()
         
         with chat_container:
-            for _, message in messages.iterrows():
-                timestamp = datetime.fromisoformat(message['timestamp'].replace('Z', '+00:00'))
+            for message in messages:
+                timestamp = datetime.fromisoformat(message.timestamp.replace('Z', '+00:00'))
                 time_str = timestamp.strftime("%Y-%m-%d %H:%M")
                 
-                if message['sender_id'] == st.session_state.user_id:
+                if message.sender_id == st.session_state.user_id:
                     # Sent message (right aligned)
                     st.write(f"**You** _{time_str}_")
-                    st.info(message['message'])
+                    st.info(message.message)
                 else:
                     # Received message (left aligned)
-                    st.write(f"**{message['sender_name']}** _{time_str}_")
-                    st.success(message['message'])
+                    st.write(f"**{message.sender_name}** _{time_str}_")
+                    st.success(message.message)
     else:
         st.info("No messages yet. Start the conversation!")
+
+def get_chat_doctors():
+    """Get the doctors patients can chat with, as records"""
+    conn = get_db_connection()
+    doctors = fetch_records(conn, '''
+        SELECT u.id, u.full_name, d.specialization
+        FROM users u
+        JOIN doctors d ON u.id = d.user_id
+        WHERE u.user_type = 'Doctor'
+        ORDER BY u.full_name
+    ''')
+    conn.close()
     
+    return doctors
+
+def get_doctor_conversations(doctor_user_id):
+    """Get the people a doctor has chatted with as records, most recent first, with unread counts"""
+    conn = get_db_connection()
+    conversations = fetch_records(conn, '''
+        SELECT DISTINCT u.id, u.full_name, 
+               MAX(cm.timestamp) as last_message_time,
+               COUNT(CASE WHEN cm.is_read = 0 AND cm.receiver_id = ? THEN 1 END) as unread_count
+        FROM chat_messages cm
+        JOIN users u ON cm.sender_id = u.id
+        WHERE cm.receiver_id = ? OR cm.sender_id = ?
+        GROUP BY u.id, u.full_name
+        ORDER BY last_message_time DESC
+    ''', (doctor_user_id, doctor_user_id, doctor_user_id))
     conn.close()
+    
+    return conversations
 
-def send_message(sender_id, receiver_id, message):
-    """Send a chat message"""
+def get_chat_messages(user1_id, user2_id):
+    """Get the chat messages between two users as records, oldest first"""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    messages = fetch_records(conn, '''
+        SELECT cm.*, u.full_name as sender_name
+        FROM chat_messages cm
+        JOIN users u ON cm.sender_id = u.id
+        WHERE (cm.sender_id = ? AND cm.receiver_id = ?) 
+           OR (cm.sender_id = ? AND cm.receiver_id = ?)
+        ORDER BY cm.timestamp ASC
+    ''', (user1_id, user2_id, user2_id, user1_id))
+    conn.close()
     
-    cursor.execute('''
+    return messages
+
+def send_message(sender_id, receiver_id, message):
+    """Send a chat message (written by the writer thread)"""
+    run_write(lambda cursor: cursor.execute('''
         INSERT INTO chat_messages (sender_id, receiver_id, message)
         VALUES (?, ?, ?)
-    ''', (sender_id, receiver_id, message))
-    
-    conn.commit()
-    conn.close()
+    ''', (sender_id, receiver_id, message)))
 
 def mark_messages_as_read(sender_id, receiver_id):
-    """Mark messages as read"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    """Mark messages as read (written by the writer thread)"""
+    run_write(lambda cursor: cursor.execute('''
         UPDATE chat_messages 
         SET is_read = 1 
         WHERE sender_id = ? AND receiver_id = ? AND is_read = 0
-    ''', (sender_id, receiver_id))
-    
-    conn.commit()
-    conn.close()
+    ''', (sender_id, receiver_id)))
 
 def get_unread_message_count(user_id):
     """Get count of unread messages for a user"""
@@ -0,0 +1,187 @@
+import copy
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+import database
+
+# Where cached dashboard reads live: "process" (one store shared by every session),
+# "streamlit" (st.cache_data) or "off"
+backend = os.getenv("PILLSCARE_DATA_CACHE", "process")
+BACKENDS = ("process", "streamlit", "off")
+
+# Cached results kept per process (process backend) or per loader (st.cache_data max_entries)
+CACHE_MAX_ENTRIES = int(os.getenv("PILLSCARE_DATA_CACHE_SIZE", "512"))
+
+# Owner id used for scopes that are not tied to one patient or pharmacy
+GLOBAL_OWNER = 0
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stats = {}
+_streamlit_loaders = []
+
+_versions_lock = threading.Lock()
+_versions_conn = None
+_versions_db_path = None
+
+# Set when st.cache_data actually runs a loader, so the caller can tell a hit from a miss
+_thread_state = threading.local()
+
+class LoaderStats:
+    """Hit/miss counters for one cached loader (stale and evictions are only known for the process store)"""
+    __slots__ = ("hits", "misses", "stale", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+def _versions_connection():
+    """Return the shared connection used for version lookups, reopening it if DB_PATH changed"""
+    global _versions_conn, _versions_db_path
+    if _versions_conn is None or _versions_db_path != database.DB_PATH:
+        if _versions_conn is not None:
+            _versions_conn.close()
+        _versions_conn = sqlite3.connect(database.DB_PATH, check_same_thread=False)
+        _versions_db_path = database.DB_PATH
+    return _versions_conn
+
+def get_write_versions(keys):
+    """Return the current version of each (scope, owner id) pair, 0 for pairs never written"""
+    conditions = " OR ".join(["(scope = ? AND owner_id = ?)"] * len(keys))
+    
+    # A new connection parses the whole schema on its first statement, which costs more than
+    # most cached reads, so lookups share one long-lived connection
+    with _versions_lock:
+        rows = _versions_connection().execute(
+            f'SELECT scope, owner_id, version FROM write_versions WHERE {conditions}',
+            [value for key in keys for value in key]
+        ).fetchall()
+    
+    versions = {(scope, owner_id): version for scope, owner_id, version in rows}
+    return tuple(versions.get(key, 0) for key in keys)
+
+def _loader_stats(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = LoaderStats()
+    return stats
+
+def _copy_result(result):
+    """Copy a cached result for the caller; lists of records are immutable rows, so a shallow copy is enough"""
+    if isinstance(result, list) and all(isinstance(row, tuple) for row in result):
+        return list(result)
+    return copy.deepcopy(result)
+
+def _process_lookup(name, call_key, versions, load):
+    """Return the stored result for call_key if it was loaded at these versions, else load and store it"""
+    with _lock:
+        stats = _loader_stats(name)
+        entry = _entries.get(call_key)
+        if entry is not None and entry[0] == versions:
+            _entries.move_to_end(call_key)
+            stats.hits += 1
+            return _copy_result(entry[1])
+        stats.misses += 1
+        if entry is not None:
+            stats.stale += 1
+    
+    result = load()
+    
+    with _lock:
+        _entries[call_key] = (versions, result)
+        _entries.move_to_end(call_key)
+        while len(_entries) > CACHE_MAX_ENTRIES:
+            (evicted_name, _, _), _ = _entries.popitem(last=False)
+            _loader_stats(evicted_name).evictions += 1
+    
+    return _copy_result(result)
+
+def versioned_cache(*scopes, owner=None, global_scopes=(), daily=False):
+    """Decorator caching a read-only loader until one of its write-version scopes changes.
+    
+    scopes are counted per owner, taken from the loader's `owner` argument (a patient or
+    pharmacy id); global_scopes are shared by every owner. Triggers bump the counters,
+    so a write from any session, job or process makes the next call reload. Set daily
+    for loaders whose results also depend on today's date.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+        signature = inspect.signature(func)
+        streamlit_loader = None
+
+        def load_with_versions(versions, day, args, kwargs):
+            # st.cache_data hashes every argument, so the versions and the day are part of its key
+            _thread_state.loaded = True
+            return func(*args, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal streamlit_loader
+            if backend not in ("process", "streamlit"):
+                return func(*args, **kwargs)
+            
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            owner_id = bound.arguments[owner] if owner else GLOBAL_OWNER
+            keys = [(scope, int(owner_id)) for scope in scopes] + [(scope, GLOBAL_OWNER) for scope in global_scopes]
+            versions = get_write_versions(keys)
+            day = date.today().isoformat() if daily else None
+            
+            if backend == "streamlit":
+                if streamlit_loader is None:
+                    import streamlit as st
+                    streamlit_loader = st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)(load_with_versions)
+                    _streamlit_loaders.append(streamlit_loader)
+                _thread_state.loaded = False
+                result = streamlit_loader(versions, day, args, kwargs)
+                with _lock:
+                    stats = _loader_stats(name)
+                    if _thread_state.loaded:
+                        stats.misses += 1
+                    else:
+                        stats.hits += 1
+                return result
+            
+            call_key = (name, tuple(bound.arguments.items()), day)
+            return _process_lookup(name, call_key, versions, lambda: func(*args, **kwargs))
+        
+        wrapper.uncached = func
+        return wrapper
+    
+    return decorator
+
+def set_backend(value):
+    """Switch the cache backend for every session ("process", "streamlit" or "off")"""
+    global backend
+    if value not in BACKENDS:
+        raise ValueError(f"Unknown data cache backend: {value}")
+    backend = value
+
+def clear_data_cache():
+    """Drop every cached result and reset the counters"""
+    with _lock:
+        _entries.clear()
+        _stats.clear()
+    for streamlit_loader in _streamlit_loaders:
+        streamlit_loader.clear()
+
+def get_cache_stats():
+    """Return hit/miss counters per loader, busiest first"""
+    with _lock:
+        rows = [{
+            'loader': name,
+            'hits': stats.hits,
+            'misses': stats.misses,
+            'stale': stats.stale,
+            'evictions': stats.evictions,
+            'hit_rate_pct': round(100 * stats.hits / (stats.hits + stats.misses), 1) if stats.hits + stats.misses else 0.0,
+        } for name, stats in _stats.items()]
+        entries = len(_entries)
+    
+    return sorted(rows, key=lambda row: row['hits'] + row['misses'], reverse=True), entries
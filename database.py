@@ -2,21 +2,50 @@ import sqlite3
 import hashlib
 from datetime import datetime, timedelta
 import os
+import query_metrics
 
 # Database file path
 DB_PATH = "pillscare.db"
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
+    """Get database connection (traced when query metrics or render profiling need it)"""
+    conn = query_metrics.connect(DB_PATH) if query_metrics.tracing() else sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+# SQL expressions for the first day of each sales reporting period (weeks start on Monday)
+SALES_PERIOD_STARTS = {
+    'day': "DATE({date})",
+    'week': "DATE({date}, 'weekday 0', '-6 days')",
+    'month': "DATE({date}, 'start of month')",
+}
+
+# Number of scheduled doses per day for a reminder row aliased as r (reminder_times is 'HH:MM,HH:MM,...')
+REMINDER_DOSES_PER_DAY_SQL = "(LENGTH(r.reminder_times) - LENGTH(REPLACE(r.reminder_times, ',', '')) + 1)"
+
+# Write-version counters kept by triggers: table -> [(scope, owner column)]; data_cache keys cached reads on them
+WRITE_VERSION_SCOPES = {
+    'family_members': [('family', 'patient_id')],
+    'illness_history': [('illness', 'patient_id')],
+    'medicine_reminders': [('reminders', 'patient_id')],
+    'medicine_stock': [('stock', 'pharmacy_id')],
+    'orders': [('orders', 'pharmacy_id'), ('patient_orders', 'patient_id')],
+}
+
+# Bump one write-version counter (the SELECT form skips NULL owners and, on update, unchanged ones)
+WRITE_VERSION_BUMP_SQL = '''
+            INSERT INTO write_versions (scope, owner_id, version)
+            SELECT '{scope}', {owner}, 1 WHERE {owner} IS NOT NULL AND {condition}
+            ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;'''
+
 def init_database():
     """Initialize database with required tables"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
+    # WAL lets sessions keep reading while the writer thread commits (see write_queue.py)
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Users table (for authentication)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -182,9 +211,686 @@ def init_database():
         )
     ''')
     
+    # Expiry alerts table (materialized daily by the expiry sweep)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS expiry_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pharmacy_id INTEGER NOT NULL,
+            stock_id INTEGER NOT NULL,
+            medicine_name TEXT NOT NULL,
+            batch_number TEXT,
+            expiry_date DATE NOT NULL,
+            quantity INTEGER NOT NULL,
+            days_to_expiry INTEGER NOT NULL,
+            alert_level TEXT NOT NULL CHECK (alert_level IN ('Expired', 'Critical', 'Warning')),
+            sweep_date DATE NOT NULL,
+            FOREIGN KEY (pharmacy_id) REFERENCES pharmacies (id),
+            FOREIGN KEY (stock_id) REFERENCES medicine_stock (id)
+        )
+    ''')
+    
+    # Background job runs (used to run daily jobs once per day)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            job_name TEXT PRIMARY KEY,
+            last_run_date DATE NOT NULL,
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Stock batches allocated to confirmed orders (first-expiry-first-out)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_allocations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            stock_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            allocated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            released_at TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES orders (id),
+            FOREIGN KEY (stock_id) REFERENCES medicine_stock (id)
+        )
+    ''')
+    
+    # Append-only stock movement ledger (receipts, sales, adjustments, expiries)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stock_movements'")
+    ledger_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock_id INTEGER NOT NULL,
+            pharmacy_id INTEGER,
+            medicine_name TEXT NOT NULL,
+            batch_number TEXT,
+            movement_type TEXT NOT NULL CHECK (movement_type IN ('Receipt', 'Sale', 'Return', 'Adjustment', 'Expiry')),
+            quantity_change INTEGER NOT NULL,
+            order_id INTEGER,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (stock_id) REFERENCES medicine_stock (id),
+            FOREIGN KEY (pharmacy_id) REFERENCES pharmacies (id),
+            FOREIGN KEY (order_id) REFERENCES orders (id)
+        )
+    ''')
+    
+    # Periodic per-batch stock snapshots taken from the ledger
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_snapshot_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            last_movement_id INTEGER NOT NULL,
+            taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            run_id INTEGER NOT NULL,
+            stock_id INTEGER NOT NULL,
+            pharmacy_id INTEGER,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (run_id, stock_id),
+            FOREIGN KEY (run_id) REFERENCES stock_snapshot_runs (id),
+            FOREIGN KEY (stock_id) REFERENCES medicine_stock (id)
+        )
+    ''')
+    
+    # Per-pharmacy order counters (maintained by triggers on orders)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_stats'")
+    order_stats_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_stats (
+            pharmacy_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (pharmacy_id, status),
+            FOREIGN KEY (pharmacy_id) REFERENCES pharmacies (id)
+        )
+    ''')
+    
+    if not order_stats_exists:
+        cursor.execute('''
+            INSERT INTO order_stats (pharmacy_id, status, order_count, total_amount)
+            SELECT pharmacy_id, status, COUNT(*), COALESCE(SUM(total_amount), 0)
+            FROM orders
+            GROUP BY pharmacy_id, status
+        ''')
+    
+    # Revenue and units rollups per day, week and month (maintained when orders are delivered)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_rollups'")
+    sales_rollups_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_rollups (
+            pharmacy_id INTEGER NOT NULL,
+            period TEXT NOT NULL CHECK (period IN ('day', 'week', 'month')),
+            period_start DATE NOT NULL,
+            medicine_name TEXT NOT NULL,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (pharmacy_id, period, period_start, medicine_name),
+            FOREIGN KEY (pharmacy_id) REFERENCES pharmacies (id)
+        )
+    ''')
+    
+    if not sales_rollups_exists:
+        for period, period_start in SALES_PERIOD_STARTS.items():
+            cursor.execute(f'''
+                INSERT INTO sales_rollups (pharmacy_id, period, period_start, medicine_name, order_count, units, revenue)
+                SELECT pharmacy_id, ?, {period_start.format(date="COALESCE(delivery_date, order_date)")},
+                       TRIM(medicine_name), COUNT(*), SUM(quantity), COALESCE(SUM(total_amount), 0)
+                FROM orders
+                WHERE status = 'Delivered'
+                GROUP BY 1, 2, 3, 4
+            ''', (period,))
+    
+    # Doses logged against each scheduled reminder slot
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dose_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reminder_id INTEGER NOT NULL,
+            scheduled_date DATE NOT NULL,
+            scheduled_time TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('Taken', 'Late', 'Skipped')),
+            logged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (reminder_id, scheduled_date, scheduled_time),
+            FOREIGN KEY (reminder_id) REFERENCES medicine_reminders (id)
+        )
+    ''')
+    
+    # Daily adherence per reminder, kept up to date by triggers on dose_events
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS adherence_rollups (
+            reminder_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            patient_id INTEGER NOT NULL,
+            family_member_id INTEGER,
+            scheduled_doses INTEGER NOT NULL DEFAULT 0,
+            taken INTEGER NOT NULL DEFAULT 0,
+            late INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (reminder_id, day),
+            FOREIGN KEY (reminder_id) REFERENCES medicine_reminders (id),
+            FOREIGN KEY (patient_id) REFERENCES patients (id)
+        )
+    ''')
+    
+    # Per-owner write counters bumped by triggers, so cached dashboard reads know when they are stale
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS write_versions (
+            scope TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, owner_id)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Canonical medicine catalogue; stock, orders and reminders link to it by medicine_id
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medicines'")
+    catalogue_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS medicines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            normalized_name TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS medicine_aliases (
+            alias TEXT PRIMARY KEY,
+            medicine_id INTEGER NOT NULL,
+            confirmed INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (medicine_id) REFERENCES medicines (id)
+        )
+    ''')
+    
+    for table in ("medicine_stock", "orders", "medicine_reminders"):
+        add_column_if_missing(cursor, table, "medicine_id", "INTEGER REFERENCES medicines (id)")
+    
+    if not catalogue_exists:
+        # Imported here because medicine_catalogue itself imports this module
+        from medicine_catalogue import backfill_medicine_ids
+        backfill_medicine_ids(cursor)
+    
+    # Aliases to a differently named entry used to come from automatic fuzzy matching, which
+    # linked different drugs; only confirmed aliases do that now, so drop the old ones once
+    cursor.execute('PRAGMA table_info(medicine_aliases)')
+    if 'confirmed' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE medicine_aliases ADD COLUMN confirmed INTEGER NOT NULL DEFAULT 0')
+        from medicine_catalogue import drop_unconfirmed_aliases
+        drop_unconfirmed_aliases(cursor)
+    
+    # Global availability index: in-stock, non-expired totals per catalogue medicine per pharmacy
+    cursor.execute('PRAGMA table_info(medicine_availability)')
+    availability_columns = [row[1] for row in cursor.fetchall()]
+    availability_exists = 'medicine_id' in availability_columns
+    
+    # The first version was keyed by medicine name; it is derived data, so rebuild it
+    if availability_columns and not availability_exists:
+        for trigger in ("insert", "update", "delete"):
+            cursor.execute(f'DROP TRIGGER IF EXISTS medicine_availability_{trigger}')
+        cursor.execute('DROP TABLE medicine_availability')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS medicine_availability (
+            medicine_id INTEGER NOT NULL,
+            pharmacy_id INTEGER NOT NULL,
+            medicine_key TEXT NOT NULL,
+            medicine_name TEXT NOT NULL,
+            available_quantity INTEGER NOT NULL,
+            min_price REAL,
+            next_expiry DATE,
+            PRIMARY KEY (medicine_id, pharmacy_id),
+            FOREIGN KEY (medicine_id) REFERENCES medicines (id),
+            FOREIGN KEY (pharmacy_id) REFERENCES pharmacies (id)
+        )
+    ''')
+    
+    if not availability_exists:
+        rebuild_medicine_availability(cursor)
+    
+    # Optional coordinates for nearest-pharmacy lookups
+    for table in ("pharmacies", "patients"):
+        add_column_if_missing(cursor, table, "latitude", "REAL")
+        add_column_if_missing(cursor, table, "longitude", "REAL")
+    
+    # R*Tree over pharmacy coordinates (each pharmacy is a zero-size box)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pharmacy_locations'")
+    pharmacy_locations_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS pharmacy_locations USING rtree(
+            id,
+            min_lat, max_lat,
+            min_lon, max_lon
+        )
+    ''')
+    
+    if not pharmacy_locations_exists:
+        cursor.execute('''
+            INSERT INTO pharmacy_locations (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT id, latitude, latitude, longitude, longitude
+            FROM pharmacies
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        ''')
+    
+    # Indexes, search structures and triggers
+    create_indexes(cursor)
+    create_triggers(cursor)
+    
+    # Start the ledger from the quantities on hand when it is first created
+    if not ledger_exists:
+        cursor.execute('''
+            INSERT INTO stock_movements
+            (stock_id, pharmacy_id, medicine_name, batch_number, movement_type, quantity_change, note)
+            SELECT id, pharmacy_id, medicine_name, batch_number, 'Adjustment', quantity, 'Opening balance'
+            FROM medicine_stock
+            WHERE quantity != 0
+        ''')
+    
     conn.commit()
     conn.close()
 
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table unless it is already there"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def create_indexes(cursor):
+    """Create indexes and full-text search tables used by the dashboards"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_medicine_stock_pharmacy
+        ON medicine_stock (pharmacy_id, updated_at)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_medicine_stock_expiry
+        ON medicine_stock (pharmacy_id, expiry_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_pharmacy_status
+        ON orders (pharmacy_id, status, order_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_pharmacy_date
+        ON orders (pharmacy_id, order_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_patient_date
+        ON orders (patient_id, order_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_medicine_stock_medicine
+        ON medicine_stock (pharmacy_id, medicine_id, expiry_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_medicine_availability_key
+        ON medicine_availability (medicine_key, pharmacy_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_medicine
+        ON orders (medicine_id, pharmacy_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_medicine_reminders_medicine
+        ON medicine_reminders (medicine_id, patient_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_adherence_rollups_patient
+        ON adherence_rollups (patient_id, day)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_medicine_stock_fefo
+        ON medicine_stock (pharmacy_id, medicine_name COLLATE NOCASE, expiry_date)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_allocations_order
+        ON order_allocations (order_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_stock
+        ON stock_movements (stock_id, created_at)
+    ''')
+    
+    # Ordered by (pharmacy_id, id), used for "movements since snapshot" ranges
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_pharmacy
+        ON stock_movements (pharmacy_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_snapshots_pharmacy
+        ON stock_snapshots (run_id, pharmacy_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_expiry_alerts_pharmacy
+        ON expiry_alerts (pharmacy_id, alert_level, expiry_date)
+    ''')
+    
+    # Stock batches are unique per pharmacy, medicine and batch number (upsert key)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_medicine_stock_batch'")
+    if cursor.fetchone() is None:
+        merge_duplicate_stock_batches(cursor)
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_medicine_stock_batch
+            ON medicine_stock (pharmacy_id, medicine_name, batch_number)
+        ''')
+    
+    # Full-text index over stock for prefix search on name, manufacturer and batch
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medicine_stock_fts'")
+    fts_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS medicine_stock_fts USING fts5(
+            medicine_name, manufacturer, batch_number,
+            content='medicine_stock', content_rowid='id', prefix='2 3'
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS medicine_stock_fts_insert AFTER INSERT ON medicine_stock BEGIN
+            INSERT INTO medicine_stock_fts (rowid, medicine_name, manufacturer, batch_number)
+            VALUES (new.id, new.medicine_name, new.manufacturer, new.batch_number);
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS medicine_stock_fts_delete AFTER DELETE ON medicine_stock BEGIN
+            INSERT INTO medicine_stock_fts (medicine_stock_fts, rowid, medicine_name, manufacturer, batch_number)
+            VALUES ('delete', old.id, old.medicine_name, old.manufacturer, old.batch_number);
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS medicine_stock_fts_update
+        AFTER UPDATE OF medicine_name, manufacturer, batch_number ON medicine_stock
+        WHEN old.medicine_name IS NOT new.medicine_name
+          OR old.manufacturer IS NOT new.manufacturer
+          OR old.batch_number IS NOT new.batch_number
+        BEGIN
+            INSERT INTO medicine_stock_fts (medicine_stock_fts, rowid, medicine_name, manufacturer, batch_number)
+            VALUES ('delete', old.id, old.medicine_name, old.manufacturer, old.batch_number);
+            INSERT INTO medicine_stock_fts (rowid, medicine_name, manufacturer, batch_number)
+            VALUES (new.id, new.medicine_name, new.manufacturer, new.batch_number);
+        END
+    ''')
+    
+    # Index stock rows that existed before the search table was created
+    if not fts_exists:
+        cursor.execute("INSERT INTO medicine_stock_fts (medicine_stock_fts) VALUES ('rebuild')")
+
+# Recompute one medicine's availability at one pharmacy from its usable batches
+AVAILABILITY_REFRESH_SQL = '''
+    DELETE FROM medicine_availability
+    WHERE medicine_id = {row}.medicine_id AND pharmacy_id = {row}.pharmacy_id;
+    INSERT INTO medicine_availability
+    (medicine_id, pharmacy_id, medicine_key, medicine_name, available_quantity, min_price, next_expiry)
+    SELECT m.id, ms.pharmacy_id, m.normalized_name, m.name, SUM(ms.quantity), MIN(ms.price), MIN(ms.expiry_date)
+    FROM medicines m
+    JOIN medicine_stock ms ON ms.medicine_id = m.id AND ms.pharmacy_id = {row}.pharmacy_id
+    WHERE m.id = {row}.medicine_id
+      AND ms.quantity > 0 AND (ms.expiry_date IS NULL OR ms.expiry_date >= DATE('now', 'localtime'))
+    GROUP BY m.id, ms.pharmacy_id
+    HAVING SUM(ms.quantity) > 0;
+'''
+
+def rebuild_medicine_availability(cursor):
+    """Rebuild the global availability index from all in-stock, unexpired batches"""
+    cursor.execute('DELETE FROM medicine_availability')
+    cursor.execute('''
+        INSERT INTO medicine_availability
+        (medicine_id, pharmacy_id, medicine_key, medicine_name, available_quantity, min_price, next_expiry)
+        SELECT m.id, ms.pharmacy_id, m.normalized_name, m.name, SUM(ms.quantity), MIN(ms.price), MIN(ms.expiry_date)
+        FROM medicine_stock ms
+        JOIN medicines m ON m.id = ms.medicine_id
+        WHERE ms.pharmacy_id IS NOT NULL AND ms.quantity > 0
+          AND (ms.expiry_date IS NULL OR ms.expiry_date >= DATE('now', 'localtime'))
+        GROUP BY m.id, ms.pharmacy_id
+    ''')
+
+def merge_duplicate_stock_batches(cursor):
+    """Merge stock rows that share a pharmacy, medicine and batch number into the oldest row"""
+    cursor.execute("UPDATE medicine_stock SET batch_number = '' WHERE batch_number IS NULL")
+    
+    cursor.execute('''
+        CREATE TEMP TABLE stock_batch_merge AS
+        SELECT ms.id AS stock_id, dup.keep_id
+        FROM medicine_stock ms
+        JOIN (
+            SELECT pharmacy_id, medicine_name, batch_number, MIN(id) AS keep_id
+            FROM medicine_stock
+            GROUP BY pharmacy_id, medicine_name, batch_number
+            HAVING COUNT(*) > 1
+        ) dup ON ms.pharmacy_id IS dup.pharmacy_id
+             AND ms.medicine_name = dup.medicine_name
+             AND ms.batch_number = dup.batch_number
+        WHERE ms.id != dup.keep_id
+    ''')
+    
+    cursor.execute('''
+        UPDATE medicine_stock
+        SET quantity = quantity + (
+            SELECT SUM(d.quantity)
+            FROM stock_batch_merge m
+            JOIN medicine_stock d ON d.id = m.stock_id
+            WHERE m.keep_id = medicine_stock.id
+        )
+        WHERE id IN (SELECT keep_id FROM stock_batch_merge)
+    ''')
+    
+    cursor.execute('''
+        UPDATE order_allocations
+        SET stock_id = (SELECT keep_id FROM stock_batch_merge WHERE stock_id = order_allocations.stock_id)
+        WHERE stock_id IN (SELECT stock_id FROM stock_batch_merge)
+    ''')
+    
+    cursor.execute('DELETE FROM expiry_alerts WHERE stock_id IN (SELECT stock_id FROM stock_batch_merge)')
+    cursor.execute('DELETE FROM medicine_stock WHERE id IN (SELECT stock_id FROM stock_batch_merge)')
+    cursor.execute('DROP TABLE stock_batch_merge')
+
+def create_triggers(cursor):
+    """Create triggers that keep summary tables in step with their source tables"""
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS order_stats_insert AFTER INSERT ON orders BEGIN
+            INSERT INTO order_stats (pharmacy_id, status, order_count, total_amount)
+            VALUES (new.pharmacy_id, new.status, 1, COALESCE(new.total_amount, 0))
+            ON CONFLICT (pharmacy_id, status) DO UPDATE SET
+                order_count = order_count + 1,
+                total_amount = total_amount + excluded.total_amount;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS order_stats_update
+        AFTER UPDATE OF status, pharmacy_id, total_amount ON orders BEGIN
+            UPDATE order_stats
+            SET order_count = order_count - 1,
+                total_amount = total_amount - COALESCE(old.total_amount, 0)
+            WHERE pharmacy_id = old.pharmacy_id AND status = old.status;
+            INSERT INTO order_stats (pharmacy_id, status, order_count, total_amount)
+            VALUES (new.pharmacy_id, new.status, 1, COALESCE(new.total_amount, 0))
+            ON CONFLICT (pharmacy_id, status) DO UPDATE SET
+                order_count = order_count + 1,
+                total_amount = total_amount + excluded.total_amount;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS order_stats_delete AFTER DELETE ON orders BEGIN
+            UPDATE order_stats
+            SET order_count = order_count - 1,
+                total_amount = total_amount - COALESCE(old.total_amount, 0)
+            WHERE pharmacy_id = old.pharmacy_id AND status = old.status;
+        END
+    ''')
+    
+    # Sales rollups are updated in the same transaction that marks an order delivered
+    rollup_statements = "".join(f'''
+            INSERT INTO sales_rollups (pharmacy_id, period, period_start, medicine_name, order_count, units, revenue)
+            VALUES (new.pharmacy_id, '{period}', {period_start.format(date="COALESCE(new.delivery_date, DATETIME('now', 'localtime'))")},
+                    TRIM(new.medicine_name), 1, new.quantity, COALESCE(new.total_amount, 0))
+            ON CONFLICT (pharmacy_id, period, period_start, medicine_name) DO UPDATE SET
+                order_count = order_count + 1,
+                units = units + excluded.units,
+                revenue = revenue + excluded.revenue;''' for period, period_start in SALES_PERIOD_STARTS.items())
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS sales_rollups_delivered
+        AFTER UPDATE OF status ON orders
+        WHEN new.status = 'Delivered' AND old.status IS NOT 'Delivered'
+        BEGIN{rollup_statements}
+        END
+    ''')
+    
+    # Keep the availability index in step with stock changes
+    # A new usable batch only adds to its medicine's totals, so inserts (e.g. bulk imports) skip the recompute
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS medicine_availability_insert AFTER INSERT ON medicine_stock
+        WHEN new.medicine_id IS NOT NULL AND new.quantity > 0
+         AND (new.expiry_date IS NULL OR new.expiry_date >= DATE('now', 'localtime')) BEGIN
+            INSERT INTO medicine_availability
+            (medicine_id, pharmacy_id, medicine_key, medicine_name, available_quantity, min_price, next_expiry)
+            SELECT m.id, new.pharmacy_id, m.normalized_name, m.name, new.quantity, new.price, new.expiry_date
+            FROM medicines m
+            WHERE m.id = new.medicine_id
+            ON CONFLICT (medicine_id, pharmacy_id) DO UPDATE SET
+                available_quantity = available_quantity + excluded.available_quantity,
+                min_price = MIN(min_price, excluded.min_price),
+                next_expiry = MIN(next_expiry, excluded.next_expiry);
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS medicine_availability_update
+        AFTER UPDATE OF medicine_id, pharmacy_id, quantity, price, expiry_date ON medicine_stock BEGIN
+            {AVAILABILITY_REFRESH_SQL.format(row="old")}
+            {AVAILABILITY_REFRESH_SQL.format(row="new")}
+        END
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS medicine_availability_delete AFTER DELETE ON medicine_stock BEGIN
+            {AVAILABILITY_REFRESH_SQL.format(row="old")}
+        END
+    ''')
+    
+    # Keep the pharmacy R*Tree in step with pharmacy coordinates
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pharmacy_locations_insert AFTER INSERT ON pharmacies
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT INTO pharmacy_locations (id, min_lat, max_lat, min_lon, max_lon)
+            VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pharmacy_locations_update AFTER UPDATE OF latitude, longitude ON pharmacies BEGIN
+            DELETE FROM pharmacy_locations WHERE id = old.id;
+            INSERT INTO pharmacy_locations (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS pharmacy_locations_delete AFTER DELETE ON pharmacies BEGIN
+            DELETE FROM pharmacy_locations WHERE id = old.id;
+        END
+    ''')
+    
+    # Adherence rollups follow dose events (each event moves one count between taken/late/skipped)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS adherence_rollups_insert AFTER INSERT ON dose_events BEGIN
+            INSERT INTO adherence_rollups
+            (reminder_id, day, patient_id, family_member_id, scheduled_doses, taken, late, skipped)
+            SELECT r.id, new.scheduled_date, r.patient_id, r.family_member_id, {REMINDER_DOSES_PER_DAY_SQL},
+                   new.status = 'Taken', new.status = 'Late', new.status = 'Skipped'
+            FROM medicine_reminders r
+            WHERE r.id = new.reminder_id
+            ON CONFLICT (reminder_id, day) DO UPDATE SET
+                taken = taken + excluded.taken,
+                late = late + excluded.late,
+                skipped = skipped + excluded.skipped;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS adherence_rollups_update AFTER UPDATE OF status ON dose_events BEGIN
+            UPDATE adherence_rollups
+            SET taken = taken - (old.status = 'Taken') + (new.status = 'Taken'),
+                late = late - (old.status = 'Late') + (new.status = 'Late'),
+                skipped = skipped - (old.status = 'Skipped') + (new.status = 'Skipped')
+            WHERE reminder_id = new.reminder_id AND day = new.scheduled_date;
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS adherence_rollups_delete AFTER DELETE ON dose_events BEGIN
+            UPDATE adherence_rollups
+            SET taken = taken - (old.status = 'Taken'),
+                late = late - (old.status = 'Late'),
+                skipped = skipped - (old.status = 'Skipped')
+            WHERE reminder_id = old.reminder_id AND day = old.scheduled_date;
+        END
+    ''')
+    
+    # Write versions: every change to a cached table bumps its owner's counter (both owners if a row moves)
+    for table, scopes in WRITE_VERSION_SCOPES.items():
+        bumps = {
+            'insert': [(scope, f"new.{column}", "1") for scope, column in scopes],
+            'delete': [(scope, f"old.{column}", "1") for scope, column in scopes],
+            'update': [(scope, f"old.{column}", "1") for scope, column in scopes] +
+                      [(scope, f"new.{column}", f"new.{column} IS NOT old.{column}") for scope, column in scopes],
+        }
+        for event, statements in bumps.items():
+            body = "".join(WRITE_VERSION_BUMP_SQL.format(scope=scope, owner=owner, condition=condition)
+                           for scope, owner, condition in statements)
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS write_versions_{table}_{event} AFTER {event.upper()} ON {table}
+                BEGIN{body}
+                END
+            ''')
+    
+    # Names shown next to other owners' rows (patients on pharmacy orders, pharmacies on patient orders)
+    for table, columns in (("users", "full_name, phone"), ("pharmacies", "pharmacy_name")):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS write_versions_{table}_names AFTER UPDATE OF {columns} ON {table}
+            BEGIN{WRITE_VERSION_BUMP_SQL.format(scope="names", owner=0, condition=1)}
+            END
+        ''')
+    
+    # The stock ledger is append-only
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_movements_no_update BEFORE UPDATE ON stock_movements BEGIN
+            SELECT RAISE(ABORT, 'stock_movements is append-only');
+        END
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_movements_no_delete BEFORE DELETE ON stock_movements BEGIN
+            SELECT RAISE(ABORT, 'stock_movements is append-only');
+        END
+    ''')
+
 def hash_password(password):
     """Hash password using SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
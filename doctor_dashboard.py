@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 from database import get_db_connection, get_doctor_id
 from chat_system import doctor_chat_interface
+from drug_interactions import get_family_interactions
+from adherence_service import get_family_adherence, ADHERENCE_DAYS
+from family_service import get_family_members, get_illness_history, get_active_reminders
+from render_profiler import profile_section
+from list_view import list_table
+from temporal import ages, calculate_age, days_since
+from records import fetch_record
+from write_queue import run_write
 
+@profile_section
 def doctor_dashboard():
     """Doctor dashboard with patient management and chat"""
     st.title("👨‍⚕️ Doctor Dashboard")
@@ -27,6 +35,7 @@ def doctor_dashboard():
     with tab3:
         doctor_profile_settings()
 
+@profile_section
 def patient_records_dashboard(doctor_id):
     """View and manage patient records"""
     st.subheader("📋 Patient Records Management")
@@ -58,118 +67,127 @@ def patient_records_dashboard(doctor_id):
     patients = pd.read_sql_query(query, conn, params=params)
     
     if not patients.empty:
-        # Display patients in cards
-        for index, patient in patients.iterrows():
-            with st.container():
-                col1, col2, col3 = st.columns([3, 2, 1])
-                
-                with col1:
-                    st.write(f"**{patient['full_name']}** (ID: {patient['id']})")
-                    st.write(f"📧 {patient['email']}")
-                    if patient['phone']:
-                        st.write(f"📞 {patient['phone']}")
-                
-                with col2:
-                    if patient['date_of_birth']:
-                        age = calculate_age(patient['date_of_birth'])
-                        st.write(f"Age: {age} years")
-                    if patient['gender']:
-                        st.write(f"Gender: {patient['gender']}")
-                    st.write(f"Illness Records: {patient['illness_count']}")
-                    st.write(f"Active Reminders: {patient['active_reminders']}")
-                
-                with col3:
-                    if st.button("View Details", key=f"view_{patient['id']}"):
-                        view_patient_details(patient['id'])
-                
-                st.divider()
+        patients['age'] = ages(patients['date_of_birth'])
+        
+        # Selecting a patient shows their details below the list
+        selected = list_table(
+            patients, "doctor_patients",
+            ['id', 'full_name', 'email', 'phone', 'age', 'gender', 'illness_count', 'active_reminders'],
+            column_config={
+                'id': st.column_config.NumberColumn("ID", format="%d"),
+                'full_name': "Name",
+                'email': "📧 Email",
+                'phone': "📞 Phone",
+                'age': st.column_config.NumberColumn("Age", format="%d years"),
+                'gender': "Gender",
+                'illness_count': "Illness Records",
+                'active_reminders': "Active Reminders",
+            },
+            selection_mode="single-row"
+        )
+        
+        if not selected.empty:
+            st.divider()
+            view_patient_details(int(selected.iloc[0]['id']))
     else:
         st.info("No patients found.")
     
     conn.close()
 
+@profile_section
 def view_patient_details(patient_user_id):
     """View detailed patient information"""
     conn = get_db_connection()
     
     # Get patient info
-    patient_info = pd.read_sql_query('''
-        SELECT u.*, p.*
+    patient = fetch_record(conn, '''
+        SELECT u.full_name, u.email, u.phone, p.id AS patient_id, p.date_of_birth, p.gender, p.address,
+               p.emergency_contact, p.emergency_email
         FROM users u
         JOIN patients p ON u.id = p.user_id
         WHERE u.id = ?
-    ''', conn, params=(patient_user_id,))
+    ''', (patient_user_id,))
     
-    if not patient_info.empty:
-        patient = patient_info.iloc[0]
-        
-        st.subheader(f"Patient Details: {patient['full_name']}")
+    if patient:
+        st.subheader(f"Patient Details: {patient.full_name}")
         
         # Basic info
         col1, col2 = st.columns(2)
         
         with col1:
             st.write("**Basic Information**")
-            st.write(f"Name: {patient['full_name']}")
-            st.write(f"Email: {patient['email']}")
-            st.write(f"Phone: {patient['phone'] or 'Not provided'}")
-            if patient['date_of_birth']:
-                age = calculate_age(patient['date_of_birth'])
+            st.write(f"Name: {patient.full_name}")
+            st.write(f"Email: {patient.email}")
+            st.write(f"Phone: {patient.phone or 'Not provided'}")
+            if patient.date_of_birth:
+                age = calculate_age(patient.date_of_birth)
                 st.write(f"Age: {age} years")
-            st.write(f"Gender: {patient['gender'] or 'Not specified'}")
+            st.write(f"Gender: {patient.gender or 'Not specified'}")
         
         with col2:
             st.write("**Contact Information**")
-            st.write(f"Address: {patient['address'] or 'Not provided'}")
-            st.write(f"Emergency Contact: {patient['emergency_contact'] or 'Not provided'}")
-            st.write(f"Emergency Email: {patient['emergency_email'] or 'Not provided'}")
+            st.write(f"Address: {patient.address or 'Not provided'}")
+            st.write(f"Emergency Contact: {patient.emergency_contact or 'Not provided'}")
+            st.write(f"Emergency Email: {patient.emergency_email or 'Not provided'}")
         
         # Get patient ID for queries
-        patient_id = patient['id']
+        patient_id = patient.patient_id
         
         # Family members
-        family_members = pd.read_sql_query('''
-            SELECT * FROM family_members WHERE patient_id = ?
-        ''', conn, params=(patient_id,))
+        family_members = get_family_members(patient_id)
         
-        if not family_members.empty:
+        if family_members:
             st.write("**Family Members**")
-            for _, member in family_members.iterrows():
-                st.write(f"- {member['name']} ({member['relationship']})")
+            for member in family_members:
+                st.write(f"- {member.name} ({member.relationship})")
         
         # Illness history
-        illness_history = pd.read_sql_query('''
-            SELECT ih.*, fm.name as family_member_name
-            FROM illness_history ih
-            LEFT JOIN family_members fm ON ih.family_member_id = fm.id
-            WHERE ih.patient_id = ?
-            ORDER BY ih.illness_date DESC
-            LIMIT 5
-        ''', conn, params=(patient_id,))
+        illness_history = get_illness_history(patient_id, limit=5)
         
-        if not illness_history.empty:
+        if illness_history:
             st.write("**Recent Illness History**")
-            for _, record in illness_history.iterrows():
-                person = record['family_member_name'] if record['family_member_name'] else "Patient"
-                days_since = (datetime.now().date() - datetime.strptime(record['illness_date'], '%Y-%m-%d').date()).days
-                st.write(f"- {record['illness_name']} ({person}) - {days_since} days ago")
+            days = days_since([record.illness_date for record in illness_history])
+            for record, days_ago in zip(illness_history, days):
+                person = record.family_member_name or "Patient"
+                st.write(f"- {record.illness_name} ({person}) - {days_ago} days ago")
         
         # Active medicine reminders
-        reminders = pd.read_sql_query('''
-            SELECT mr.*, fm.name as family_member_name
-            FROM medicine_reminders mr
-            LEFT JOIN family_members fm ON mr.family_member_id = fm.id
-            WHERE mr.patient_id = ? AND mr.is_active = 1
-        ''', conn, params=(patient_id,))
+        reminders = get_active_reminders(patient_id)
         
-        if not reminders.empty:
+        if reminders:
             st.write("**Active Medicine Reminders**")
-            for _, reminder in reminders.iterrows():
-                person = reminder['family_member_name'] if reminder['family_member_name'] else "Patient"
-                st.write(f"- {reminder['medicine_name']} ({reminder['dosage']}) - {person}")
+            for reminder in reminders:
+                person = reminder.family_member_name or "Patient"
+                st.write(f"- {reminder.medicine_name} ({reminder.dosage}) - {person}")
+            
+            for person in get_family_interactions(patient_id).values():
+                st.warning(f"⚠️ Possible drug interactions ({person['name'] or 'Patient'})")
+                for conflict in person['interactions']:
+                    st.write(f"- **{conflict['severity']}**: {conflict['medicine_a']} + {conflict['medicine_b']} — "
+                             f"{conflict['description']}")
+        
+        # Dose adherence from the daily rollups
+        adherence = get_family_adherence(patient_id)
+        if not adherence.empty:
+            st.write(f"**Medication Adherence (last {ADHERENCE_DAYS} days)**")
+            adherence['person'] = adherence['person'].replace({'Self': 'Patient'})
+            st.dataframe(
+                adherence.rename(columns={
+                    'person': 'Person',
+                    'scheduled': 'Scheduled',
+                    'taken': 'On Time',
+                    'late': 'Late',
+                    'skipped': 'Skipped',
+                    'adherence_pct': 'Adherence %',
+                    'on_time_pct': 'On Time %'
+                }),
+                hide_index=True,
+                width="stretch"
+            )
     
     conn.close()
 
+@profile_section
 def doctor_profile_settings():
     """Doctor profile settings"""
     st.subheader("⚙️ Profile Settings")
@@ -177,57 +195,48 @@ def doctor_profile_settings():
     conn = get_db_connection()
     
     # Get current doctor info
-    doctor_info = pd.read_sql_query('''
-        SELECT u.*, d.*
+    doctor = fetch_record(conn, '''
+        SELECT u.full_name, u.email, u.phone, d.specialization, d.license_number, d.clinic_address, d.consultation_fee
         FROM users u
         JOIN doctors d ON u.id = d.user_id
         WHERE u.id = ?
-    ''', conn, params=(st.session_state.user_id,))
+    ''', (st.session_state.user_id,))
+    conn.close()
     
-    if not doctor_info.empty:
-        doctor = doctor_info.iloc[0]
-        
+    if doctor:
         with st.form("doctor_profile"):
             col1, col2 = st.columns(2)
             
             with col1:
-                full_name = st.text_input("Full Name", value=doctor['full_name'])
-                email = st.text_input("Email", value=doctor['email'])
-                phone = st.text_input("Phone", value=doctor['phone'] or "")
-                specialization = st.text_input("Specialization", value=doctor['specialization'])
+                full_name = st.text_input("Full Name", value=doctor.full_name)
+                email = st.text_input("Email", value=doctor.email)
+                phone = st.text_input("Phone", value=doctor.phone or "")
+                specialization = st.text_input("Specialization", value=doctor.specialization)
             
             with col2:
-                license_number = st.text_input("License Number", value=doctor['license_number'])
-                clinic_address = st.text_area("Clinic Address", value=doctor['clinic_address'] or "")
-                consultation_fee = st.number_input("Consultation Fee", value=float(doctor['consultation_fee']) if doctor['consultation_fee'] else 0.0, min_value=0.0)
+                license_number = st.text_input("License Number", value=doctor.license_number)
+                clinic_address = st.text_area("Clinic Address", value=doctor.clinic_address or "")
+                consultation_fee = st.number_input("Consultation Fee", value=float(doctor.consultation_fee) if doctor.consultation_fee else 0.0, min_value=0.0)
             
             submit = st.form_submit_button("Update Profile", type="primary")
             
             if submit:
-                cursor = conn.cursor()
-                
-                # Update users table
-                cursor.execute('''
-                    UPDATE users SET full_name=?, email=?, phone=? WHERE id=?
-                ''', (full_name, email, phone, st.session_state.user_id))
+                # Session state is read here; the write itself runs on the writer thread
+                user_id = st.session_state.user_id
                 
-                # Update doctors table
-                cursor.execute('''
-                    UPDATE doctors 
-                    SET specialization=?, license_number=?, clinic_address=?, consultation_fee=?
-                    WHERE user_id=?
-                ''', (specialization, license_number, clinic_address, consultation_fee, st.session_state.user_id))
+                def write_profile(cursor):
+                    # Update users table
+                    cursor.execute('''
+                        UPDATE users SET full_name=?, email=?, phone=? WHERE id=?
+                    ''', (full_name, email, phone, user_id))
+                    
+                    # Update doctors table
+                    cursor.execute('''
+                        UPDATE doctors 
+                        SET specialization=?, license_number=?, clinic_address=?, consultation_fee=?
+                        WHERE user_id=?
+                    ''', (specialization, license_number, clinic_address, consultation_fee, user_id))
                 
-                conn.commit()
+                run_write(write_profile)
                 st.success("Profile updated successfully!")
                 st.rerun()
-    
-    conn.close()
-
-def calculate_age(birth_date):
-    """Calculate age from birth date"""
-    if isinstance(birth_date, str):
-        birth_date = datetime.strptime(birth_date, '%Y-%m-%d').date()
-    
-    today = datetime.now().date()
-    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
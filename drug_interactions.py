@@ -0,0 +1,137 @@
+import csv
+import os
+from functools import lru_cache
+from database import get_db_connection
+from medicine_catalogue import normalize_medicine_name
+from data_cache import versioned_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+INTERACTIONS_PATH = os.path.join(DATA_DIR, "drug_interactions.csv")
+ALIASES_PATH = os.path.join(DATA_DIR, "drug_aliases.csv")
+
+SEVERITY_ORDER = {"Major": 0, "Moderate": 1, "Minor": 2}
+
+# Normalized tokens that describe a dose or form rather than the drug itself
+DOSE_TOKENS = {
+    "mg", "g", "mcg", "ml", "iu", "sr", "er", "xr", "cr", "ds", "forte",
+    "tablet", "capsule", "syrup", "suspension", "injection", "drops", "cream", "gel", "ointment",
+}
+
+@lru_cache(maxsize=1)
+def load_interaction_table():
+    """Load the local dataset into ({drug name: drug id}, {(id, id) sorted pair: (severity, description)})"""
+    drug_ids = {}
+    
+    def drug_id(name):
+        return drug_ids.setdefault(normalize_medicine_name(name), len(drug_ids))
+    
+    interactions = {}
+    with open(INTERACTIONS_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            first, second = drug_id(row['drug_a']), drug_id(row['drug_b'])
+            interactions[(min(first, second), max(first, second))] = (row['severity'], row['description'])
+    
+    # Brand names and synonyms share the id of the drug they refer to
+    with open(ALIASES_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            drug_ids[normalize_medicine_name(row['alias'])] = drug_id(row['drug'])
+    
+    return drug_ids, interactions
+
+@lru_cache(maxsize=4096)
+def ingredient_id(medicine_name):
+    """Return the dataset id of the drug in a medicine name, e.g. 'Disprin 325mg Tablet' -> id of aspirin"""
+    drug_ids, _ = load_interaction_table()
+    tokens = [token for token in normalize_medicine_name(medicine_name).split()
+              if not token[0].isdigit() and token not in DOSE_TOKENS]
+    
+    # Longest leading run of words that names a known drug ("isosorbide mononitrate", then "isosorbide")
+    for end in range(len(tokens), 0, -1):
+        drug_id = drug_ids.get(" ".join(tokens[:end]))
+        if drug_id is not None:
+            return drug_id
+    
+    return None
+
+def _interaction(first_name, second_name, interactions):
+    """Return the interaction between two medicines as a dict, or None"""
+    first, second = ingredient_id(first_name), ingredient_id(second_name)
+    if first is None or second is None or first == second:
+        return None
+    
+    found = interactions.get((min(first, second), max(first, second)))
+    if found is None:
+        return None
+    
+    return {'medicine_a': first_name, 'medicine_b': second_name, 'severity': found[0], 'description': found[1]}
+
+def check_interactions(medicine_names):
+    """Return every interacting pair among a list of medicines, most severe first"""
+    _, interactions = load_interaction_table()
+    names = list(dict.fromkeys(medicine_names))
+    
+    conflicts = []
+    for i, first_name in enumerate(names):
+        for second_name in names[i + 1:]:
+            conflict = _interaction(first_name, second_name, interactions)
+            if conflict:
+                conflicts.append(conflict)
+    
+    return sorted(conflicts, key=lambda conflict: SEVERITY_ORDER.get(conflict['severity'], len(SEVERITY_ORDER)))
+
+def check_new_medicine(medicine_name, current_medicines):
+    """Return the interactions a new medicine would have with a person's current medicines"""
+    _, interactions = load_interaction_table()
+    
+    conflicts = []
+    for current_name in dict.fromkeys(current_medicines):
+        conflict = _interaction(medicine_name, current_name, interactions)
+        if conflict:
+            conflicts.append(conflict)
+    
+    return sorted(conflicts, key=lambda conflict: SEVERITY_ORDER.get(conflict['severity'], len(SEVERITY_ORDER)))
+
+@versioned_cache("reminders", owner="patient_id")
+def get_active_medicines(patient_id, family_member_id=None):
+    """Return the medicine names in a person's active reminders (family_member_id None means the patient)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT medicine_name FROM medicine_reminders
+        WHERE patient_id = ? AND family_member_id IS ? AND is_active = 1
+    ''', (patient_id, family_member_id))
+    medicines = [row['medicine_name'] for row in cursor.fetchall()]
+    conn.close()
+    
+    return medicines
+
+@versioned_cache("reminders", "family", owner="patient_id")
+def get_family_interactions(patient_id):
+    """Return {family_member_id: {'name', 'interactions'}} for everyone in a family with conflicting active reminders.
+    
+    Keyed by id so members with the same name stay apart; the patient is under None with name None.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT mr.family_member_id, fm.name AS person, mr.medicine_name
+        FROM medicine_reminders mr
+        LEFT JOIN family_members fm ON mr.family_member_id = fm.id
+        WHERE mr.patient_id = ? AND mr.is_active = 1
+    ''', (patient_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    
+    people = {}
+    medicines_by_person = {}
+    for row in rows:
+        people[row['family_member_id']] = row['person']
+        medicines_by_person.setdefault(row['family_member_id'], []).append(row['medicine_name'])
+    
+    family_interactions = {}
+    for family_member_id, medicines in medicines_by_person.items():
+        conflicts = check_interactions(medicines)
+        if conflicts:
+            family_interactions[family_member_id] = {'name': people[family_member_id], 'interactions': conflicts}
+    
+    return family_interactions
@@ -0,0 +1,51 @@
+from database import get_db_connection
+from data_cache import versioned_cache
+from records import fetch_records
+
+@versioned_cache("family", owner="patient_id")
+def get_family_members(patient_id):
+    """Return a patient's family members as records, newest first"""
+    conn = get_db_connection()
+    family_members = fetch_records(conn, '''
+        SELECT * FROM family_members WHERE patient_id = ? ORDER BY created_at DESC, id DESC
+    ''', (patient_id,))
+    conn.close()
+    
+    return family_members
+
+@versioned_cache("illness", "family", owner="patient_id")
+def get_illness_history(patient_id, limit=None):
+    """Return a family's illness records, most recent first, with the family member's name"""
+    query = '''
+        SELECT ih.*, fm.name as family_member_name
+        FROM illness_history ih
+        LEFT JOIN family_members fm ON ih.family_member_id = fm.id
+        WHERE ih.patient_id = ?
+        ORDER BY ih.illness_date DESC
+    '''
+    params = [patient_id]
+    
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    
+    conn = get_db_connection()
+    illness_history = fetch_records(conn, query, params)
+    conn.close()
+    
+    return illness_history
+
+@versioned_cache("reminders", "family", owner="patient_id")
+def get_active_reminders(patient_id):
+    """Return a family's active medicine reminders as records, newest first, with the family member's name"""
+    conn = get_db_connection()
+    active_reminders = fetch_records(conn, '''
+        SELECT mr.*, fm.name as family_member_name
+        FROM medicine_reminders mr
+        LEFT JOIN family_members fm ON mr.family_member_id = fm.id
+        WHERE mr.patient_id = ? AND mr.is_active = 1
+        ORDER BY mr.created_at DESC
+    ''', (patient_id,))
+    conn.close()
+    
+    return active_reminders
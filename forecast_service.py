@@ -0,0 +1,114 @@
+import math
+import numpy as np
+import pandas as pd
+from database import get_db_connection
+from data_cache import versioned_cache
+
+# Days of order history used for forecasting
+HISTORY_DAYS = 90
+
+# Forecasting methods: simple moving average window and exponential smoothing factor
+MOVING_AVERAGE_DAYS = 28
+SMOOTHING_ALPHA = 0.3
+FORECAST_METHODS = ["Exponential Smoothing", "Moving Average"]
+
+def load_daily_demand(cursor, pharmacy_id, history_days=HISTORY_DAYS):
+    """Aggregate non-cancelled orders into a (medicines x days) NumPy array, oldest day first"""
+    # Catalogue-linked rows are keyed by medicine_id; any not yet linked fall back to the name
+    cursor.execute('''
+        SELECT COALESCE(medicine_id, LOWER(TRIM(medicine_name))) AS medicine_key,
+               MIN(TRIM(medicine_name)) AS medicine_name,
+               CAST(julianday(DATE('now', 'localtime')) - julianday(DATE(order_date, 'localtime')) AS INTEGER) AS days_ago,
+               SUM(quantity) AS quantity
+        FROM orders
+        WHERE pharmacy_id = ? AND status != 'Cancelled' AND order_date >= DATETIME('now', ?)
+        GROUP BY medicine_key, days_ago
+    ''', (pharmacy_id, f"-{history_days} days"))
+    rows = cursor.fetchall()
+    
+    medicine_index = {}
+    medicine_names = []
+    for row in rows:
+        if row['medicine_key'] not in medicine_index:
+            medicine_index[row['medicine_key']] = len(medicine_names)
+            medicine_names.append(row['medicine_name'])
+    
+    medicine_positions = np.fromiter((medicine_index[row['medicine_key']] for row in rows), dtype=np.int64, count=len(rows))
+    days_ago = np.fromiter((row['days_ago'] for row in rows), dtype=np.int64, count=len(rows))
+    quantities = np.fromiter((row['quantity'] for row in rows), dtype=np.float64, count=len(rows))
+    
+    # Column history_days - 1 is today
+    day_positions = np.clip(history_days - 1 - days_ago, 0, history_days - 1)
+    demand = np.zeros((len(medicine_names), history_days))
+    np.add.at(demand, (medicine_positions, day_positions), quantities)
+    
+    return list(medicine_index.keys()), medicine_names, demand
+
+def forecast_daily_demand(demand, method="Exponential Smoothing"):
+    """Forecast next-day demand for every medicine at once from a (medicines x days) array"""
+    if demand.shape[0] == 0:
+        return np.zeros(0)
+    
+    if method == "Moving Average":
+        return demand[:, -MOVING_AVERAGE_DAYS:].mean(axis=1)
+    
+    # Exponential smoothing unrolled into one weighted sum: the oldest day seeds the level
+    days = demand.shape[1]
+    weights = SMOOTHING_ALPHA * (1 - SMOOTHING_ALPHA) ** np.arange(days - 1, -1, -1)
+    weights[0] = (1 - SMOOTHING_ALPHA) ** (days - 1)
+    return demand @ weights
+
+@versioned_cache("orders", owner="pharmacy_id", daily=True)
+def get_demand_forecast(pharmacy_id, method="Exponential Smoothing"):
+    """Return (medicine_keys, medicine_names, daily_forecast), cached until the pharmacy's orders change"""
+    conn = get_db_connection()
+    medicine_keys, medicine_names, demand = load_daily_demand(conn.cursor(), pharmacy_id)
+    conn.close()
+    
+    return medicine_keys, medicine_names, forecast_daily_demand(demand, method)
+
+def get_reorder_suggestions(pharmacy_id, method="Exponential Smoothing", lead_time_days=3,
+                            safety_days=3, review_days=14):
+    """Suggest reorder quantities from forecast demand, usable stock and expiry.
+    
+    Stock expiring within the lead time is not counted as usable. A medicine is
+    flagged when usable stock falls below demand over lead time plus safety days,
+    and the suggestion tops it up to cover the review period as well.
+    """
+    medicine_keys, medicine_names, daily_demand = get_demand_forecast(pharmacy_id, method)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT COALESCE(medicine_id, LOWER(TRIM(medicine_name))) AS medicine_key,
+               SUM(CASE WHEN expiry_date IS NULL OR expiry_date > DATE('now', 'localtime', ?)
+                        THEN quantity ELSE 0 END) AS usable_quantity,
+               MIN(CASE WHEN quantity > 0 AND expiry_date >= DATE('now', 'localtime')
+                        THEN expiry_date END) AS next_expiry
+        FROM medicine_stock
+        WHERE pharmacy_id = ?
+        GROUP BY medicine_key
+    ''', (f"+{int(lead_time_days)} days", pharmacy_id))
+    stock = {row['medicine_key']: (row['usable_quantity'], row['next_expiry']) for row in cursor.fetchall()}
+    conn.close()
+    
+    usable = np.array([stock.get(key, (0, None))[0] for key in medicine_keys], dtype=np.float64)
+    next_expiry = [stock.get(key, (0, None))[1] for key in medicine_keys]
+    
+    reorder_point = daily_demand * (lead_time_days + safety_days)
+    target_stock = daily_demand * (lead_time_days + safety_days + review_days)
+    needs_reorder = (daily_demand > 0) & (usable < reorder_point)
+    suggested = np.ceil(np.maximum(target_stock - usable, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(daily_demand > 0, usable / daily_demand, math.inf)
+    
+    suggestions = pd.DataFrame({
+        'medicine_name': medicine_names,
+        'daily_demand': np.round(daily_demand, 2),
+        'usable_stock': usable.astype(int),
+        'days_of_cover': np.round(days_of_cover, 1),
+        'next_expiry': next_expiry,
+        'suggested_quantity': suggested.astype(int),
+    })
+    
+    return suggestions[needs_reorder].sort_values('days_of_cover').reset_index(drop=True)
@@ -0,0 +1,59 @@
+import streamlit as st
+
+def _table_key(key):
+    """Widget key for a table; bumping the generation gives a fresh table with nothing selected"""
+    return f"{key}_{st.session_state.get(f'{key}_generation', 0)}"
+
+def clear_selection(key):
+    """Deselect every row of a table on the next rerun (call before st.rerun after acting on a selection)"""
+    st.session_state[f"{key}_generation"] = st.session_state.get(f"{key}_generation", 0) + 1
+
+def list_table(rows, key, columns, column_config=None, selection_mode=None, id_column="id"):
+    """Render rows as one interactive table instead of a block of widgets per row.
+    
+    columns picks and orders the visible columns; the returned selection keeps
+    every column of rows. With selection_mode "single-row" or "multi-row" the
+    selected rows are returned; a selection made while the table showed other
+    rows (a new page, filter or someone else's write) is dropped.
+    """
+    if selection_mode is None:
+        st.dataframe(rows[columns], column_config=column_config, hide_index=True, width="stretch")
+        return rows.iloc[0:0]
+    
+    # Selections are positions, so remember which ids the table showed to detect shifted rows
+    ids_key = f"{key}_ids"
+    ids = rows[id_column].tolist()
+    if st.session_state.get(ids_key, ids) != ids:
+        clear_selection(key)
+    st.session_state[ids_key] = ids
+    
+    event = st.dataframe(
+        rows[columns],
+        key=_table_key(key),
+        column_config=column_config,
+        hide_index=True,
+        width="stretch",
+        on_select="rerun",
+        selection_mode=selection_mode
+    )
+    
+    positions = [position for position in event.selection.rows if position < len(rows)]
+    return rows.iloc[positions]
+
+def selection_actions(selected, key, actions):
+    """One button per action for the selected rows.
+    
+    actions is a list of (label, eligible, handler): eligible(rows) returns a boolean
+    mask of the rows the action applies to, and handler(rows) is called with those
+    rows when the button is clicked. The selection is cleared before the handler runs.
+    """
+    columns = st.columns(len(actions) + 1)
+    columns[0].caption(f"{len(selected)} selected" if not selected.empty else "Select rows in the table to act on them")
+    
+    for column, (label, eligible, handler) in zip(columns[1:], actions):
+        rows = selected[eligible(selected)] if not selected.empty else selected
+        button_label = f"{label} ({len(rows)})" if len(selected) > 1 else label
+        with column:
+            if st.button(button_label, key=f"{key}_{label.lower()}", disabled=rows.empty, width="stretch"):
+                clear_selection(key)
+                handler(rows)
@@ -0,0 +1,120 @@
+import math
+import pandas as pd
+from database import get_db_connection
+from medicine_catalogue import normalize_medicine_name
+from write_queue import run_write
+
+EARTH_RADIUS_KM = 6371.0088
+# Derived from the same radius as haversine_km, so the prefilter box always contains the search circle
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+# The search box starts small and doubles until k pharmacies are found or the limit is reached
+NEAREST_START_RADIUS_KM = 2.0
+NEAREST_MAX_RADIUS_KM = 200.0
+
+NEAREST_COLUMNS = ["pharmacy_id", "pharmacy_name", "address", "latitude", "longitude",
+                   "medicine_name", "available_quantity", "min_price", "distance_km"]
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) boxes covering a circle, split at the antimeridian"""
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+    
+    # Near the poles the circle covers every longitude
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    if widest_lat >= 89.9:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    
+    delta_lon = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(widest_lat)))
+    if delta_lon >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    
+    min_lon = longitude - delta_lon
+    max_lon = longitude + delta_lon
+    
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+def _pharmacies_in_box(cursor, box, medicine_name, min_quantity):
+    """Return pharmacies inside one box, optionally only those stocking a medicine"""
+    if medicine_name:
+        # CROSS JOIN keeps the R*Tree as the outer loop so only pharmacies in the box are probed
+        cursor.execute('''
+            SELECT p.id AS pharmacy_id, p.pharmacy_name, p.address, p.latitude, p.longitude,
+                   ma.medicine_name, ma.available_quantity, ma.min_price
+            FROM pharmacy_locations loc
+            CROSS JOIN medicine_availability ma ON ma.medicine_key = ? AND ma.pharmacy_id = loc.id
+            JOIN pharmacies p ON p.id = loc.id
+            WHERE loc.max_lat >= ? AND loc.min_lat <= ? AND loc.max_lon >= ? AND loc.min_lon <= ?
+              AND ma.available_quantity >= ?
+        ''', (normalize_medicine_name(medicine_name), *box, min_quantity))
+    else:
+        cursor.execute('''
+            SELECT p.id AS pharmacy_id, p.pharmacy_name, p.address, p.latitude, p.longitude,
+                   NULL AS medicine_name, NULL AS available_quantity, NULL AS min_price
+            FROM pharmacy_locations loc
+            JOIN pharmacies p ON p.id = loc.id
+            WHERE loc.max_lat >= ? AND loc.min_lat <= ? AND loc.max_lon >= ? AND loc.min_lon <= ?
+        ''', box)
+    
+    return cursor.fetchall()
+
+def find_nearest_pharmacies(latitude, longitude, medicine_name=None, k=5, min_quantity=1,
+                            max_radius_km=NEAREST_MAX_RADIUS_KM):
+    """Return the k nearest pharmacies (optionally with a medicine in stock), closest first.
+    
+    The R*Tree is queried with a bounding box that doubles in size until it holds
+    k pharmacies within the search radius, so only nearby rows are ever read.
+    Distances are exact haversine distances.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    radius_km = min(NEAREST_START_RADIUS_KM, max_radius_km)
+    
+    while True:
+        found = {}
+        for box in bounding_boxes(latitude, longitude, radius_km):
+            for row in _pharmacies_in_box(cursor, box, medicine_name, min_quantity):
+                distance_km = haversine_km(latitude, longitude, row['latitude'], row['longitude'])
+                # Box corners lie outside the circle, so only pharmacies within the radius are certain
+                if distance_km <= radius_km:
+                    found[row['pharmacy_id']] = dict(row, distance_km=distance_km)
+        
+        if len(found) >= k or radius_km >= max_radius_km:
+            break
+        radius_km = min(radius_km * 2, max_radius_km)
+    
+    conn.close()
+    
+    nearest = sorted(found.values(), key=lambda row: row['distance_km'])[:k]
+    for row in nearest:
+        row['distance_km'] = round(row['distance_km'], 2)
+    
+    return pd.DataFrame(nearest, columns=NEAREST_COLUMNS)
+
+def get_patient_location(patient_id):
+    """Return a patient's saved (latitude, longitude), or (None, None)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT latitude, longitude FROM patients WHERE id = ?', (patient_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    return (row['latitude'], row['longitude']) if row else (None, None)
+
+def set_patient_location(patient_id, latitude, longitude):
+    """Save a patient's coordinates for nearest-pharmacy searches"""
+    run_write(lambda cursor: cursor.execute('UPDATE patients SET latitude = ?, longitude = ? WHERE id = ?',
+                                            (latitude, longitude, patient_id)))
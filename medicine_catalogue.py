@@ -0,0 +1,178 @@
+import difflib
+import re
+
+# Tables whose free-text medicine_name is linked to the catalogue through medicine_id
+MEDICINE_TABLES = ["medicine_stock", "orders", "medicine_reminders"]
+
+# Minimum similarity (0-1) for a catalogue entry to be suggested as the intended spelling of a new name
+FUZZY_MATCH_CUTOFF = 0.88
+
+# Catalogue names compared on each side of a new name (in sort order) when suggesting matches
+FUZZY_NEIGHBOURS = 25
+
+# Spellings folded together when normalizing names
+TOKEN_ALIASES = {
+    "mgs": "mg", "milligram": "mg", "milligrams": "mg",
+    "gm": "g", "gms": "g", "gram": "g", "grams": "g",
+    "microgram": "mcg", "micrograms": "mcg", "ug": "mcg",
+    "mls": "ml", "millilitre": "ml", "milliliter": "ml",
+    "tab": "tablet", "tabs": "tablet", "tablets": "tablet",
+    "cap": "capsule", "caps": "capsule", "capsules": "capsule",
+    "syp": "syrup",
+}
+
+def normalize_medicine_name(name):
+    """Normalize a medicine name, e.g. 'Paracetamol 500mg Tabs' -> 'paracetamol 500 mg tablet'"""
+    tokens = re.findall(r"\d+(?:\.\d+)?|[a-z]+", (name or "").lower())
+    return " ".join(TOKEN_ALIASES.get(token, token) for token in tokens)
+
+def _strengths(normalized_name):
+    """Return the numeric tokens of a normalized name (strengths must match exactly)"""
+    return [token for token in normalized_name.split() if token[0].isdigit()]
+
+def suggest_medicine_matches(cursor, name, limit=3):
+    """Return up to limit (medicine_id, name) catalogue entries that look like a misspelling of name.
+    
+    Names already in the catalogue get no suggestions. Suggestions are never linked
+    automatically: different drugs often differ by a letter or two (prednisone and
+    prednisolone), so a person confirms a match with link_medicine_alias.
+    """
+    normalized_name = normalize_medicine_name(name)
+    if not normalized_name:
+        return []
+    
+    cursor.execute('SELECT 1 FROM medicine_aliases WHERE alias = ?', (normalized_name,))
+    if cursor.fetchone():
+        return []
+    
+    # Misspellings usually sort next to the intended name, so only the nearest names on
+    # either side are compared; this keeps each lookup cheap however large the catalogue grows
+    cursor.execute('''
+        SELECT id, name, normalized_name FROM medicines
+        WHERE normalized_name < ? ORDER BY normalized_name DESC LIMIT ?
+    ''', (normalized_name, FUZZY_NEIGHBOURS))
+    candidates = {row['normalized_name']: (row['id'], row['name']) for row in cursor.fetchall()}
+    
+    cursor.execute('''
+        SELECT id, name, normalized_name FROM medicines
+        WHERE normalized_name > ? ORDER BY normalized_name LIMIT ?
+    ''', (normalized_name, FUZZY_NEIGHBOURS))
+    candidates.update({row['normalized_name']: (row['id'], row['name']) for row in cursor.fetchall()})
+    
+    # A different strength is a different product however similar the names look
+    strengths = _strengths(normalized_name)
+    same_strength = [candidate for candidate in candidates if _strengths(candidate) == strengths]
+    
+    matches = difflib.get_close_matches(normalized_name, same_strength, n=limit, cutoff=FUZZY_MATCH_CUTOFF)
+    return [candidates[match] for match in matches]
+
+def resolve_medicine_id(cursor, name):
+    """Return the catalogue id for a medicine name, adding the medicine if it is new.
+    
+    Only an exact match on the normalized name or a confirmed alias links to an
+    existing entry; close spellings become new entries until a person links them.
+    """
+    normalized_name = normalize_medicine_name(name)
+    if not normalized_name:
+        return None
+    
+    cursor.execute('SELECT medicine_id FROM medicine_aliases WHERE alias = ?', (normalized_name,))
+    alias = cursor.fetchone()
+    if alias:
+        return alias['medicine_id']
+    
+    cursor.execute('''
+        INSERT INTO medicines (name, normalized_name) VALUES (?, ?)
+        ON CONFLICT (normalized_name) DO NOTHING
+    ''', (name.strip(), normalized_name))
+    cursor.execute('SELECT id FROM medicines WHERE normalized_name = ?', (normalized_name,))
+    medicine_id = cursor.fetchone()['id']
+    
+    cursor.execute('''
+        INSERT INTO medicine_aliases (alias, medicine_id) VALUES (?, ?)
+        ON CONFLICT (alias) DO NOTHING
+    ''', (normalized_name, medicine_id))
+    
+    return medicine_id
+
+def link_medicine_alias(cursor, name, medicine_id):
+    """Record a person's confirmation that name is another spelling of catalogue entry medicine_id.
+    
+    The entry name was filed under (if any) is merged into medicine_id: its rows and
+    aliases move across and the emptied entry is removed.
+    """
+    normalized_name = normalize_medicine_name(name)
+    if not normalized_name:
+        return
+    
+    cursor.execute('SELECT medicine_id FROM medicine_aliases WHERE alias = ?', (normalized_name,))
+    alias = cursor.fetchone()
+    previous_id = alias['medicine_id'] if alias else None
+    
+    if previous_id is not None and previous_id != medicine_id:
+        for table in MEDICINE_TABLES:
+            cursor.execute(f'UPDATE {table} SET medicine_id = ? WHERE medicine_id = ?', (medicine_id, previous_id))
+        cursor.execute('UPDATE medicine_aliases SET medicine_id = ? WHERE medicine_id = ?', (medicine_id, previous_id))
+        cursor.execute('DELETE FROM medicines WHERE id = ?', (previous_id,))
+    
+    cursor.execute('''
+        INSERT INTO medicine_aliases (alias, medicine_id, confirmed) VALUES (?, ?, 1)
+        ON CONFLICT (alias) DO UPDATE SET medicine_id = excluded.medicine_id, confirmed = 1
+    ''', (normalized_name, medicine_id))
+
+def resolve_medicine_ids(cursor, names):
+    """Resolve many names at once, returning {name: medicine_id}"""
+    return {name: resolve_medicine_id(cursor, name) for name in set(names)}
+
+def backfill_medicine_ids(cursor):
+    """Link rows that have no medicine_id yet to the catalogue; returns the number of rows linked"""
+    linked = 0
+    
+    for table in MEDICINE_TABLES:
+        cursor.execute(f'SELECT DISTINCT medicine_name FROM {table} WHERE medicine_id IS NULL')
+        names = [row['medicine_name'] for row in cursor.fetchall()]
+        medicine_ids = resolve_medicine_ids(cursor, names)
+        
+        # One UPDATE through a temporary name -> id map instead of one table scan per name
+        cursor.execute('CREATE TEMP TABLE medicine_name_ids (medicine_name TEXT PRIMARY KEY, medicine_id INTEGER NOT NULL)')
+        cursor.executemany('INSERT INTO medicine_name_ids (medicine_name, medicine_id) VALUES (?, ?)',
+                           [(name, medicine_id) for name, medicine_id in medicine_ids.items() if medicine_id is not None])
+        cursor.execute(f'''
+            UPDATE {table}
+            SET medicine_id = (SELECT m.medicine_id FROM medicine_name_ids m WHERE m.medicine_name = {table}.medicine_name)
+            WHERE medicine_id IS NULL AND medicine_name IN (SELECT medicine_name FROM medicine_name_ids)
+        ''')
+        linked += cursor.rowcount
+        cursor.execute('DROP TABLE medicine_name_ids')
+    
+    return linked
+
+def drop_unconfirmed_aliases(cursor):
+    """Remove aliases that link a spelling to a differently named entry without confirmation.
+    
+    Earlier versions wrote these automatically from fuzzy matches. Rows linked through
+    them are relinked by their own name; returns the number of aliases removed.
+    """
+    cursor.execute('''
+        SELECT a.alias, a.medicine_id
+        FROM medicine_aliases a
+        JOIN medicines m ON m.id = a.medicine_id
+        WHERE a.confirmed = 0 AND a.alias != m.normalized_name
+    ''')
+    aliases = {row['alias']: row['medicine_id'] for row in cursor.fetchall()}
+    if not aliases:
+        return 0
+    
+    cursor.executemany('DELETE FROM medicine_aliases WHERE alias = ?', [(alias,) for alias in aliases])
+    
+    medicine_ids = sorted(set(aliases.values()))
+    placeholders = ", ".join("?" * len(medicine_ids))
+    for table in MEDICINE_TABLES:
+        cursor.execute(f'SELECT id, medicine_name, medicine_id FROM {table} WHERE medicine_id IN ({placeholders})',
+                       medicine_ids)
+        unlinked = [(row['id'],) for row in cursor.fetchall()
+                    if aliases.get(normalize_medicine_name(row['medicine_name'])) == row['medicine_id']]
+        cursor.executemany(f'UPDATE {table} SET medicine_id = NULL WHERE id = ?', unlinked)
+    
+    backfill_medicine_ids(cursor)
+    return len(aliases)
@@ -0,0 +1,333 @@
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from database import get_db_connection
+from stock_ledger import record_stock_movement
+from stock_service import sweep_expiry_alerts
+from medicine_catalogue import normalize_medicine_name
+from data_cache import versioned_cache
+from write_queue import run_write
+
+ORDER_STATUSES = ["Pending", "Confirmed", "Delivered", "Cancelled"]
+
+def get_order_statistics(pharmacy_id):
+    """Return order counts per status and delivered revenue from the order_stats counters"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT status, order_count, total_amount
+        FROM order_stats
+        WHERE pharmacy_id = ?
+    ''', (pharmacy_id,))
+    
+    status_counts = {status: 0 for status in ORDER_STATUSES}
+    total_revenue = 0.0
+    
+    for row in cursor.fetchall():
+        status_counts[row['status']] = row['order_count']
+        if row['status'] == 'Delivered':
+            total_revenue = row['total_amount']
+    
+    conn.close()
+    
+    return {
+        'total_orders': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'total_revenue': total_revenue
+    }
+
+@versioned_cache("orders", owner="pharmacy_id", global_scopes=("names",))
+def get_pharmacy_orders(pharmacy_id, status=None, page=1, page_size=25):
+    """Return one page of a pharmacy's orders, newest first, optionally filtered by status"""
+    query = '''
+        SELECT o.*, u.full_name as patient_name, u.phone as patient_phone
+        FROM orders o
+        JOIN patients p ON o.patient_id = p.id
+        JOIN users u ON p.user_id = u.id
+        WHERE o.pharmacy_id = ?
+    '''
+    params = [pharmacy_id]
+    
+    if status:
+        query += " AND o.status = ?"
+        params.append(status)
+    
+    query += " ORDER BY o.order_date DESC, o.id DESC LIMIT ? OFFSET ?"
+    params += [page_size, (max(page, 1) - 1) * page_size]
+    
+    conn = get_db_connection()
+    orders = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return orders
+
+def allocate_order_stock(cursor, order):
+    """Allocate an order's quantity across unexpired batches, first expiry first out.
+    
+    Must be called inside a write transaction. Returns (success, message, allocated_value).
+    """
+    # Orders linked to the catalogue match every batch of the same medicine, however it was spelled
+    if order['medicine_id'] is not None:
+        medicine_filter = "medicine_id = ?"
+        medicine_param = order['medicine_id']
+    else:
+        medicine_filter = "medicine_name = ? COLLATE NOCASE"
+        medicine_param = order['medicine_name'].strip()
+    
+    cursor.execute(f'''
+        SELECT id, quantity, price
+        FROM medicine_stock
+        WHERE pharmacy_id = ? AND {medicine_filter}
+          AND quantity > 0 AND (expiry_date IS NULL OR expiry_date >= DATE('now', 'localtime'))
+        ORDER BY expiry_date IS NULL, expiry_date, id
+    ''', (order['pharmacy_id'], medicine_param))
+    batches = cursor.fetchall()
+    
+    remaining = order['quantity']
+    available = sum(batch['quantity'] for batch in batches)
+    if available < remaining:
+        return False, f"Insufficient stock for {order['medicine_name']} ({available} available, {remaining} ordered)", 0
+    
+    allocated_value = 0.0
+    for batch in batches:
+        if remaining == 0:
+            break
+        
+        take = min(batch['quantity'], remaining)
+        cursor.execute('''
+            UPDATE medicine_stock
+            SET quantity = quantity - ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND quantity >= ?
+        ''', (take, batch['id'], take))
+        
+        if cursor.rowcount != 1:
+            return False, "Stock changed during allocation, please retry", 0
+        
+        cursor.execute('''
+            INSERT INTO order_allocations (order_id, stock_id, quantity)
+            VALUES (?, ?, ?)
+        ''', (order['id'], batch['id'], take))
+        record_stock_movement(cursor, batch['id'], "Sale", -take, order_id=order['id'])
+        
+        allocated_value += take * batch['price']
+        remaining -= take
+    
+    return True, "Stock allocated", allocated_value
+
+def release_order_stock(cursor, order_id):
+    """Return an order's allocated stock to its batches (inside a write transaction)"""
+    cursor.execute('''
+        INSERT INTO stock_movements
+        (stock_id, pharmacy_id, medicine_name, batch_number, movement_type, quantity_change, order_id, note)
+        SELECT ms.id, ms.pharmacy_id, ms.medicine_name, ms.batch_number, 'Return', oa.quantity, oa.order_id,
+               'Order cancelled'
+        FROM order_allocations oa
+        JOIN medicine_stock ms ON ms.id = oa.stock_id
+        WHERE oa.order_id = ? AND oa.released_at IS NULL
+    ''', (order_id,))
+    
+    cursor.execute('''
+        UPDATE medicine_stock
+        SET quantity = quantity + (
+                SELECT SUM(oa.quantity) FROM order_allocations oa
+                WHERE oa.stock_id = medicine_stock.id AND oa.order_id = ? AND oa.released_at IS NULL
+            ),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (
+            SELECT stock_id FROM order_allocations
+            WHERE order_id = ? AND released_at IS NULL
+        )
+    ''', (order_id, order_id))
+    
+    cursor.execute('''
+        UPDATE order_allocations
+        SET released_at = CURRENT_TIMESTAMP
+        WHERE order_id = ? AND released_at IS NULL
+    ''', (order_id,))
+
+# Allowed status transitions for pharmacy staff
+ORDER_TRANSITIONS = {
+    "Pending": ["Confirmed", "Cancelled"],
+    "Confirmed": ["Delivered", "Cancelled"],
+    "Delivered": [],
+    "Cancelled": [],
+}
+
+def apply_order_transition(cursor, order_id, new_status, delivery_date=None, pharmacy_id=None):
+    """Validate and apply one status transition inside an open write transaction.
+    
+    Confirming allocates stock (FEFO); cancelling a confirmed order releases it.
+    When pharmacy_id is given the order must belong to that pharmacy.
+    Returns (success, message).
+    """
+    cursor.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
+    order = cursor.fetchone()
+    
+    if not order or (pharmacy_id is not None and order['pharmacy_id'] != pharmacy_id):
+        return False, f"Order #{order_id} not found"
+    
+    if new_status not in ORDER_TRANSITIONS.get(order['status'], []):
+        return False, f"Order #{order_id} cannot move from {order['status']} to {new_status}"
+    
+    if new_status == "Confirmed":
+        success, message, allocated_value = allocate_order_stock(cursor, order)
+        if not success:
+            return False, f"Order #{order_id}: {message}"
+        
+        cursor.execute('''
+            UPDATE orders
+            SET status = ?, total_amount = COALESCE(total_amount, ?)
+            WHERE id = ?
+        ''', (new_status, allocated_value, order_id))
+    
+    elif new_status == "Cancelled":
+        if order['status'] == "Confirmed":
+            release_order_stock(cursor, order_id)
+        
+        cursor.execute('UPDATE orders SET status = ? WHERE id = ?', (new_status, order_id))
+    
+    else:
+        cursor.execute('''
+            UPDATE orders
+            SET status = ?, delivery_date = ?
+            WHERE id = ?
+        ''', (new_status, delivery_date or datetime.now(), order_id))
+    
+    return True, f"Order #{order_id} {new_status.lower()}"
+
+def _transition_orders(cursor, order_ids, new_status, delivery_date, pharmacy_id=None):
+    """Write job: apply a status transition to each order under its own savepoint.
+    
+    An order that fails validation or stock allocation is rolled back on its own.
+    Expiry alerts of the pharmacies whose stock moved are refreshed in the same job.
+    Returns [(order_id, success, message)].
+    """
+    results = []
+    
+    for order_id in order_ids:
+        cursor.execute('SAVEPOINT order_transition')
+        # The order_stats triggers update the pharmacy counters in the same transaction
+        success, message = apply_order_transition(cursor, int(order_id), new_status, delivery_date, pharmacy_id)
+        
+        if not success:
+            cursor.execute('ROLLBACK TO order_transition')
+        
+        cursor.execute('RELEASE order_transition')
+        results.append((int(order_id), success, message))
+    
+    # Allocation drains the soonest-expiring batches and a release refills them, which
+    # are the batches the alerts track, so the alerts must not wait for the daily sweep
+    moved_ids = [order_id for order_id, success, _ in results if success]
+    if moved_ids and new_status in ("Confirmed", "Cancelled"):
+        cursor.execute(f'''
+            SELECT DISTINCT pharmacy_id FROM orders WHERE id IN ({", ".join("?" * len(moved_ids))})
+        ''', moved_ids)
+        for row in cursor.fetchall():
+            sweep_expiry_alerts(cursor, row['pharmacy_id'])
+    
+    return results
+
+def update_order_status(order_id, new_status, delivery_date=None):
+    """Update order status, reserving or releasing stock in the same transaction.
+    
+    The writer thread runs the transition inside BEGIN IMMEDIATE, which takes the
+    database write lock before stock is read, so two staff members confirming at
+    the same time cannot allocate the same units. Returns (success, message).
+    """
+    try:
+        [(_, success, message)] = run_write(_transition_orders, [order_id], new_status, delivery_date)
+    except sqlite3.Error as e:
+        return False, f"Error updating order: {str(e)}"
+    
+    return success, message
+
+def get_order_ids(pharmacy_id, status=None):
+    """Return the ids of a pharmacy's orders, oldest first, optionally filtered by status"""
+    query = 'SELECT id FROM orders WHERE pharmacy_id = ?'
+    params = [pharmacy_id]
+    
+    if status:
+        query += ' AND status = ?'
+        params.append(status)
+    
+    query += ' ORDER BY order_date, id'
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    order_ids = [row['id'] for row in cursor.fetchall()]
+    conn.close()
+    
+    return order_ids
+
+def bulk_update_order_status(pharmacy_id, order_ids, new_status, delivery_date=None):
+    """Apply one status transition to many orders in a single write transaction.
+    
+    Each order runs under its own savepoint, so an order that fails validation or
+    stock allocation is rolled back on its own while the rest are committed together.
+    Returns (updated_ids, failures) where failures is a list of messages.
+    """
+    delivery_date = delivery_date or (datetime.now() if new_status == "Delivered" else None)
+    
+    try:
+        results = run_write(_transition_orders, order_ids, new_status, delivery_date, pharmacy_id)
+    except sqlite3.Error as e:
+        return [], [f"Error updating orders: {str(e)}"]
+    
+    updated_ids = [order_id for order_id, success, _ in results if success]
+    failures = [message for _, success, message in results if not success]
+    
+    return updated_ids, failures
+
+def _insert_order(cursor, patient_id, pharmacy_id, medicine_name, quantity):
+    """Write job: insert a pending order if the pharmacy has enough usable stock; returns (success, message)"""
+    cursor.execute('''
+        SELECT medicine_id, medicine_name, available_quantity FROM medicine_availability
+        WHERE medicine_key = ? AND pharmacy_id = ?
+    ''', (normalize_medicine_name(medicine_name), pharmacy_id))
+    available = cursor.fetchone()
+    
+    if not available or available['available_quantity'] < quantity:
+        in_stock = available['available_quantity'] if available else 0
+        return False, f"Only {in_stock} units of {medicine_name} are available at this pharmacy"
+    
+    cursor.execute('''
+        INSERT INTO orders (patient_id, pharmacy_id, medicine_name, quantity, medicine_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (patient_id, pharmacy_id, available['medicine_name'], quantity, available['medicine_id']))
+    
+    return True, f"Order #{cursor.lastrowid} placed"
+
+def place_order(patient_id, pharmacy_id, medicine_name, quantity):
+    """Place a pending order with a pharmacy if it currently has enough usable stock.
+    
+    Stock is only reserved when the pharmacy confirms the order; the check here
+    rejects orders that could not be filled at the time they are placed.
+    Returns (success, message).
+    """
+    medicine_name = (medicine_name or "").strip()
+    if not medicine_name or quantity <= 0:
+        return False, "Please choose a medicine and a positive quantity"
+    
+    try:
+        return run_write(_insert_order, patient_id, pharmacy_id, medicine_name, quantity)
+    except sqlite3.Error as e:
+        return False, f"Error placing order: {str(e)}"
+
+@versioned_cache("patient_orders", owner="patient_id", global_scopes=("names",))
+def get_patient_orders(patient_id, limit=50):
+    """Return a patient's most recent orders with the pharmacy name"""
+    conn = get_db_connection()
+    orders = pd.read_sql_query('''
+        SELECT o.id, o.medicine_name, o.quantity, o.status, o.order_date, o.delivery_date,
+               o.total_amount, ph.pharmacy_name
+        FROM orders o
+        JOIN pharmacies ph ON ph.id = o.pharmacy_id
+        WHERE o.patient_id = ?
+        ORDER BY o.order_date DESC, o.id DESC
+        LIMIT ?
+    ''', conn, params=(patient_id, limit))
+    conn.close()
+    
+    return orders
@@ -6,7 +6,21 @@ from database import get_db_connection, get_patient_id
 from chat_system import patient_chat_interface
 from email_service import send_emergency_email
 from chatbot import health_chatbot
+from availability_service import search_medicine_availability
+from order_service import place_order, get_patient_orders
+from medicine_catalogue import resolve_medicine_id
+from adherence_service import (get_todays_doses, log_dose, clear_dose, get_family_adherence, get_dose_timeline,
+                               ADHERENCE_DAYS, TIMELINE_HOURS)
+from drug_interactions import check_new_medicine, get_active_medicines, get_family_interactions
+from location_service import find_nearest_pharmacies, get_patient_location, set_patient_location
+from family_service import get_family_members, get_illness_history, get_active_reminders
+from render_profiler import profile_section
+from write_queue import run_write, submit_write, log_write_error
+from list_view import list_table, selection_actions
+from temporal import ages, days_since, recency_labels, running_today
+from records import records_frame
 
+@profile_section
 def patient_dashboard():
     """Patient dashboard with all features"""
     st.title("🏥 Patient Dashboard")
@@ -15,10 +29,11 @@ def patient_dashboard():
     patient_id = get_patient_id(st.session_state.user_id)
     
     # Create tabs for different sections
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "Family Dashboard", 
         "Illness History", 
         "Medicine Reminders", 
+        "Order Medicines",
         "Emergency Alert", 
         "Chat with Doctor",
         "Health Chatbot"
@@ -34,14 +49,18 @@ def patient_dashboard():
         medicine_reminders_dashboard(patient_id)
     
     with tab4:
-        emergency_alert_dashboard(patient_id)
+        order_medicines_dashboard(patient_id)
     
     with tab5:
-        patient_chat_interface()
+        emergency_alert_dashboard(patient_id)
     
     with tab6:
+        patient_chat_interface()
+    
+    with tab7:
         health_chatbot_interface(patient_id)
 
+@profile_section
 def family_dashboard(patient_id):
     """Manage family members"""
     st.subheader("👨‍👩‍👧‍👦 Family Dashboard")
@@ -65,55 +84,43 @@ def family_dashboard(patient_id):
             submit = st.form_submit_button("Add Family Member", type="primary")
             
             if submit and name and relationship:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                cursor.execute('''
+                run_write(lambda cursor: cursor.execute('''
                     INSERT INTO family_members (patient_id, name, relationship, date_of_birth, gender, phone)
                     VALUES (?, ?, ?, ?, ?, ?)
-                ''', (patient_id, name, relationship, dob, gender, phone))
-                
-                conn.commit()
-                conn.close()
+                ''', (patient_id, name, relationship, dob, gender, phone)))
                 
                 st.success(f"Added {name} to family members!")
                 st.rerun()
     
     # Display existing family members
-    conn = get_db_connection()
-    family_members = pd.read_sql_query('''
-        SELECT * FROM family_members WHERE patient_id = ? ORDER BY created_at DESC
-    ''', conn, params=(patient_id,))
-    conn.close()
+    family_members = get_family_members(patient_id)
     
-    if not family_members.empty:
+    if family_members:
         st.subheader("Family Members")
         
-        for index, member in family_members.iterrows():
-            with st.container():
-                col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
-                
-                with col1:
-                    st.write(f"**{member['name']}** ({member['relationship']})")
-                    if member['phone']:
-                        st.write(f"📞 {member['phone']}")
-                
-                with col2:
-                    if member['date_of_birth']:
-                        age = calculate_age(member['date_of_birth'])
-                        st.write(f"Age: {age} years")
-                
-                with col3:
-                    st.write(f"Gender: {member['gender']}")
-                
-                with col4:
-                    if st.button("Edit", key=f"edit_{member['id']}"):
-                        edit_family_member(member)
-                
-                st.divider()
+        family_members = records_frame(family_members)
+        family_members['age'] = ages(family_members['date_of_birth'])
+        
+        # Selecting a member opens its edit form
+        selected = list_table(
+            family_members, "family_members",
+            ['name', 'relationship', 'age', 'gender', 'phone'],
+            column_config={
+                'name': "Name",
+                'relationship': "Relationship",
+                'age': st.column_config.NumberColumn("Age", format="%d years"),
+                'gender': "Gender",
+                'phone': "📞 Phone",
+            },
+            selection_mode="single-row"
+        )
+        
+        if not selected.empty:
+            edit_family_member(selected.iloc[0])
     else:
         st.info("No family members added yet. Add your first family member above!")
 
+@profile_section
 def edit_family_member(member):
     """Edit family member in a modal"""
     with st.form(f"edit_member_{member['id']}"):
@@ -141,42 +148,28 @@ def edit_family_member(member):
             delete = st.form_submit_button("Delete", type="secondary")
         
         if update:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            run_write(lambda cursor: cursor.execute('''
                 UPDATE family_members 
                 SET name=?, relationship=?, date_of_birth=?, gender=?, phone=?
                 WHERE id=?
-            ''', (name, relationship, dob, gender, phone, member['id']))
-            
-            conn.commit()
-            conn.close()
+            ''', (name, relationship, dob, gender, phone, member['id'])))
             
             st.success("Family member updated!")
             st.rerun()
         
         if delete:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM family_members WHERE id=?', (member['id'],))
-            
-            conn.commit()
-            conn.close()
+            run_write(lambda cursor: cursor.execute('DELETE FROM family_members WHERE id=?', (member['id'],)))
             
             st.success("Family member deleted!")
             st.rerun()
 
+@profile_section
 def illness_history_dashboard(patient_id):
     """Track illness history for patient and family"""
     st.subheader("🏥 Illness History Tracking")
     
     # Get family members for dropdown
-    conn = get_db_connection()
-    family_members = pd.read_sql_query('''
-        SELECT id, name FROM family_members WHERE patient_id = ?
-    ''', conn, params=(patient_id,))
+    family_members = get_family_members(patient_id)
     
     # Add illness record form
     with st.expander("Add New Illness Record"):
@@ -184,7 +177,7 @@ def illness_history_dashboard(patient_id):
             col1, col2 = st.columns(2)
             
             with col1:
-                person_type = st.selectbox("Person", ["Self"] + family_members['name'].tolist() if not family_members.empty else ["Self"])
+                person_type = st.selectbox("Person", ["Self"] + [member.name for member in family_members])
                 illness_name = st.text_input("Illness/Condition*")
                 illness_date = st.date_input("Date of Illness*", max_value=datetime.now().date())
             
@@ -200,80 +193,56 @@ def illness_history_dashboard(patient_id):
             if submit and illness_name and illness_date:
                 family_member_id = None
                 if person_type != "Self":
-                    family_member_id = family_members[family_members['name'] == person_type]['id'].iloc[0]
+                    family_member_id = next(member.id for member in family_members if member.name == person_type)
                 
-                cursor = conn.cursor()
-                cursor.execute('''
+                run_write(lambda cursor: cursor.execute('''
                     INSERT INTO illness_history 
                     (patient_id, family_member_id, illness_name, illness_date, symptoms, treatment, doctor_name, notes)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (patient_id, family_member_id, illness_name, illness_date, symptoms, treatment, doctor_name, notes))
+                ''', (patient_id, family_member_id, illness_name, illness_date, symptoms, treatment, doctor_name, notes)))
                 
-                conn.commit()
                 st.success("Illness record added!")
                 st.rerun()
     
     # Display illness history with "days since" calculation
-    illness_history = pd.read_sql_query('''
-        SELECT ih.*, fm.name as family_member_name
-        FROM illness_history ih
-        LEFT JOIN family_members fm ON ih.family_member_id = fm.id
-        WHERE ih.patient_id = ?
-        ORDER BY ih.illness_date DESC
-    ''', conn, params=(patient_id,))
-    
-    conn.close()
+    illness_history = get_illness_history(patient_id)
     
-    if not illness_history.empty:
+    if illness_history:
         st.subheader("Illness History")
         
-        for index, record in illness_history.iterrows():
-            with st.container():
-                # Calculate days since illness
-                illness_date = datetime.strptime(record['illness_date'], '%Y-%m-%d').date()
-                days_since = (datetime.now().date() - illness_date).days
-                
-                col1, col2, col3 = st.columns([3, 2, 1])
-                
-                with col1:
-                    person_name = record['family_member_name'] if record['family_member_name'] else "Self"
-                    st.write(f"**{record['illness_name']}** - {person_name}")
-                    st.write(f"Date: {record['illness_date']}")
-                    if record['symptoms']:
-                        st.write(f"Symptoms: {record['symptoms']}")
-                
-                with col2:
-                    st.metric("Days Since Illness", f"{days_since} days")
-                    if record['doctor_name']:
-                        st.write(f"Doctor: {record['doctor_name']}")
-                
-                with col3:
-                    # Color-code based on recency
-                    if days_since < 30:
-                        st.error("Recent")
-                    elif days_since < 90:
-                        st.warning("Moderate")
-                    else:
-                        st.success("Long ago")
-                
-                if record['treatment']:
-                    st.write(f"Treatment: {record['treatment']}")
-                if record['notes']:
-                    st.write(f"Notes: {record['notes']}")
-                
-                st.divider()
+        illness_history = records_frame(illness_history)
+        
+        # Days since each illness, colour-coded by recency
+        illness_history['days_since'] = days_since(illness_history['illness_date'])
+        illness_history['recency'] = recency_labels(illness_history['days_since'])
+        illness_history['person'] = illness_history['family_member_name'].fillna("Self")
+        
+        list_table(
+            illness_history, "illness_history",
+            ['illness_name', 'person', 'illness_date', 'days_since', 'recency', 'symptoms', 'treatment',
+             'doctor_name', 'notes'],
+            column_config={
+                'illness_name': "Illness",
+                'person': "Person",
+                'illness_date': "Date",
+                'days_since': st.column_config.NumberColumn("Days Since", format="%d days"),
+                'recency': "Recency",
+                'symptoms': "Symptoms",
+                'treatment': "Treatment",
+                'doctor_name': "Doctor",
+                'notes': "Notes",
+            }
+        )
     else:
         st.info("No illness records found. Add your first record above!")
 
+@profile_section
 def medicine_reminders_dashboard(patient_id):
     """Medicine reminder system"""
     st.subheader("💊 Medicine Reminders")
     
     # Get family members
-    conn = get_db_connection()
-    family_members = pd.read_sql_query('''
-        SELECT id, name FROM family_members WHERE patient_id = ?
-    ''', conn, params=(patient_id,))
+    family_members = get_family_members(patient_id)
     
     # Add medicine reminder form
     with st.expander("Add New Medicine Reminder"):
@@ -281,7 +250,7 @@ def medicine_reminders_dashboard(patient_id):
             col1, col2 = st.columns(2)
             
             with col1:
-                person_type = st.selectbox("Person", ["Self"] + family_members['name'].tolist() if not family_members.empty else ["Self"])
+                person_type = st.selectbox("Person", ["Self"] + [member.name for member in family_members])
                 medicine_name = st.text_input("Medicine Name*")
                 dosage = st.text_input("Dosage*", placeholder="e.g., 1 tablet, 5ml")
             
@@ -322,74 +291,283 @@ def medicine_reminders_dashboard(patient_id):
             if submit and medicine_name and dosage and frequency:
                 family_member_id = None
                 if person_type != "Self":
-                    family_member_id = family_members[family_members['name'] == person_type]['id'].iloc[0]
+                    family_member_id = next(member.id for member in family_members if member.name == person_type)
                 
                 times_str = ",".join(times)
                 
-                cursor = conn.cursor()
-                cursor.execute('''
+                # Check the new medicine against this person's other active reminders
+                conflicts = check_new_medicine(
+                    medicine_name,
+                    get_active_medicines(patient_id, int(family_member_id) if family_member_id is not None else None)
+                )
+                st.session_state.reminder_interactions = (medicine_name, person_type, conflicts)
+                
+                run_write(lambda cursor: cursor.execute('''
                     INSERT INTO medicine_reminders 
-                    (patient_id, family_member_id, medicine_name, dosage, frequency, start_date, end_date, reminder_times)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (patient_id, family_member_id, medicine_name, dosage, frequency, start_date, end_date, times_str))
+                    (patient_id, family_member_id, medicine_name, dosage, frequency, start_date, end_date, reminder_times, medicine_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (patient_id, family_member_id, medicine_name, dosage, frequency, start_date, end_date, times_str,
+                      resolve_medicine_id(cursor, medicine_name))))
                 
-                conn.commit()
                 st.success("Medicine reminder added!")
                 st.rerun()
     
-    # Display active reminders
-    active_reminders = pd.read_sql_query('''
-        SELECT mr.*, fm.name as family_member_name
-        FROM medicine_reminders mr
-        LEFT JOIN family_members fm ON mr.family_member_id = fm.id
-        WHERE mr.patient_id = ? AND mr.is_active = 1
-        ORDER BY mr.created_at DESC
-    ''', conn, params=(patient_id,))
+    # Interaction warnings for the reminder just added (shown after the rerun)
+    if st.session_state.get('reminder_interactions'):
+        medicine_name, person_name, conflicts = st.session_state.reminder_interactions
+        if conflicts:
+            st.warning(f"⚠️ {medicine_name} may interact with other medicines {person_name} is taking:")
+            for conflict in conflicts:
+                st.write(f"- **{conflict['severity']}** with {conflict['medicine_b']}: {conflict['description']}")
+            st.caption("Please check with your doctor or pharmacist before taking these together.")
+        st.session_state.reminder_interactions = None
     
-    conn.close()
+    todays_doses_panel(patient_id)
+    dose_timeline_panel(patient_id)
+    adherence_summary_panel(patient_id)
     
-    if not active_reminders.empty:
+    # Display active reminders
+    active_reminders = get_active_reminders(patient_id)
+    
+    if active_reminders:
         st.subheader("Active Medicine Reminders")
         
-        for index, reminder in active_reminders.iterrows():
-            with st.container():
-                col1, col2, col3 = st.columns([3, 2, 1])
-                
-                with col1:
-                    person_name = reminder['family_member_name'] if reminder['family_member_name'] else "Self"
-                    st.write(f"**{reminder['medicine_name']}** - {person_name}")
-                    st.write(f"Dosage: {reminder['dosage']}")
-                    st.write(f"Frequency: {reminder['frequency']}")
+        for person in get_family_interactions(patient_id).values():
+            conflicts = person['interactions']
+            with st.expander(f"⚠️ Possible drug interactions for {person['name'] or 'Self'} ({len(conflicts)})"):
+                for conflict in conflicts:
+                    st.write(f"- **{conflict['severity']}**: {conflict['medicine_a']} + {conflict['medicine_b']} — "
+                             f"{conflict['description']}")
+        
+        active_reminders = records_frame(active_reminders)
+        
+        # A reminder is running today if today falls between its start and (optional) end date
+        running = running_today(active_reminders['start_date'], active_reminders['end_date'])
+        active_reminders['schedule'] = running.map({True: "✅ Active", False: "⏸️ Inactive"})
+        active_reminders['person'] = active_reminders['family_member_name'].fillna("Self")
+        active_reminders['times'] = active_reminders['reminder_times'].str.replace(",", ", ")
+        
+        selected = list_table(
+            active_reminders, "active_reminders",
+            ['medicine_name', 'person', 'dosage', 'frequency', 'times', 'start_date', 'end_date', 'schedule'],
+            column_config={
+                'medicine_name': "Medicine",
+                'person': "Person",
+                'dosage': "Dosage",
+                'frequency': "Frequency",
+                'times': "⏰ Reminder Times",
+                'start_date': "Start",
+                'end_date': "End",
+                'schedule': "Today",
+            },
+            selection_mode="multi-row"
+        )
+
+        def deactivate(reminders):
+            reminder_ids = [(int(reminder_id),) for reminder_id in reminders['id']]
+            run_write(lambda cursor: cursor.executemany(
+                'UPDATE medicine_reminders SET is_active = 0 WHERE id = ?', reminder_ids
+            ))
+            st.rerun()
+        
+        selection_actions(selected, "active_reminders", [
+            ("Deactivate", lambda rows: rows['is_active'] == 1, deactivate),
+        ])
+    else:
+        st.info("No active medicine reminders. Add your first reminder above!")
+
+@profile_section
+def todays_doses_panel(patient_id):
+    """Today's scheduled doses with one-tap logging"""
+    doses = get_todays_doses(patient_id)
+    if not doses:
+        return
+    
+    st.subheader("📋 Today's Doses")
+    
+    for dose in doses:
+        col1, col2, col3 = st.columns([3, 1, 1])
+        slot_key = f"{dose['reminder_id']}_{dose['scheduled_time']}"
+        
+        with col1:
+            st.write(f"⏰ {dose['scheduled_time']} — **{dose['medicine_name']}** ({dose['dosage']}) - {dose['person']}")
+        
+        if dose['status']:
+            with col2:
+                icon = {"Taken": "✅", "Late": "🕒", "Skipped": "⏭️"}[dose['status']]
+                st.write(f"{icon} {dose['status']}")
+            with col3:
+                if st.button("Undo", key=f"undo_dose_{slot_key}"):
+                    clear_dose(dose['reminder_id'], dose['scheduled_date'], dose['scheduled_time'])
+                    st.rerun()
+        else:
+            with col2:
+                if st.button("Take", key=f"take_dose_{slot_key}", type="primary"):
+                    log_dose(dose['reminder_id'], dose['scheduled_date'], dose['scheduled_time'])
+                    st.rerun()
+            with col3:
+                if st.button("Skip", key=f"skip_dose_{slot_key}"):
+                    log_dose(dose['reminder_id'], dose['scheduled_date'], dose['scheduled_time'], "Skipped")
+                    st.rerun()
+    
+    st.divider()
+
+@profile_section
+def dose_timeline_panel(patient_id):
+    """Every dose due for the family in the next TIMELINE_HOURS hours, as one list"""
+    timeline = get_dose_timeline(patient_id)
+    if not timeline:
+        return
+    
+    today = datetime.now().date()
+    day_labels = {today: "Today", today + timedelta(days=1): "Tomorrow"}
+    with st.expander(f"🗓️ Family dose timeline (next {TIMELINE_HOURS} hours) — {len(timeline)} doses"):
+        lines = []
+        for instant, person, medicine_name, dosage in timeline:
+            day = day_labels.get(instant.date(), instant.strftime('%d %b'))
+            lines.append(f"- {day} **{instant.strftime('%H:%M')}** — {medicine_name} ({dosage}) · {person}")
+        st.markdown("\n".join(lines))
+
+@profile_section
+def adherence_summary_panel(patient_id):
+    """Adherence per family member over the last ADHERENCE_DAYS days"""
+    adherence = get_family_adherence(patient_id)
+    if adherence.empty:
+        return
+    
+    st.write(f"**Adherence (last {ADHERENCE_DAYS} days)**")
+    cols = st.columns(min(len(adherence), 4))
+    for i, (_, person) in enumerate(adherence.iterrows()):
+        with cols[i % len(cols)]:
+            value = f"{person['adherence_pct']:.0f}%" if pd.notna(person['adherence_pct']) else "—"
+            st.metric(person['person'], value, help=f"{int(person['taken'])} on time, {int(person['late'])} late, "
+                                                    f"{int(person['skipped'])} skipped of {int(person['scheduled'])} doses")
+    
+    st.divider()
+
+@profile_section
+def order_medicines_dashboard(patient_id):
+    """Find a medicine across pharmacies and order it"""
+    st.subheader("🛒 Order Medicines")
+    
+    search_term = st.text_input("Search medicine", placeholder="Start typing a medicine name...",
+                                key="availability_search")
+    
+    if search_term.strip():
+        results = search_medicine_availability(search_term)
+        
+        if results.empty:
+            st.info("No pharmacy currently has this medicine in stock.")
+        else:
+            st.dataframe(
+                results[['medicine_name', 'pharmacy_name', 'address', 'available_quantity',
+                         'min_price', 'next_expiry']].rename(columns={
+                    'medicine_name': 'Medicine',
+                    'pharmacy_name': 'Pharmacy',
+                    'address': 'Address',
+                    'available_quantity': 'Available',
+                    'min_price': 'Price from (₹)',
+                    'next_expiry': 'Earliest Expiry'
+                }),
+                hide_index=True,
+                width="stretch"
+            )
+            
+            options = list(results.index)
+            with st.form("place_order"):
+                choice = st.selectbox(
+                    "Order from",
+                    options,
+                    format_func=lambda i: f"{results.at[i, 'medicine_name']} — {results.at[i, 'pharmacy_name']} "
+                                          f"({results.at[i, 'available_quantity']} available)"
+                )
+                quantity = st.number_input("Quantity", min_value=1, value=1)
                 
-                with col2:
-                    times = reminder['reminder_times'].split(',')
-                    st.write("Reminder Times:")
-                    for time in times:
-                        st.write(f"⏰ {time}")
+                selected = results.loc[choice]
+                st.caption(f"Estimated cost: ₹{selected['min_price'] * quantity:.2f} "
+                           "(final amount is set when the pharmacy confirms)")
                 
-                with col3:
-                    # Check if reminder is due today
-                    start_date = datetime.strptime(reminder['start_date'], '%Y-%m-%d').date()
-                    end_date = datetime.strptime(reminder['end_date'], '%Y-%m-%d').date() if reminder['end_date'] else None
-                    today = datetime.now().date()
-                    
-                    if start_date <= today and (not end_date or today <= end_date):
-                        st.success("Active")
+                if st.form_submit_button("Place Order"):
+                    success, message = place_order(
+                        patient_id, int(selected['pharmacy_id']), selected['medicine_name'], int(quantity)
+                    )
+                    if success:
+                        st.success(message)
                     else:
-                        st.info("Inactive")
-                    
-                    if st.button("Deactivate", key=f"deactivate_{reminder['id']}"):
-                        conn = get_db_connection()
-                        cursor = conn.cursor()
-                        cursor.execute('UPDATE medicine_reminders SET is_active = 0 WHERE id = ?', (reminder['id'],))
-                        conn.commit()
-                        conn.close()
-                        st.rerun()
-                
-                st.divider()
+                        st.error(message)
+            
+            nearest_pharmacies_panel(patient_id, results['medicine_name'].drop_duplicates().tolist())
+    
+    st.markdown("---")
+    st.write("**My Orders**")
+    
+    orders = get_patient_orders(patient_id)
+    if orders.empty:
+        st.info("You have not placed any orders yet.")
     else:
-        st.info("No active medicine reminders. Add your first reminder above!")
+        st.dataframe(
+            orders.rename(columns={
+                'id': 'Order #',
+                'medicine_name': 'Medicine',
+                'quantity': 'Quantity',
+                'status': 'Status',
+                'order_date': 'Ordered',
+                'delivery_date': 'Delivered',
+                'total_amount': 'Amount (₹)',
+                'pharmacy_name': 'Pharmacy'
+            }),
+            hide_index=True,
+            width="stretch"
+        )
+
+@profile_section
+def nearest_pharmacies_panel(patient_id, medicine_names):
+    """Show the pharmacies closest to the patient that stock a medicine"""
+    st.write("**📍 Nearest Pharmacies**")
+    
+    saved_lat, saved_lon = get_patient_location(patient_id)
+    
+    with st.expander("My Location", expanded=saved_lat is None):
+        with st.form("patient_location"):
+            col1, col2 = st.columns(2)
+            with col1:
+                latitude = st.number_input("Latitude", min_value=-90.0, max_value=90.0,
+                                           value=saved_lat, format="%.6f")
+            with col2:
+                longitude = st.number_input("Longitude", min_value=-180.0, max_value=180.0,
+                                            value=saved_lon, format="%.6f")
+            
+            if st.form_submit_button("Save Location"):
+                if latitude is None or longitude is None:
+                    st.error("Please enter both latitude and longitude")
+                else:
+                    set_patient_location(patient_id, latitude, longitude)
+                    st.success("Location saved!")
+                    st.rerun()
+    
+    if saved_lat is None or saved_lon is None:
+        st.info("Save your location to see the nearest pharmacies with this medicine.")
+        return
+    
+    medicine_name = st.selectbox("Medicine", medicine_names, key="nearest_medicine")
+    nearest = find_nearest_pharmacies(saved_lat, saved_lon, medicine_name, k=5)
+    
+    if nearest.empty:
+        st.info("No pharmacy with a saved location stocks this medicine nearby.")
+    else:
+        st.dataframe(
+            nearest[['pharmacy_name', 'address', 'distance_km', 'available_quantity', 'min_price']].rename(columns={
+                'pharmacy_name': 'Pharmacy',
+                'address': 'Address',
+                'distance_km': 'Distance (km)',
+                'available_quantity': 'Available',
+                'min_price': 'Price from (₹)'
+            }),
+            hide_index=True,
+            width="stretch"
+        )
 
+@profile_section
 def emergency_alert_dashboard(patient_id):
     """Emergency alert system"""
     st.subheader("🚨 Emergency Alert System")
@@ -461,6 +639,7 @@ def emergency_alert_dashboard(patient_id):
             else:
                 st.error("Please fill in location and description fields.")
 
+@profile_section
 def health_chatbot_interface(patient_id):
     """Health chatbot interface"""
     st.subheader("🤖 Health Chatbot")
@@ -493,22 +672,11 @@ def health_chatbot_interface(patient_id):
         st.session_state.chatbot_messages.append({"role": "assistant", "content": bot_response})
         st.chat_message("assistant").write(bot_response)
         
-        # Save conversation to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        # Save conversation to database; the reply is already shown, so the rerun need not wait for the write
+        saved = submit_write(lambda cursor: cursor.execute('''
             INSERT INTO chatbot_conversations (patient_id, user_message, bot_response)
             VALUES (?, ?, ?)
-        ''', (patient_id, user_input, bot_response))
-        conn.commit()
-        conn.close()
+        ''', (patient_id, user_input, bot_response)))
+        saved.add_done_callback(log_write_error)
         
         st.rerun()
-
-def calculate_age(birth_date):
-    """Calculate age from birth date"""
-    if isinstance(birth_date, str):
-        birth_date = datetime.strptime(birth_date, '%Y-%m-%d').date()
-    
-    today = datetime.now().date()
-    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
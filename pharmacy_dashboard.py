@@ -1,8 +1,28 @@
 import streamlit as st
 import pandas as pd
+import sqlite3
 from datetime import datetime, timedelta
 from database import get_db_connection, get_pharmacy_id
+from stock_service import (
+    search_medicine_stock, get_stock_summary, STOCK_SORT_COLUMNS,
+    get_expiring_stock, get_expiry_alert_counts, get_expiry_alerts, run_expiry_sweep,
+    upsert_stock, import_stock_csv, STOCK_CSV_COLUMNS, EXPIRY_CRITICAL_DAYS, EXPIRY_WARNING_DAYS
+)
+from stock_ledger import record_stock_movement, get_stock_on_hand_at, get_stock_movements, write_off_expired_stock
+from medicine_catalogue import resolve_medicine_id, suggest_medicine_matches, link_medicine_alias
+from report_service import get_revenue_report, get_medicine_sales_report, REPORT_PERIODS
+from forecast_service import get_reorder_suggestions, FORECAST_METHODS, HISTORY_DAYS
+from order_service import (
+    get_order_statistics, get_pharmacy_orders, ORDER_STATUSES,
+    get_order_ids, bulk_update_order_status
+)
+from render_profiler import profile_section
+from write_queue import run_write
+from list_view import list_table, selection_actions
+from temporal import days_until, expiry_labels
+from records import fetch_record
 
+@profile_section
 def pharmacy_dashboard():
     """Pharmacy dashboard with stock management and orders"""
     st.title("🏪 Pharmacy Dashboard")
@@ -11,9 +31,11 @@ def pharmacy_dashboard():
     pharmacy_id = get_pharmacy_id(st.session_state.user_id)
     
     # Create tabs for different sections
-    tab1, tab2, tab3 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "Medicine Stock", 
         "Patient Orders",
+        "Reorder Suggestions",
+        "Sales Reports",
         "Profile Settings"
     ])
     
@@ -24,8 +46,43 @@ def pharmacy_dashboard():
         patient_orders_dashboard(pharmacy_id)
     
     with tab3:
+        reorder_suggestions_dashboard(pharmacy_id)
+    
+    with tab4:
+        sales_reports_dashboard(pharmacy_id)
+    
+    with tab5:
         pharmacy_profile_settings()
 
+def queue_catalogue_suggestions(suggestions):
+    """Keep {name: [(medicine_id, catalogue name)]} suggestions for the pharmacist to review"""
+    pending = st.session_state.setdefault("catalogue_suggestions", {})
+    pending.update({name: matches for name, matches in suggestions.items() if matches})
+
+def catalogue_suggestions_panel():
+    """Ask the pharmacist whether new medicine names are spellings of existing catalogue medicines"""
+    pending = st.session_state.get("catalogue_suggestions")
+    if not pending:
+        return
+    
+    st.subheader("🔎 Check New Medicine Names")
+    st.caption("These names are new to the catalogue but look like medicines already in it. "
+               "Link a name only if it is the same product; orders are filled from the linked medicine's stock.")
+    
+    keep_separate = (None, "No, keep it as a separate medicine")
+    for name, matches in list(pending.items()):
+        with st.form(f"catalogue_match_{name}"):
+            choice = st.radio(f"Is **{name}** the same medicine as:", matches + [keep_separate],
+                              format_func=lambda option: option[1])
+            
+            if st.form_submit_button("Confirm"):
+                if choice[0] is not None:
+                    run_write(link_medicine_alias, name, choice[0])
+                    st.success(f"{name} is now linked to {choice[1]}.")
+                del pending[name]
+                st.rerun()
+
+@profile_section
 def medicine_stock_dashboard(pharmacy_id):
     """Medicine stock management"""
     st.subheader("💊 Medicine Stock Management")
@@ -48,80 +105,218 @@ def medicine_stock_dashboard(pharmacy_id):
             submit = st.form_submit_button("Add to Stock", type="primary")
             
             if submit and medicine_name and quantity > 0 and price > 0:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO medicine_stock 
-                    (pharmacy_id, medicine_name, manufacturer, batch_number, expiry_date, quantity, price)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (pharmacy_id, medicine_name, manufacturer, batch_number, expiry_date, quantity, price))
-                
-                conn.commit()
-                conn.close()
-                
-                st.success(f"Added {quantity} units of {medicine_name} to stock!")
-                st.rerun()
+                # Adding an existing batch increases its quantity
+                try:
+                    suggestions = upsert_stock(pharmacy_id, medicine_name, manufacturer, batch_number, expiry_date, quantity, price)
+                except ValueError as e:
+                    st.error(f"Not added: {e}.")
+                else:
+                    queue_catalogue_suggestions({medicine_name.strip(): suggestions})
+                    
+                    run_expiry_sweep(pharmacy_id)
+                    
+                    st.success(f"Added {quantity} units of {medicine_name} to stock!")
+                    st.rerun()
+    
+    # Bulk import from a distributor CSV
+    with st.expander("Bulk Import Stock from CSV"):
+        st.write("Columns: " + ", ".join(STOCK_CSV_COLUMNS) + " (expiry_date as YYYY-MM-DD). "
+                 "Rows matching an existing medicine and batch add to its quantity; "
+                 "rows giving a stocked batch a different expiry date are rejected.")
+        
+        uploaded_file = st.file_uploader("Stock CSV", type=["csv"], key="stock_csv")
+        
+        if uploaded_file is not None and st.button("Import Stock", type="primary"):
+            with st.spinner("Importing stock..."):
+                result = import_stock_csv(pharmacy_id, uploaded_file)
+            
+            st.success(f"Imported {result['imported']} of {result['rows_read']} rows.")
+            queue_catalogue_suggestions(result['suggestions'])
+            
+            if result['errors']:
+                if result['rejected']:
+                    st.warning(f"{result['rejected']} rows were rejected.")
+                elif result['rows_read']:
+                    st.warning("The rest of the file could not be read.")
+                else:
+                    st.warning("The file could not be imported.")
+                st.dataframe(
+                    pd.DataFrame(result['errors'], columns=["Line", "Error"]),
+                    hide_index=True,
+                    width="stretch"
+                )
+    
+    # New names that look like catalogue medicines wait for the pharmacist to confirm
+    catalogue_suggestions_panel()
+    
+    # Expiry alerts from the daily sweep
+    expiry_alerts_panel(pharmacy_id)
     
     # Display current stock
-    conn = get_db_connection()
-    stock_data = pd.read_sql_query('''
-        SELECT * FROM medicine_stock 
-        WHERE pharmacy_id = ? 
-        ORDER BY updated_at DESC
-    ''', conn, params=(pharmacy_id,))
+    summary = get_stock_summary(pharmacy_id)
     
-    if not stock_data.empty:
+    if summary['total_items'] > 0:
         st.subheader("Current Stock")
         
-        # Search functionality
-        search_medicine = st.text_input("🔍 Search Medicine", placeholder="Enter medicine name")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Stock Items", summary['total_items'])
+        with col2:
+            st.metric("Total Units", int(summary['total_units']))
+        with col3:
+            st.metric("Stock Value", f"₹{summary['stock_value']:.2f}")
+        with col4:
+            st.metric("Expired Items", summary['expired_items'])
+        
+        # Search and sorting are applied in SQL, only one page is loaded
+        col1, col2, col3 = st.columns([3, 2, 1])
+        with col1:
+            search_medicine = st.text_input("🔍 Search Medicine", placeholder="Medicine name, manufacturer or batch")
+        with col2:
+            sort_by = st.selectbox("Sort by", list(STOCK_SORT_COLUMNS.keys()))
+        with col3:
+            descending = st.checkbox("Descending", value=True)
+        
+        page_size = 25
+        page = st.session_state.get("stock_page", 1)
+        stock_data, total_matches = search_medicine_stock(
+            pharmacy_id, search_medicine, sort_by, descending, page, page_size
+        )
         
-        if search_medicine:
-            stock_data = stock_data[stock_data['medicine_name'].str.contains(search_medicine, case=False, na=False)]
+        # Narrowing the search can leave the saved page out of range
+        total_pages = max(1, (total_matches + page_size - 1) // page_size)
+        if page > total_pages:
+            page = total_pages
+            stock_data, total_matches = search_medicine_stock(
+                pharmacy_id, search_medicine, sort_by, descending, page, page_size
+            )
+        st.session_state.stock_page = page
         
-        # Display stock with expiry warnings
-        for index, medicine in stock_data.iterrows():
-            with st.container():
-                col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
-                
-                with col1:
-                    st.write(f"**{medicine['medicine_name']}**")
-                    if medicine['manufacturer']:
-                        st.write(f"Manufacturer: {medicine['manufacturer']}")
-                    if medicine['batch_number']:
-                        st.write(f"Batch: {medicine['batch_number']}")
-                
-                with col2:
-                    st.metric("Quantity", f"{medicine['quantity']} units")
-                    st.write(f"₹{medicine['price']:.2f} per unit")
-                
-                with col3:
-                    expiry_date = datetime.strptime(medicine['expiry_date'], '%Y-%m-%d').date()
-                    days_to_expiry = (expiry_date - datetime.now().date()).days
-                    
-                    st.write(f"Expiry: {medicine['expiry_date']}")
-                    
-                    # Color-code based on expiry
-                    if days_to_expiry < 0:
-                        st.error("EXPIRED")
-                    elif days_to_expiry < 30:
-                        st.warning(f"Expires in {days_to_expiry} days")
-                    elif days_to_expiry < 90:
-                        st.info(f"Expires in {days_to_expiry} days")
-                    else:
-                        st.success(f"Expires in {days_to_expiry} days")
-                
-                with col4:
-                    if st.button("Edit", key=f"edit_stock_{medicine['id']}"):
-                        edit_medicine_stock(medicine)
-                
-                st.divider()
+        if stock_data.empty:
+            st.info("No medicines match your search.")
+        
+        # Display stock with expiry warnings; selecting a batch opens its edit form
+        if not stock_data.empty:
+            stock_data['days_to_expiry'] = days_until(stock_data['expiry_date'])
+            stock_data['expiry_status'] = expiry_labels(stock_data['days_to_expiry'], EXPIRY_CRITICAL_DAYS,
+                                                        EXPIRY_WARNING_DAYS)
+            
+            selected = list_table(
+                stock_data, "stock_list",
+                ['medicine_name', 'manufacturer', 'batch_number', 'quantity', 'price', 'expiry_date',
+                 'days_to_expiry', 'expiry_status'],
+                column_config={
+                    'medicine_name': "Medicine",
+                    'manufacturer': "Manufacturer",
+                    'batch_number': "Batch",
+                    'quantity': st.column_config.NumberColumn("Quantity", format="%d units"),
+                    'price': st.column_config.NumberColumn("Price per Unit", format="₹%.2f"),
+                    'expiry_date': "Expiry",
+                    'days_to_expiry': st.column_config.NumberColumn("Days Left", format="%d"),
+                    'expiry_status': "Status",
+                },
+                selection_mode="single-row"
+            )
+            
+            if not selected.empty:
+                edit_medicine_stock(selected.iloc[0])
+        
+        # Pagination controls
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            st.number_input("Page", min_value=1, max_value=total_pages, key="stock_page")
+        with col2:
+            st.write(f"Showing page {page} of {total_pages} ({total_matches} matching items)")
     else:
         st.info("No medicines in stock. Add your first medicine above!")
     
-    conn.close()
+    # Stock movement history from the ledger
+    stock_history_panel(pharmacy_id)
+
+@profile_section
+def stock_history_panel(pharmacy_id):
+    """Stock on hand at a past date and recent stock movements"""
+    with st.expander("📜 Stock History"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            as_of_date = st.date_input("Stock on hand at end of", value=datetime.now().date(),
+                                       max_value=datetime.now().date(), key="stock_as_of")
+        
+        as_of = datetime.combine(as_of_date, datetime.max.time())
+        on_hand = get_stock_on_hand_at(pharmacy_id, min(as_of, datetime.now()))
+        
+        with col2:
+            st.metric("Units on Hand", int(on_hand['quantity'].sum()) if not on_hand.empty else 0)
+        
+        if not on_hand.empty:
+            st.dataframe(on_hand[['medicine_name', 'batch_number', 'quantity']], hide_index=True, width="stretch")
+        else:
+            st.info("No stock was on hand at that time.")
+        
+        st.write("**Recent Movements**")
+        movements = get_stock_movements(pharmacy_id, limit=50)
+        
+        if not movements.empty:
+            st.dataframe(
+                movements[['created_at', 'medicine_name', 'batch_number', 'movement_type', 'quantity_change', 'order_id', 'note']],
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.info("No stock movements recorded yet.")
+
+@profile_section
+def expiry_alerts_panel(pharmacy_id):
+    """Expiry alert counts and lists, read from the materialized expiry alerts"""
+    counts = get_expiry_alert_counts(pharmacy_id)
+    
+    if sum(counts.values()) == 0:
+        return
+    
+    st.subheader("⏰ Expiry Alerts")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Expired", counts['Expired'])
+    with col2:
+        st.metric("Expiring in 30 days", counts['Critical'])
+    with col3:
+        st.metric("Expiring in 90 days", counts['Warning'])
+    
+    with st.expander("View Expiry Alerts"):
+        alert_level = st.selectbox("Alert Level", ["All", "Expired", "Critical", "Warning"], key="expiry_alert_level")
+        alerts = get_expiry_alerts(pharmacy_id, None if alert_level == "All" else alert_level)
+        
+        if not alerts.empty:
+            st.dataframe(
+                alerts[['medicine_name', 'batch_number', 'expiry_date', 'days_to_expiry', 'quantity', 'alert_level']],
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.info("No alerts at this level.")
+        
+        if counts['Expired'] > 0 and st.button("Write Off Expired Stock", key="write_off_expired"):
+            written_off = write_off_expired_stock(pharmacy_id)
+            run_expiry_sweep(pharmacy_id)
+            st.success(f"Wrote off {written_off} expired batches.")
+            st.rerun()
+    
+    with st.expander("Check Expiring Stock"):
+        within_days = st.number_input("Expiring within (days)", min_value=1, max_value=365, value=30)
+        expiring = get_expiring_stock(pharmacy_id, within_days)
+        
+        if not expiring.empty:
+            st.dataframe(
+                expiring[['medicine_name', 'batch_number', 'expiry_date', 'days_to_expiry', 'quantity']],
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.info(f"No stock expires within {within_days} days.")
 
+@profile_section
 def edit_medicine_stock(medicine):
     """Edit medicine stock"""
     with st.form(f"edit_medicine_{medicine['id']}"):
@@ -147,150 +342,248 @@ def edit_medicine_stock(medicine):
             delete = st.form_submit_button("Delete", type="secondary")
         
         if update:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            def write_update(cursor):
+                # Record the quantity difference in the stock ledger
+                cursor.execute('SELECT quantity FROM medicine_stock WHERE id=?', (int(medicine['id']),))
+                old_quantity = cursor.fetchone()['quantity']
+                suggestions = suggest_medicine_matches(cursor, medicine_name)
+                
+                cursor.execute('''
+                    UPDATE medicine_stock 
+                    SET medicine_name=?, manufacturer=?, batch_number=?, quantity=?, price=?, expiry_date=?,
+                        medicine_id=?, updated_at=CURRENT_TIMESTAMP
+                    WHERE id=?
+                ''', (medicine_name.strip(), manufacturer, batch_number.strip(), quantity, price, expiry_date,
+                      resolve_medicine_id(cursor, medicine_name), medicine['id']))
+                record_stock_movement(cursor, int(medicine['id']), "Adjustment", quantity - old_quantity, note="Stock edited")
+                return suggestions
             
-            cursor.execute('''
-                UPDATE medicine_stock 
-                SET medicine_name=?, manufacturer=?, batch_number=?, quantity=?, price=?, expiry_date=?, updated_at=CURRENT_TIMESTAMP
-                WHERE id=?
-            ''', (medicine_name, manufacturer, batch_number, quantity, price, expiry_date, medicine['id']))
+            try:
+                queue_catalogue_suggestions({medicine_name.strip(): run_write(write_update)})
+            except sqlite3.IntegrityError:
+                st.error("Another stock entry already has this medicine name and batch number.")
+                return
             
-            conn.commit()
-            conn.close()
+            run_expiry_sweep(int(medicine['pharmacy_id']))
             
             st.success("Medicine stock updated!")
             st.rerun()
         
         if delete:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            def write_delete(cursor):
+                cursor.execute('SELECT quantity FROM medicine_stock WHERE id=?', (int(medicine['id']),))
+                old_quantity = cursor.fetchone()['quantity']
+                record_stock_movement(cursor, int(medicine['id']), "Adjustment", -old_quantity, note="Batch deleted")
+                
+                cursor.execute('DELETE FROM medicine_stock WHERE id=?', (medicine['id'],))
             
-            cursor.execute('DELETE FROM medicine_stock WHERE id=?', (medicine['id'],))
+            run_write(write_delete)
             
-            conn.commit()
-            conn.close()
+            run_expiry_sweep(int(medicine['pharmacy_id']))
             
             st.success("Medicine deleted from stock!")
             st.rerun()
 
+@profile_section
 def patient_orders_dashboard(pharmacy_id):
     """Patient orders management"""
     st.subheader("📦 Patient Orders Management")
     
-    # Get orders for this pharmacy
-    conn = get_db_connection()
-    orders_data = pd.read_sql_query('''
-        SELECT o.*, u.full_name as patient_name, u.phone as patient_phone
-        FROM orders o
-        JOIN patients p ON o.patient_id = p.id
-        JOIN users u ON p.user_id = u.id
-        WHERE o.pharmacy_id = ?
-        ORDER BY o.order_date DESC
-    ''', conn, params=(pharmacy_id,))
-    
-    if not orders_data.empty:
+    # Order counts come from the per-pharmacy counters, not from the order list
+    stats = get_order_statistics(pharmacy_id)
+    
+    if stats['total_orders'] > 0:
         # Filter by status
-        status_filter = st.selectbox("Filter by Status", ["All", "Pending", "Confirmed", "Delivered", "Cancelled"])
+        status_filter = st.selectbox("Filter by Status", ["All"] + ORDER_STATUSES)
+        status = None if status_filter == "All" else status_filter
         
-        if status_filter != "All":
-            filtered_orders = orders_data[orders_data['status'] == status_filter]
-        else:
-            filtered_orders = orders_data
+        matching_orders = stats['total_orders'] if status is None else stats['status_counts'][status]
+        page_size = 25
+        total_pages = max(1, (matching_orders + page_size - 1) // page_size)
+        
+        # Switching filters can leave the saved page out of range
+        page = min(st.session_state.get("orders_page", 1), total_pages)
+        st.session_state.orders_page = page
+        
+        filtered_orders = get_pharmacy_orders(pharmacy_id, status, page, page_size)
+        
+        # Result of the last bulk action, kept across the rerun it triggered
+        bulk_result = st.session_state.pop("bulk_order_result", None)
+        if bulk_result:
+            updated_count, failures = bulk_result
+            if updated_count:
+                st.success(f"Updated {updated_count} orders.")
+            for failure in failures[:20]:
+                st.error(failure)
+            if len(failures) > 20:
+                st.error(f"...and {len(failures) - 20} more orders could not be updated.")
         
         if not filtered_orders.empty:
-            # Display orders
-            for index, order in filtered_orders.iterrows():
-                with st.container():
-                    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
-                    
-                    with col1:
-                        st.write(f"**Order #{order['id']}**")
-                        st.write(f"Patient: {order['patient_name']}")
-                        if order['patient_phone']:
-                            st.write(f"Phone: {order['patient_phone']}")
-                        st.write(f"Medicine: {order['medicine_name']}")
-                    
-                    with col2:
-                        st.write(f"Quantity: {order['quantity']}")
-                        if order['total_amount']:
-                            st.write(f"Amount: ₹{order['total_amount']:.2f}")
-                        st.write(f"Order Date: {order['order_date'][:10]}")
-                    
-                    with col3:
-                        current_status = order['status']
-                        st.write(f"Status: **{current_status}**")
-                        
-                        if order['delivery_date']:
-                            st.write(f"Delivered: {order['delivery_date'][:10]}")
-                    
-                    with col4:
-                        if current_status == "Pending":
-                            if st.button("Confirm", key=f"confirm_{order['id']}"):
-                                update_order_status(order['id'], "Confirmed")
-                                st.rerun()
-                        
-                        elif current_status == "Confirmed":
-                            if st.button("Deliver", key=f"deliver_{order['id']}"):
-                                update_order_status(order['id'], "Delivered", datetime.now())
-                                st.rerun()
-                        
-                        if current_status in ["Pending", "Confirmed"]:
-                            if st.button("Cancel", key=f"cancel_{order['id']}"):
-                                update_order_status(order['id'], "Cancelled")
-                                st.rerun()
-                    
-                    st.divider()
+            # Display orders; status changes apply to the selected rows in one transaction
+            filtered_orders['order_day'] = filtered_orders['order_date'].str[:10]
+            filtered_orders['delivery_day'] = filtered_orders['delivery_date'].str[:10]
+            
+            selected = list_table(
+                filtered_orders, "pharmacy_orders",
+                ['id', 'patient_name', 'patient_phone', 'medicine_name', 'quantity', 'total_amount', 'order_day',
+                 'status', 'delivery_day'],
+                column_config={
+                    'id': st.column_config.NumberColumn("Order #", format="#%d"),
+                    'patient_name': "Patient",
+                    'patient_phone': "Phone",
+                    'medicine_name': "Medicine",
+                    'quantity': "Quantity",
+                    'total_amount': st.column_config.NumberColumn("Amount", format="₹%.2f"),
+                    'order_day': "Order Date",
+                    'status': "Status",
+                    'delivery_day': "Delivered",
+                },
+                selection_mode="multi-row"
+            )
+
+            def apply_status(new_status):
+                def handler(orders):
+                    updated_ids, failures = bulk_update_order_status(pharmacy_id, orders['id'].tolist(), new_status)
+                    st.session_state.bulk_order_result = (len(updated_ids), failures)
+                    st.rerun()
+                return handler
+            
+            selection_actions(selected, "pharmacy_orders", [
+                ("Confirm", lambda rows: rows['status'] == "Pending", apply_status("Confirmed")),
+                ("Deliver", lambda rows: rows['status'] == "Confirmed", apply_status("Delivered")),
+                ("Cancel", lambda rows: rows['status'].isin(["Pending", "Confirmed"]), apply_status("Cancelled")),
+            ])
+            
+            bulk_order_actions(pharmacy_id, status, matching_orders)
+            
+            # Pagination controls
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                st.number_input("Page", min_value=1, max_value=total_pages, key="orders_page")
+            with col2:
+                st.write(f"Showing page {page} of {total_pages} ({matching_orders} orders)")
         else:
             st.info(f"No {status_filter.lower()} orders found.")
-    else:
-        st.info("No orders received yet.")
-    
-    # Order statistics
-    if not orders_data.empty:
+        
+        # Order statistics
         st.subheader("📊 Order Statistics")
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_orders = len(orders_data)
-            st.metric("Total Orders", total_orders)
+            st.metric("Total Orders", stats['total_orders'])
         
         with col2:
-            pending_orders = len(orders_data[orders_data['status'] == 'Pending'])
-            st.metric("Pending Orders", pending_orders)
+            st.metric("Pending Orders", stats['status_counts']['Pending'])
         
         with col3:
-            delivered_orders = len(orders_data[orders_data['status'] == 'Delivered'])
-            st.metric("Delivered Orders", delivered_orders)
+            st.metric("Delivered Orders", stats['status_counts']['Delivered'])
         
         with col4:
-            total_revenue = orders_data[orders_data['status'] == 'Delivered']['total_amount'].sum()
-            st.metric("Total Revenue", f"₹{total_revenue:.2f}")
+            st.metric("Total Revenue", f"₹{stats['total_revenue']:.2f}")
+    else:
+        st.info("No orders received yet.")
+
+@profile_section
+def bulk_order_actions(pharmacy_id, status, matching_orders):
+    """Confirm, deliver or cancel every order matching the filter (across all pages) in a single transaction"""
+    filter_label = "orders" if status is None else f"{status.lower()} orders"
     
-    conn.close()
+    with st.expander(f"Apply to all {matching_orders} {filter_label}"):
+        with st.form("bulk_order_actions"):
+            action = st.selectbox("Action", ["Confirm", "Deliver", "Cancel"])
+            submit = st.form_submit_button("Apply to All Matching Orders", type="primary")
+            
+            if submit:
+                new_status = {"Confirm": "Confirmed", "Deliver": "Delivered", "Cancel": "Cancelled"}[action]
+                updated_ids, failures = bulk_update_order_status(pharmacy_id, get_order_ids(pharmacy_id, status), new_status)
+                
+                st.session_state.bulk_order_result = (len(updated_ids), failures)
+                st.rerun()
 
-def update_order_status(order_id, new_status, delivery_date=None):
-    """Update order status"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if delivery_date:
-        cursor.execute('''
-            UPDATE orders 
-            SET status=?, delivery_date=?
-            WHERE id=?
-        ''', (new_status, delivery_date, order_id))
+@profile_section
+def reorder_suggestions_dashboard(pharmacy_id):
+    """Reorder suggestions from forecast demand and current stock"""
+    st.subheader("📈 Reorder Suggestions")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        method = st.selectbox("Forecast Method", FORECAST_METHODS)
+    with col2:
+        lead_time_days = st.number_input("Supplier Lead Time (days)", min_value=0, max_value=60, value=3)
+    with col3:
+        safety_days = st.number_input("Safety Stock (days)", min_value=0, max_value=60, value=3)
+    with col4:
+        review_days = st.number_input("Order Cover (days)", min_value=1, max_value=120, value=14)
+    
+    suggestions = get_reorder_suggestions(pharmacy_id, method, lead_time_days, safety_days, review_days)
+    
+    if not suggestions.empty:
+        st.write(f"{len(suggestions)} medicines are running low based on the last {HISTORY_DAYS} days of orders.")
+        st.dataframe(suggestions, hide_index=True, width="stretch")
+        st.download_button(
+            "Download Reorder List",
+            suggestions.to_csv(index=False),
+            file_name="reorder_suggestions.csv",
+            mime="text/csv"
+        )
     else:
-        cursor.execute('''
-            UPDATE orders 
-            SET status=?
-            WHERE id=?
-        ''', (new_status, order_id))
+        st.info("No reorders needed. Stock covers forecast demand for every ordered medicine.")
+
+@profile_section
+def sales_reports_dashboard(pharmacy_id):
+    """Revenue and units-by-medicine reports from the sales rollups"""
+    st.subheader("💰 Sales Reports")
     
-    conn.commit()
-    conn.close()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        period_label = st.selectbox("Report Period", list(REPORT_PERIODS.keys()))
+    with col2:
+        start_date = st.date_input("From", value=datetime.now().date() - timedelta(days=90), key="report_start")
+    with col3:
+        end_date = st.date_input("To", value=datetime.now().date(), key="report_end")
+    
+    # Weekly and monthly reports include every period that starts within the range
+    period = REPORT_PERIODS[period_label]
+    if period == "week":
+        start_date = start_date - timedelta(days=start_date.weekday())
+    elif period == "month":
+        start_date = start_date.replace(day=1)
+    
+    revenue = get_revenue_report(pharmacy_id, period, start_date, end_date)
+    
+    if revenue.empty:
+        st.info("No delivered orders in this date range.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Revenue", f"₹{revenue['revenue'].sum():.2f}")
+    with col2:
+        st.metric("Delivered Orders", int(revenue['orders'].sum()))
+    with col3:
+        st.metric("Units Sold", int(revenue['units'].sum()))
+    
+    st.bar_chart(revenue, x='period_start', y='revenue')
+    st.dataframe(revenue, hide_index=True, width="stretch")
+    st.download_button(
+        "Download Revenue Report",
+        revenue.to_csv(index=False),
+        file_name=f"revenue_{period_label.lower()}_{start_date}_{end_date}.csv",
+        mime="text/csv"
+    )
+    
+    st.write("**Sales by Medicine**")
+    medicine_sales = get_medicine_sales_report(pharmacy_id, period, start_date, end_date)
+    st.dataframe(medicine_sales, hide_index=True, width="stretch")
+    st.download_button(
+        "Download Medicine Sales",
+        medicine_sales.to_csv(index=False),
+        file_name=f"medicine_sales_{start_date}_{end_date}.csv",
+        mime="text/csv"
+    )
 
+@profile_section
 def pharmacy_profile_settings():
     """Pharmacy profile settings"""
     st.subheader("⚙️ Profile Settings")
@@ -298,48 +591,52 @@ def pharmacy_profile_settings():
     conn = get_db_connection()
     
     # Get current pharmacy info
-    pharmacy_info = pd.read_sql_query('''
-        SELECT u.*, ph.*
+    pharmacy = fetch_record(conn, '''
+        SELECT u.full_name, u.email, u.phone, ph.pharmacy_name, ph.license_number, ph.address,
+               ph.latitude, ph.longitude
         FROM users u
         JOIN pharmacies ph ON u.id = ph.user_id
         WHERE u.id = ?
-    ''', conn, params=(st.session_state.user_id,))
+    ''', (st.session_state.user_id,))
+    conn.close()
     
-    if not pharmacy_info.empty:
-        pharmacy = pharmacy_info.iloc[0]
-        
+    if pharmacy:
         with st.form("pharmacy_profile"):
             col1, col2 = st.columns(2)
             
             with col1:
-                full_name = st.text_input("Contact Person Name", value=pharmacy['full_name'])
-                email = st.text_input("Email", value=pharmacy['email'])
-                phone = st.text_input("Phone", value=pharmacy['phone'] or "")
-                pharmacy_name = st.text_input("Pharmacy Name", value=pharmacy['pharmacy_name'])
+                full_name = st.text_input("Contact Person Name", value=pharmacy.full_name)
+                email = st.text_input("Email", value=pharmacy.email)
+                phone = st.text_input("Phone", value=pharmacy.phone or "")
+                pharmacy_name = st.text_input("Pharmacy Name", value=pharmacy.pharmacy_name)
             
             with col2:
-                license_number = st.text_input("License Number", value=pharmacy['license_number'])
-                address = st.text_area("Pharmacy Address", value=pharmacy['address'])
+                license_number = st.text_input("License Number", value=pharmacy.license_number)
+                address = st.text_area("Pharmacy Address", value=pharmacy.address)
+                latitude = st.number_input("Latitude", min_value=-90.0, max_value=90.0, format="%.6f",
+                                           value=None if pharmacy.latitude is None else float(pharmacy.latitude))
+                longitude = st.number_input("Longitude", min_value=-180.0, max_value=180.0, format="%.6f",
+                                            value=None if pharmacy.longitude is None else float(pharmacy.longitude))
             
             submit = st.form_submit_button("Update Profile", type="primary")
             
             if submit:
-                cursor = conn.cursor()
-                
-                # Update users table
-                cursor.execute('''
-                    UPDATE users SET full_name=?, email=?, phone=? WHERE id=?
-                ''', (full_name, email, phone, st.session_state.user_id))
+                # Session state is read here; the write itself runs on the writer thread
+                user_id = st.session_state.user_id
                 
-                # Update pharmacies table
-                cursor.execute('''
-                    UPDATE pharmacies 
-                    SET pharmacy_name=?, license_number=?, address=?
-                    WHERE user_id=?
-                ''', (pharmacy_name, license_number, address, st.session_state.user_id))
+                def write_profile(cursor):
+                    # Update users table
+                    cursor.execute('''
+                        UPDATE users SET full_name=?, email=?, phone=? WHERE id=?
+                    ''', (full_name, email, phone, user_id))
+                    
+                    # Update pharmacies table
+                    cursor.execute('''
+                        UPDATE pharmacies 
+                        SET pharmacy_name=?, license_number=?, address=?, latitude=?, longitude=?
+                        WHERE user_id=?
+                    ''', (pharmacy_name, license_number, address, latitude, longitude, user_id))
                 
-                conn.commit()
+                run_write(write_profile)
                 st.success("Profile updated successfully!")
                 st.rerun()
-    
-    conn.close()
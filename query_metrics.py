@@ -0,0 +1,295 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+# Set PILLSCARE_QUERY_METRICS=1 to trace queries from startup (admins can also switch it on at runtime)
+enabled = os.getenv("PILLSCARE_QUERY_METRICS") == "1"
+
+# Prometheus text file written for a node_exporter textfile collector (or any scraper that reads files)
+METRICS_PATH = os.getenv("PILLSCARE_METRICS_PATH", "query_metrics.prom")
+
+# Comma-separated usernames allowed to see the query metrics panel
+ADMIN_USERS = {name.strip() for name in os.getenv("PILLSCARE_ADMIN_USERS", "").split(",") if name.strip()}
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_SECONDS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+ROW_BUCKETS = [0, 1, 10, 100, 1000, 10000, 100000]
+
+# Statement text kept in metric labels
+STATEMENT_LABEL_LENGTH = 120
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+_statements = {}
+_sqlite_statements = {}
+
+# Per-thread hook told the elapsed time of every traced statement (the render profiler uses it to time SQL)
+_thread_state = threading.local()
+
+class _Histogram:
+    """Counts per bucket plus a running sum, in Prometheus histogram form"""
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (the last bound if it overflows)"""
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.bounds[-1]
+
+class _StatementStats:
+    __slots__ = ("latency", "rows")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS_SECONDS)
+        self.rows = _Histogram(ROW_BUCKETS)
+
+def normalize_statement(sql):
+    """Collapse whitespace so the same query always gets the same label"""
+    return re.sub(r"\s+", " ", sql).strip()[:STATEMENT_LABEL_LENGTH]
+
+def _caller():
+    """Return 'module.function' for the nearest app frame outside this module (pandas and sqlite frames are skipped)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != __file__:
+            module = os.path.splitext(os.path.relpath(filename, APP_DIR))[0].replace(os.sep, ".")
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+def _record(caller, statement, elapsed, rows):
+    with _lock:
+        stats = _statements.get((caller, statement))
+        if stats is None:
+            stats = _statements[(caller, statement)] = _StatementStats()
+        stats.latency.observe(elapsed)
+        stats.rows.observe(rows)
+
+def _trace(sql):
+    """sqlite3 trace callback: counts every statement SQLite runs, including implicit BEGIN/COMMIT and trigger steps"""
+    # Statements SQLite runs internally (virtual table upkeep, trigger programs) are traced with a leading '--'
+    words = sql.split(None, 1)
+    kind = "NESTED" if sql.startswith("--") else words[0].upper() if words else "EMPTY"
+    with _lock:
+        _sqlite_statements[kind] = _sqlite_statements.get(kind, 0) + 1
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute until its rows are consumed or the cursor moves on"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def _begin(self, sql):
+        self._finish()
+        self._pending = [_caller(), normalize_statement(sql), time.perf_counter(), 0]
+
+    def _finish(self):
+        if self._pending is not None:
+            caller, statement, started, rows = self._pending
+            self._pending = None
+            elapsed = time.perf_counter() - started
+            if enabled:
+                _record(caller, statement, elapsed, rows)
+            hook = getattr(_thread_state, 'statement_hook', None)
+            if hook is not None:
+                hook(elapsed)
+
+    def _count(self, rows, exhausted):
+        if self._pending is not None:
+            self._pending[3] += rows
+            if exhausted:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql)
+        super().execute(sql, parameters)
+        if self.description is None:
+            # Writes and DDL return no rows, so they are complete once executed
+            self._count(max(self.rowcount, 0), True)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql)
+        super().executemany(sql, seq_of_parameters)
+        self._count(max(self.rowcount, 0), True)
+        return self
+
+    def executescript(self, sql_script):
+        self._begin(sql_script)
+        super().executescript(sql_script)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count(row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count(len(rows), len(rows) < (self.arraysize if size is None else size))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows), True)
+        return rows
+
+    def __next__(self):
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        self._count(1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including the execute shortcuts) record query metrics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+        self.set_trace_callback(_trace)
+
+    def cursor(self, factory=TracedCursor):
+        cursor = super().cursor(factory)
+        if isinstance(cursor, TracedCursor):
+            self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        # Statements whose rows were never fully read are recorded when the connection closes
+        for cursor in list(self._cursors):
+            cursor._finish()
+        super().close()
+
+def connect(path):
+    """Open a connection that records query metrics"""
+    return sqlite3.connect(path, factory=TracedConnection)
+
+def tracing():
+    """Whether new connections should be traced: metrics are enabled or this thread has a statement hook"""
+    return enabled or getattr(_thread_state, 'statement_hook', None) is not None
+
+def set_statement_hook(hook):
+    """Call hook(elapsed seconds) for each traced statement finished on this thread; None removes it"""
+    _thread_state.statement_hook = hook
+
+def set_enabled(value):
+    """Switch query tracing on or off for connections opened from now on"""
+    global enabled
+    enabled = bool(value)
+
+def is_admin(username):
+    """Whether a user may see the query metrics"""
+    return username in ADMIN_USERS
+
+def reset_metrics():
+    """Forget everything recorded so far"""
+    with _lock:
+        _statements.clear()
+        _sqlite_statements.clear()
+
+def get_statement_metrics():
+    """Return one dict per (caller, statement) with call count, latency and row summaries, slowest total first"""
+    with _lock:
+        metrics = [{
+            'caller': caller,
+            'statement': statement,
+            'calls': stats.latency.count,
+            'total_ms': round(stats.latency.total * 1000, 2),
+            'mean_ms': round(stats.latency.total / stats.latency.count * 1000, 3),
+            'p50_ms': stats.latency.quantile(0.5) * 1000,
+            'p95_ms': stats.latency.quantile(0.95) * 1000,
+            'rows': stats.rows.total,
+            'mean_rows': round(stats.rows.total / stats.rows.count, 1),
+        } for (caller, statement), stats in _statements.items()]
+    
+    return sorted(metrics, key=lambda metric: metric['total_ms'], reverse=True)
+
+def get_sqlite_statement_counts():
+    """Return {statement kind: count} for everything SQLite ran, as seen by the trace callback"""
+    with _lock:
+        return dict(_sqlite_statements)
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", " ").replace('"', '\\"')
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.total}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+def prometheus_text():
+    """Render the recorded metrics in the Prometheus text exposition format"""
+    latency_lines = [
+        "# HELP pillscare_query_duration_seconds Time from execute until the statement's rows were consumed.",
+        "# TYPE pillscare_query_duration_seconds histogram",
+    ]
+    row_lines = [
+        "# HELP pillscare_query_rows Rows returned (or changed, for writes) per statement.",
+        "# TYPE pillscare_query_rows histogram",
+    ]
+    count_lines = [
+        "# HELP pillscare_sqlite_statements_total Statements run by SQLite, including transactions and trigger steps.",
+        "# TYPE pillscare_sqlite_statements_total counter",
+    ]
+    
+    with _lock:
+        for (caller, statement), stats in sorted(_statements.items()):
+            labels = f'caller="{_label(caller)}",statement="{_label(statement)}"'
+            latency_lines.extend(_histogram_lines("pillscare_query_duration_seconds", labels, stats.latency))
+            row_lines.extend(_histogram_lines("pillscare_query_rows", labels, stats.rows))
+        for kind, count in sorted(_sqlite_statements.items()):
+            count_lines.append(f'pillscare_sqlite_statements_total{{kind="{_label(kind)}"}} {count}')
+    
+    return "\n".join(latency_lines + row_lines + count_lines) + "\n"
+
+def write_prometheus_file(path=None):
+    """Write the metrics file atomically so a scraper never reads half of it; returns the path"""
+    path = path or METRICS_PATH
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(temp_path, path)
+    return path
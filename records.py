@@ -0,0 +1,32 @@
+from collections import namedtuple
+from functools import lru_cache
+import pandas as pd
+
+@lru_cache(maxsize=256)
+def record_type(columns):
+    """Return the row class for a tuple of column names (one namedtuple class per distinct query shape)"""
+    return namedtuple("Record", columns)
+
+def _execute(conn, sql, params):
+    # Plain tuples from the cursor; the connection's sqlite3.Row factory would build a second object per row
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    return cursor, record_type(tuple(column[0] for column in cursor.description))
+
+def fetch_records(conn, sql, params=()):
+    """Run a query and return its rows as namedtuples with one attribute per column"""
+    cursor, record = _execute(conn, sql, params)
+    return list(map(record._make, cursor.fetchall()))
+
+def fetch_record(conn, sql, params=()):
+    """Run a query and return its first row as a namedtuple, or None"""
+    cursor, record = _execute(conn, sql, params)
+    row = cursor.fetchone()
+    return record._make(row) if row is not None else None
+
+def records_frame(records):
+    """Build a DataFrame from records for tabular display or analytics (empty frame for no records)"""
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame.from_records(records, columns=records[0]._fields)
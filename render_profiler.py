@@ -0,0 +1,187 @@
+import cProfile
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import query_metrics
+
+# Set PILLSCARE_PROFILE=1 to profile every rerun from startup (admins can also switch it on at runtime)
+enabled = os.getenv("PILLSCARE_PROFILE") == "1"
+
+# Set PILLSCARE_PROFILE_CPROFILE=1 to also save a cProfile of each profiled rerun under PROFILE_DIR
+capture_cprofile = os.getenv("PILLSCARE_PROFILE_CPROFILE") == "1"
+PROFILE_DIR = os.getenv("PILLSCARE_PROFILE_DIR", "profiles")
+
+# Slowest reruns remembered per role
+SLOWEST_RERUNS_KEPT = 10
+
+# Width in characters of the longest bar in the flame view
+FLAME_WIDTH = 40
+
+_lock = threading.Lock()
+_slowest = {}
+_sequence = itertools.count()
+
+# Each Streamlit session reruns its script on its own thread, so the open sections are per thread
+_thread_state = threading.local()
+
+class Section:
+    """Time spent in one named part of a rerun, the SQL time spent directly in it, and its nested sections"""
+    __slots__ = ("name", "total", "sql", "calls", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0.0
+        self.sql = 0.0
+        self.calls = 0
+        self.children = {}
+
+    def child(self, name):
+        """Return the nested section with this name; repeated calls (e.g. once per row) share one entry"""
+        section = self.children.get(name)
+        if section is None:
+            section = self.children[name] = Section(name)
+        return section
+
+    def self_time(self):
+        return self.total - sum(child.total for child in self.children.values())
+
+class RerunProfile:
+    """One profiled rerun of the app"""
+    __slots__ = ("role", "started_at", "root", "cprofile_path")
+
+    def __init__(self, role):
+        self.role = role
+        self.started_at = datetime.now()
+        self.root = Section("rerun")
+        self.cprofile_path = None
+
+def _add_sql_time(elapsed):
+    stack = getattr(_thread_state, 'stack', None)
+    if stack:
+        stack[-1].sql += elapsed
+
+def _start_cprofile():
+    """Start a cProfile for this rerun, or return None if another profiler is already running"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows only one active profiler per process
+        return None
+    return profiler
+
+def _keep(rerun):
+    """Remember a rerun if it is among the slowest seen for its role"""
+    with _lock:
+        heap = _slowest.setdefault(rerun.role, [])
+        entry = (rerun.root.total, next(_sequence), rerun)
+        if len(heap) < SLOWEST_RERUNS_KEPT:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+@contextmanager
+def profile_rerun(role):
+    """Profile one rerun of the app (does nothing unless profiling is enabled)"""
+    if not enabled:
+        yield None
+        return
+    
+    rerun = RerunProfile(role or "Anonymous")
+    _thread_state.stack = [rerun.root]
+    query_metrics.set_statement_hook(_add_sql_time)
+    profiler = _start_cprofile() if capture_cprofile else None
+    started = time.perf_counter()
+    
+    try:
+        yield rerun
+    finally:
+        # st.rerun() and st.stop() end a rerun by raising, so the rerun is recorded either way
+        rerun.root.total = time.perf_counter() - started
+        rerun.root.calls = 1
+        _thread_state.stack = None
+        query_metrics.set_statement_hook(None)
+        
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            rerun.cprofile_path = os.path.join(
+                PROFILE_DIR, f"{rerun.started_at:%Y%m%d-%H%M%S-%f}-{rerun.role.lower()}.prof"
+            )
+            profiler.dump_stats(rerun.cprofile_path)
+        
+        _keep(rerun)
+
+@contextmanager
+def section(name):
+    """Time a block as a named section of the current rerun"""
+    stack = getattr(_thread_state, 'stack', None)
+    if not stack:
+        yield
+        return
+    
+    current = stack[-1].child(name)
+    stack.append(current)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.total += time.perf_counter() - started
+        current.calls += 1
+        stack.pop()
+
+def profile_section(func):
+    """Decorator that times a dashboard function as a section of the current rerun"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not getattr(_thread_state, 'stack', None):
+            return func(*args, **kwargs)
+        with section(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def set_enabled(value):
+    """Switch rerun profiling on or off for every session"""
+    global enabled
+    enabled = bool(value)
+
+def set_capture_cprofile(value):
+    """Switch saving a cProfile of each profiled rerun on or off"""
+    global capture_cprofile
+    capture_cprofile = bool(value)
+
+def get_profiled_roles():
+    """Return the roles that have profiled reruns"""
+    with _lock:
+        return sorted(_slowest)
+
+def get_slowest_reruns(role):
+    """Return the slowest profiled reruns for a role, slowest first"""
+    with _lock:
+        return [rerun for _, _, rerun in sorted(_slowest.get(role, []), reverse=True)]
+
+def reset_profiles():
+    """Forget every profiled rerun"""
+    with _lock:
+        _slowest.clear()
+
+def flame_lines(rerun):
+    """Render a rerun's sections as an indented text flame graph, slowest children first"""
+    total = rerun.root.total or 1e-9
+    lines = []
+
+    def visit(current, depth):
+        bar = "█" * max(1, round(current.total / total * FLAME_WIDTH))
+        calls = f" ×{current.calls}" if current.calls > 1 else ""
+        lines.append(f"{current.total * 1000:8.1f}ms  self {current.self_time() * 1000:7.1f}ms  "
+                     f"sql {current.sql * 1000:7.1f}ms  {'  ' * depth}{bar} {current.name}{calls}")
+        for child in sorted(current.children.values(), key=lambda child: child.total, reverse=True):
+            visit(child, depth + 1)
+    
+    visit(rerun.root, 0)
+    return lines
@@ -0,0 +1,53 @@
+import pandas as pd
+from database import get_db_connection
+
+# UI label -> sales_rollups period
+REPORT_PERIODS = {"Daily": "day", "Weekly": "week", "Monthly": "month"}
+
+def get_revenue_report(pharmacy_id, period="day", start_date=None, end_date=None):
+    """Revenue, orders and units per period between two dates, read from the sales rollups"""
+    query = '''
+        SELECT period_start, SUM(order_count) AS orders, SUM(units) AS units, SUM(revenue) AS revenue
+        FROM sales_rollups
+        WHERE pharmacy_id = ? AND period = ?
+    '''
+    params = [pharmacy_id, period]
+    query, params = _add_date_range(query, params, start_date, end_date)
+    query += " GROUP BY period_start ORDER BY period_start"
+    
+    conn = get_db_connection()
+    report = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return report
+
+def get_medicine_sales_report(pharmacy_id, period="month", start_date=None, end_date=None):
+    """Units and revenue per medicine between two dates, read from the sales rollups.
+    
+    Monthly rollups are the cheapest to scan; pass period="day" when the range
+    does not line up with whole months.
+    """
+    query = '''
+        SELECT medicine_name, SUM(order_count) AS orders, SUM(units) AS units, SUM(revenue) AS revenue
+        FROM sales_rollups
+        WHERE pharmacy_id = ? AND period = ?
+    '''
+    params = [pharmacy_id, period]
+    query, params = _add_date_range(query, params, start_date, end_date)
+    query += " GROUP BY medicine_name ORDER BY revenue DESC"
+    
+    conn = get_db_connection()
+    report = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return report
+
+def _add_date_range(query, params, start_date, end_date):
+    """Restrict a rollup query to periods starting within [start_date, end_date]"""
+    if start_date:
+        query += " AND period_start >= ?"
+        params.append(str(start_date))
+    if end_date:
+        query += " AND period_start <= ?"
+        params.append(str(end_date))
+    return query, params
@@ -0,0 +1,182 @@
+import pandas as pd
+from datetime import timezone
+from database import get_db_connection
+from write_queue import run_write
+
+MOVEMENT_TYPES = ["Receipt", "Sale", "Return", "Adjustment", "Expiry"]
+
+# Days between full stock snapshots; point-in-time queries replay at most this much ledger
+SNAPSHOT_INTERVAL_DAYS = 7
+
+# Movement for a stock row identified by id (the row must still exist)
+MOVEMENT_BY_ID_SQL = '''
+    INSERT INTO stock_movements
+    (stock_id, pharmacy_id, medicine_name, batch_number, movement_type, quantity_change, order_id, note)
+    SELECT id, pharmacy_id, medicine_name, batch_number, ?, ?, ?, ?
+    FROM medicine_stock
+    WHERE id = ?
+'''
+
+# Movement for a stock row identified by its (pharmacy, medicine, batch) key
+MOVEMENT_BY_BATCH_SQL = '''
+    INSERT INTO stock_movements
+    (stock_id, pharmacy_id, medicine_name, batch_number, movement_type, quantity_change, note)
+    SELECT id, pharmacy_id, medicine_name, batch_number, ?, ?, ?
+    FROM medicine_stock
+    WHERE pharmacy_id = ? AND medicine_name = ? AND batch_number = ?
+'''
+
+def record_stock_movement(cursor, stock_id, movement_type, quantity_change, order_id=None, note=None):
+    """Append one movement to the ledger (call in the same transaction as the quantity change)"""
+    if quantity_change:
+        cursor.execute(MOVEMENT_BY_ID_SQL, (movement_type, quantity_change, order_id, note, stock_id))
+
+def record_batch_receipts(cursor, stock_rows, note=None):
+    """Append receipt movements for upserted stock rows (pharmacy_id, medicine_name, manufacturer,
+    batch_number, expiry_date, quantity, price, ...)"""
+    cursor.executemany(MOVEMENT_BY_BATCH_SQL, [
+        ("Receipt", row[5], note, row[0], row[1], row[3]) for row in stock_rows
+    ])
+
+def _to_db_timestamp(as_of):
+    """Convert a local datetime to the UTC text format used by CURRENT_TIMESTAMP"""
+    return as_of.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def take_stock_snapshot(conn):
+    """Snapshot every batch's on-hand quantity from the previous snapshot plus newer movements"""
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id, last_movement_id FROM stock_snapshot_runs ORDER BY id DESC LIMIT 1')
+    previous_run = cursor.fetchone()
+    previous_run_id = previous_run['id'] if previous_run else 0
+    previous_watermark = previous_run['last_movement_id'] if previous_run else 0
+    
+    cursor.execute('SELECT COALESCE(MAX(id), 0) AS last_id FROM stock_movements')
+    watermark = cursor.fetchone()['last_id']
+    
+    cursor.execute('INSERT INTO stock_snapshot_runs (last_movement_id) VALUES (?)', (watermark,))
+    run_id = cursor.lastrowid
+    
+    cursor.execute('''
+        INSERT INTO stock_snapshots (run_id, stock_id, pharmacy_id, quantity)
+        SELECT ?, stock_id, MAX(pharmacy_id), SUM(quantity)
+        FROM (
+            SELECT stock_id, pharmacy_id, quantity
+            FROM stock_snapshots
+            WHERE run_id = ?
+            UNION ALL
+            SELECT stock_id, pharmacy_id, quantity_change
+            FROM stock_movements
+            WHERE id > ? AND id <= ?
+        )
+        GROUP BY stock_id
+        HAVING SUM(quantity) != 0
+    ''', (run_id, previous_run_id, previous_watermark, watermark))
+    
+    return run_id
+
+def take_stock_snapshot_if_due(conn):
+    """Take a stock snapshot if the last one is older than SNAPSHOT_INTERVAL_DAYS"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT 1 FROM stock_snapshot_runs
+        WHERE taken_at > DATETIME('now', ?)
+        LIMIT 1
+    ''', (f"-{SNAPSHOT_INTERVAL_DAYS} days",))
+    
+    if cursor.fetchone() is None:
+        take_stock_snapshot(conn)
+
+def get_stock_on_hand_at(pharmacy_id, as_of):
+    """Return each batch's on-hand quantity at a past moment (local datetime).
+    
+    Starts from the latest snapshot taken before as_of and replays only the
+    movements recorded after it. The replay stops at the next snapshot's watermark,
+    so the work is bounded by one snapshot interval however old as_of is.
+    """
+    as_of_text = _to_db_timestamp(as_of)
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, last_movement_id FROM stock_snapshot_runs
+        WHERE taken_at <= ?
+        ORDER BY id DESC LIMIT 1
+    ''', (as_of_text,))
+    run = cursor.fetchone()
+    run_id = run['id'] if run else 0
+    watermark = run['last_movement_id'] if run else 0
+    
+    # Movements after as_of end at the next snapshot (or at the newest movement if there is none yet)
+    cursor.execute('''
+        SELECT last_movement_id FROM stock_snapshot_runs
+        WHERE taken_at > ?
+        ORDER BY id LIMIT 1
+    ''', (as_of_text,))
+    next_run = cursor.fetchone()
+    if next_run:
+        end_watermark = next_run['last_movement_id']
+    else:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) AS last_id FROM stock_movements')
+        end_watermark = cursor.fetchone()['last_id']
+    
+    on_hand = pd.read_sql_query('''
+        SELECT balance.stock_id, SUM(balance.quantity) AS quantity,
+               (SELECT m.medicine_name FROM stock_movements m
+                WHERE m.stock_id = balance.stock_id ORDER BY m.id DESC LIMIT 1) AS medicine_name,
+               (SELECT m.batch_number FROM stock_movements m
+                WHERE m.stock_id = balance.stock_id ORDER BY m.id DESC LIMIT 1) AS batch_number
+        FROM (
+            SELECT stock_id, quantity
+            FROM stock_snapshots
+            WHERE run_id = ? AND pharmacy_id = ?
+            UNION ALL
+            SELECT stock_id, quantity_change
+            FROM stock_movements
+            WHERE pharmacy_id = ? AND id > ? AND id <= ? AND created_at <= ?
+        ) balance
+        GROUP BY balance.stock_id
+        HAVING SUM(balance.quantity) != 0
+        ORDER BY medicine_name, batch_number
+    ''', conn, params=(run_id, pharmacy_id, pharmacy_id, watermark, end_watermark, as_of_text))
+    
+    conn.close()
+    
+    return on_hand
+
+def get_stock_movements(pharmacy_id, stock_id=None, limit=100):
+    """Return the most recent ledger movements for a pharmacy or a single batch"""
+    conn = get_db_connection()
+    
+    if stock_id is not None:
+        query = 'SELECT * FROM stock_movements WHERE stock_id = ? ORDER BY id DESC LIMIT ?'
+        params = (stock_id, limit)
+    else:
+        query = 'SELECT * FROM stock_movements WHERE pharmacy_id = ? ORDER BY id DESC LIMIT ?'
+        params = (pharmacy_id, limit)
+    
+    movements = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return movements
+
+def write_off_expired_stock(pharmacy_id):
+    """Zero the quantity of expired batches, recording an Expiry movement for each"""
+    def write(cursor):
+        cursor.execute('''
+            SELECT id, quantity FROM medicine_stock
+            WHERE pharmacy_id = ? AND expiry_date < DATE('now', 'localtime') AND quantity > 0
+        ''', (pharmacy_id,))
+        expired = cursor.fetchall()
+        
+        for batch in expired:
+            record_stock_movement(cursor, batch['id'], "Expiry", -batch['quantity'], note="Expired stock written off")
+        
+        cursor.executemany('''
+            UPDATE medicine_stock SET quantity = 0, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [(batch['id'],) for batch in expired])
+        
+        return len(expired)
+    
+    return run_write(write)
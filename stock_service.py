@@ -0,0 +1,417 @@
+import codecs
+import csv
+import io
+import re
+import pandas as pd
+from datetime import date
+from database import get_db_connection
+from stock_ledger import record_batch_receipts
+from medicine_catalogue import resolve_medicine_id, resolve_medicine_ids, suggest_medicine_matches
+from data_cache import versioned_cache
+from write_queue import run_write
+
+# Columns the stock list can be sorted by (UI label -> SQL expression)
+STOCK_SORT_COLUMNS = {
+    "Last Updated": "ms.updated_at",
+    "Medicine Name": "ms.medicine_name COLLATE NOCASE",
+    "Expiry Date": "ms.expiry_date",
+    "Quantity": "ms.quantity",
+    "Price": "ms.price",
+}
+
+def build_fts_query(search_term):
+    """Turn free text into an FTS5 prefix query, e.g. 'para 500' -> '"para"* "500"*'"""
+    tokens = re.findall(r"\w+", search_term or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def _stock_filter(pharmacy_id, search_term):
+    """Build the FROM/WHERE clause and parameters for a stock query"""
+    fts_query = build_fts_query(search_term)
+    
+    if fts_query:
+        clause = '''
+            FROM medicine_stock ms
+            JOIN medicine_stock_fts fts ON fts.rowid = ms.id
+            WHERE medicine_stock_fts MATCH ? AND ms.pharmacy_id = ?
+        '''
+        return clause, [fts_query, pharmacy_id]
+    
+    clause = '''
+        FROM medicine_stock ms
+        WHERE ms.pharmacy_id = ?
+    '''
+    return clause, [pharmacy_id]
+
+@versioned_cache("stock", owner="pharmacy_id")
+def search_medicine_stock(pharmacy_id, search_term="", sort_by="Last Updated", descending=True,
+                          page=1, page_size=25):
+    """Return one page of a pharmacy's stock and the total number of matching rows"""
+    clause, params = _stock_filter(pharmacy_id, search_term)
+    order_column = STOCK_SORT_COLUMNS.get(sort_by, STOCK_SORT_COLUMNS["Last Updated"])
+    direction = "DESC" if descending else "ASC"
+    offset = (max(page, 1) - 1) * page_size
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f'SELECT COUNT(*) AS total {clause}', params)
+    total = cursor.fetchone()['total']
+    
+    stock_page = pd.read_sql_query(f'''
+        SELECT ms.* {clause}
+        ORDER BY {order_column} {direction}, ms.id {direction}
+        LIMIT ? OFFSET ?
+    ''', conn, params=params + [page_size, offset])
+    
+    conn.close()
+    
+    return stock_page, total
+
+@versioned_cache("stock", owner="pharmacy_id", daily=True)
+def get_stock_summary(pharmacy_id):
+    """Aggregate counts for a pharmacy's stock, computed in a single query"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT COUNT(*) AS total_items,
+               COALESCE(SUM(quantity), 0) AS total_units,
+               COALESCE(SUM(quantity * price), 0) AS stock_value,
+               COUNT(CASE WHEN expiry_date < DATE('now', 'localtime') THEN 1 END) AS expired_items
+        FROM medicine_stock
+        WHERE pharmacy_id = ?
+    ''', (pharmacy_id,))
+    
+    summary = dict(cursor.fetchone())
+    conn.close()
+    
+    return summary
+
+# Expiry thresholds (days) used by the dashboard and the daily expiry sweep
+EXPIRY_CRITICAL_DAYS = 30
+EXPIRY_WARNING_DAYS = 90
+
+@versioned_cache("stock", owner="pharmacy_id", daily=True)
+def get_expiring_stock(pharmacy_id, within_days=EXPIRY_CRITICAL_DAYS, include_expired=True):
+    """Return in-stock batches expiring within N days, using the (pharmacy_id, expiry_date) index"""
+    conn = get_db_connection()
+    
+    query = '''
+        SELECT ms.*,
+               CAST(julianday(ms.expiry_date) - julianday(DATE('now', 'localtime')) AS INTEGER) AS days_to_expiry
+        FROM medicine_stock ms
+        WHERE ms.pharmacy_id = ? AND ms.expiry_date <= DATE('now', 'localtime', ?) AND ms.quantity > 0
+    '''
+    params = [pharmacy_id, f"+{int(within_days)} days"]
+    
+    if not include_expired:
+        query += " AND ms.expiry_date >= DATE('now', 'localtime')"
+    
+    query += " ORDER BY ms.expiry_date"
+    
+    expiring = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return expiring
+
+def run_expiry_sweep(pharmacy_id=None, conn=None):
+    """Materialize expiry alerts for one pharmacy, or for all pharmacies when pharmacy_id is None.
+    
+    Runs on the given connection (the caller commits), otherwise as a write job.
+    """
+    if conn is None:
+        return run_write(sweep_expiry_alerts, pharmacy_id)
+    return sweep_expiry_alerts(conn.cursor(), pharmacy_id)
+
+def sweep_expiry_alerts(cursor, pharmacy_id):
+    """Rebuild expiry alerts for one pharmacy (all when pharmacy_id is None) in an open write transaction"""
+    where = ""
+    params = [EXPIRY_CRITICAL_DAYS, f"+{EXPIRY_WARNING_DAYS} days"]
+    if pharmacy_id is not None:
+        where = "AND ms.pharmacy_id = ?"
+        params.append(pharmacy_id)
+        cursor.execute('DELETE FROM expiry_alerts WHERE pharmacy_id = ?', (pharmacy_id,))
+    else:
+        cursor.execute('DELETE FROM expiry_alerts')
+    
+    cursor.execute(f'''
+        INSERT INTO expiry_alerts
+        (pharmacy_id, stock_id, medicine_name, batch_number, expiry_date, quantity,
+         days_to_expiry, alert_level, sweep_date)
+        SELECT pharmacy_id, id, medicine_name, batch_number, expiry_date, quantity, days_to_expiry,
+               CASE WHEN days_to_expiry < 0 THEN 'Expired'
+                    WHEN days_to_expiry < ? THEN 'Critical'
+                    ELSE 'Warning' END,
+               DATE('now', 'localtime')
+        FROM (
+            SELECT ms.*,
+                   CAST(julianday(ms.expiry_date) - julianday(DATE('now', 'localtime')) AS INTEGER) AS days_to_expiry
+            FROM medicine_stock ms
+            WHERE ms.expiry_date < DATE('now', 'localtime', ?) AND ms.quantity > 0 {where}
+        )
+    ''', params)
+    
+    return cursor.rowcount
+
+def get_expiry_alert_counts(pharmacy_id):
+    """Return the number of materialized expiry alerts per level for a pharmacy"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT alert_level, COUNT(*) AS alert_count
+        FROM expiry_alerts
+        WHERE pharmacy_id = ?
+        GROUP BY alert_level
+    ''', (pharmacy_id,))
+    
+    counts = {"Expired": 0, "Critical": 0, "Warning": 0}
+    for row in cursor.fetchall():
+        counts[row['alert_level']] = row['alert_count']
+    
+    conn.close()
+    
+    return counts
+
+def get_expiry_alerts(pharmacy_id, alert_level=None):
+    """Return materialized expiry alerts for a pharmacy, soonest expiry first"""
+    conn = get_db_connection()
+    
+    query = 'SELECT * FROM expiry_alerts WHERE pharmacy_id = ?'
+    params = [pharmacy_id]
+    
+    if alert_level:
+        query += ' AND alert_level = ?'
+        params.append(alert_level)
+    
+    query += ' ORDER BY expiry_date'
+    
+    alerts = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    
+    return alerts
+
+# Receiving an existing batch adds to its quantity and refreshes its details; callers reject
+# rows whose expiry date differs from the stocked batch, so it is never overwritten here
+UPSERT_STOCK_SQL = '''
+    INSERT INTO medicine_stock
+    (pharmacy_id, medicine_name, manufacturer, batch_number, expiry_date, quantity, price, medicine_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (pharmacy_id, medicine_name, batch_number) DO UPDATE SET
+        manufacturer = COALESCE(NULLIF(excluded.manufacturer, ''), manufacturer),
+        medicine_id = COALESCE(excluded.medicine_id, medicine_id),
+        quantity = quantity + excluded.quantity,
+        price = excluded.price,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+STOCK_CSV_COLUMNS = ["medicine_name", "manufacturer", "batch_number", "expiry_date", "quantity", "price"]
+STOCK_CSV_REQUIRED = ["medicine_name", "expiry_date", "quantity", "price"]
+
+# Rows written per transaction, and the most row errors kept for display
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 500
+
+def upsert_stock(pharmacy_id, medicine_name, manufacturer, batch_number, expiry_date, quantity, price):
+    """Add a single batch to stock, merging with an existing batch of the same medicine.
+    
+    Returns suggest_medicine_matches for the name, so a new spelling of a catalogue
+    medicine can be offered to the pharmacist for confirmation. Raises ValueError
+    if the batch is already in stock with a different expiry date.
+    """
+    def write(cursor):
+        stock_row = (
+            pharmacy_id, medicine_name.strip(), manufacturer, (batch_number or "").strip(),
+            expiry_date, quantity, price
+        )
+        conflicts = _expiry_conflicts(cursor, [stock_row])
+        if conflicts:
+            raise ValueError(_expiry_conflict_message(stock_row, conflicts[0]))
+        
+        suggestions = suggest_medicine_matches(cursor, medicine_name)
+        stock_row += (resolve_medicine_id(cursor, medicine_name),)
+        cursor.execute(UPSERT_STOCK_SQL, stock_row)
+        record_batch_receipts(cursor, [stock_row])
+        return suggestions
+    
+    return run_write(write)
+
+def parse_stock_row(pharmacy_id, row):
+    """Validate one CSV row and return the upsert parameters; raises ValueError on bad data"""
+    missing = [column for column in STOCK_CSV_REQUIRED if not (row.get(column) or "").strip()]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    
+    # date.fromisoformat is much faster than strptime; the length check keeps it to YYYY-MM-DD
+    expiry_text = row['expiry_date'].strip()
+    try:
+        if len(expiry_text) != 10:
+            raise ValueError
+        expiry_date = date.fromisoformat(expiry_text).isoformat()
+    except ValueError:
+        raise ValueError(f"invalid expiry_date '{row['expiry_date']}' (expected YYYY-MM-DD)")
+    
+    try:
+        quantity = int(row['quantity'])
+    except ValueError:
+        raise ValueError(f"invalid quantity '{row['quantity']}'")
+    
+    try:
+        price = float(row['price'])
+    except ValueError:
+        raise ValueError(f"invalid price '{row['price']}'")
+    
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    if price <= 0:
+        raise ValueError("price must be positive")
+    
+    return (
+        pharmacy_id,
+        row['medicine_name'].strip(),
+        (row.get('manufacturer') or "").strip(),
+        (row.get('batch_number') or "").strip(),
+        expiry_date,
+        quantity,
+        price
+    )
+
+def _expiry_conflicts(cursor, stock_rows):
+    """Return {row index: stocked expiry date} for rows whose batch already has a different expiry date.
+    
+    A batch earlier in stock_rows counts as stocked, so one file cannot give a batch two dates.
+    """
+    pharmacy_id = stock_rows[0][0]
+    names = sorted(set(row[1] for row in stock_rows))
+    cursor.execute(f'''
+        SELECT medicine_name, batch_number, expiry_date FROM medicine_stock
+        WHERE pharmacy_id = ? AND medicine_name IN ({", ".join("?" * len(names))})
+    ''', [pharmacy_id] + names)
+    expiry_dates = {(row['medicine_name'], row['batch_number']): row['expiry_date'] for row in cursor.fetchall()}
+    
+    conflicts = {}
+    for index, row in enumerate(stock_rows):
+        expiry_date = str(row[4])
+        stocked_expiry = expiry_dates.setdefault((row[1], row[3]), expiry_date)
+        if stocked_expiry != expiry_date:
+            conflicts[index] = stocked_expiry
+    return conflicts
+
+def _expiry_conflict_message(stock_row, stocked_expiry):
+    """Explain why a row was not merged into the batch already in stock"""
+    if stock_row[3]:
+        return f"batch {stock_row[3]} of {stock_row[1]} is already in stock with expiry date {stocked_expiry}"
+    return (f"{stock_row[1]} without a batch number is already in stock with expiry date {stocked_expiry}; "
+            "give this delivery a batch number")
+
+def _write_stock_chunk(cursor, chunk, line_numbers):
+    """Upsert parsed stock rows, linking each distinct medicine name to the catalogue once.
+    
+    Rows whose batch is already stocked with a different expiry date are skipped. Returns
+    ({name: suggestions} for new names that look like a catalogue entry, [(line, message)]
+    for the skipped rows).
+    """
+    conflicts = _expiry_conflicts(cursor, chunk)
+    rejected = [(line_numbers[index], _expiry_conflict_message(chunk[index], stocked_expiry))
+                for index, stocked_expiry in conflicts.items()]
+    chunk = [row for index, row in enumerate(chunk) if index not in conflicts]
+    if not chunk:
+        return {}, rejected
+    
+    names = set(row[1] for row in chunk)
+    suggestions = {name: suggest_medicine_matches(cursor, name) for name in names}
+    medicine_ids = resolve_medicine_ids(cursor, names)
+    cursor.executemany(UPSERT_STOCK_SQL, [row + (medicine_ids[row[1]],) for row in chunk])
+    record_batch_receipts(cursor, chunk, note="CSV import")
+    return {name: matches for name, matches in suggestions.items() if matches}, rejected
+
+def _decoded_lines(binary_file):
+    """Decode a binary file one line at a time, so a bad byte is reported on its own line"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for line in binary_file:
+        text = decoder.decode(line)
+        # A line cut off mid-character leaves nothing to yield until the final check
+        if text:
+            yield text
+    decoder.decode(b"", final=True)
+
+def _unreadable_file_message(error):
+    """Describe a decoding or CSV syntax error that stops an import from reading further"""
+    if isinstance(error, UnicodeDecodeError):
+        return "this line is not UTF-8 text; save the file as CSV UTF-8 and import the remaining rows"
+    return f"malformed CSV ({error}); the remaining rows were not read"
+
+def import_stock_csv(pharmacy_id, csv_file, chunk_size=IMPORT_CHUNK_SIZE):
+    """Stream a stock CSV into medicine_stock, upserting one chunk per write job.
+    
+    csv_file may be a binary (UTF-8) or text file object; rows are read one at a time so
+    memory stays flat regardless of file size. Rows for a batch already in stock
+    with a different expiry date are rejected. Returns a summary dict with the
+    number of rows read, imported and rejected, (line, message) errors and
+    {name: suggestions} for new medicine names that look like catalogue entries.
+    A file that cannot be decoded or parsed stops the import at that line; rows
+    read before it are kept and the problem is reported as an error.
+    """
+    if isinstance(csv_file, io.TextIOBase):
+        reader = csv.DictReader(csv_file)
+    else:
+        reader = csv.DictReader(_decoded_lines(csv_file))
+    summary = {'rows_read': 0, 'imported': 0, 'rejected': 0, 'errors': [], 'suggestions': {}}
+    
+    chunk = []
+    line_numbers = []
+    
+    def write_chunk():
+        suggestions, rejected = run_write(_write_stock_chunk, chunk, line_numbers)
+        summary['suggestions'].update(suggestions)
+        summary['imported'] += len(chunk) - len(rejected)
+        summary['rejected'] += len(rejected)
+        summary['errors'].extend(rejected[:max(0, MAX_REPORTED_ERRORS - len(summary['errors']))])
+    
+    try:
+        header = [(column or "").strip().lower() for column in (reader.fieldnames or [])]
+    except (UnicodeDecodeError, csv.Error) as e:
+        summary['errors'].append((1, _unreadable_file_message(e)))
+        return summary
+    
+    missing_columns = [column for column in STOCK_CSV_REQUIRED if column not in header]
+    if missing_columns:
+        summary['errors'].append((1, f"missing required columns: {', '.join(missing_columns)}"))
+        return summary
+    reader.fieldnames = header
+    
+    try:
+        for row in reader:
+            summary['rows_read'] += 1
+            # line_num counts physical lines, so quoted fields spanning several lines do not shift
+            # later rows; a multi-line row is reported at its last line
+            line_number = reader.line_num
+            
+            try:
+                chunk.append(parse_stock_row(pharmacy_id, row))
+                line_numbers.append(line_number)
+            except ValueError as e:
+                summary['rejected'] += 1
+                if len(summary['errors']) < MAX_REPORTED_ERRORS:
+                    summary['errors'].append((line_number, str(e)))
+                continue
+            
+            if len(chunk) >= chunk_size:
+                write_chunk()
+                chunk = []
+                line_numbers = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Earlier chunks are already committed, so keep them and the rows read since,
+        # and report where reading stopped instead of failing the whole import
+        summary['errors'].append((reader.line_num + 1, _unreadable_file_message(e)))
+    
+    if chunk:
+        write_chunk()
+    
+    
+    run_expiry_sweep(pharmacy_id)
+    
+    # Expiry conflicts are found per chunk, after that chunk's parse errors
+    summary['errors'].sort()
+    
+    return summary
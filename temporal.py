@@ -0,0 +1,67 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+
+# Illness recency buckets (days since the illness)
+RECENT_DAYS = 30
+MODERATE_DAYS = 90
+RECENCY_LABELS = ["🔴 Recent", "🟠 Moderate", "🟢 Long ago"]
+
+def _today(today=None):
+    return pd.Timestamp(today or date.today())
+
+def to_dates(values):
+    """Parse a column of YYYY-MM-DD strings in one pass; blanks and bad values become NaT"""
+    return pd.to_datetime(pd.Series(values), format='%Y-%m-%d', errors='coerce')
+
+def calculate_age(birth_date, today=None):
+    """Calculate age from birth date"""
+    if isinstance(birth_date, str):
+        birth_date = date.fromisoformat(birth_date[:10])
+    
+    today = today or date.today()
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+def ages(birth_dates, today=None):
+    """Age in whole years for a column of birth dates (missing dates give <NA>)"""
+    today = _today(today)
+    births = to_dates(birth_dates)
+    
+    # One year less for anyone whose birthday is still to come this year
+    before_birthday = (births.dt.month > today.month) | ((births.dt.month == today.month) & (births.dt.day > today.day))
+    return (today.year - births.dt.year - before_birthday).astype('Int64')
+
+def days_since(dates, today=None):
+    """Whole days from each date to today (negative for future dates)"""
+    return (_today(today) - to_dates(dates)).dt.days.astype('Int64')
+
+def days_until(dates, today=None):
+    """Whole days from today to each date (negative once the date has passed)"""
+    return (to_dates(dates) - _today(today)).dt.days.astype('Int64')
+
+def _bucket(days, edges, labels):
+    """Label each day count by the first edge it falls below; missing counts get an empty label"""
+    days = pd.Series(days).astype('float64')
+    return pd.Series(
+        np.select([days < edge for edge in edges], labels[:len(edges)], default=labels[-1]),
+        index=days.index
+    ).where(days.notna(), "")
+
+def recency_labels(days_since_values):
+    """Recent / moderate / long-ago label for each day count since an event"""
+    return _bucket(days_since_values, [RECENT_DAYS, MODERATE_DAYS], RECENCY_LABELS)
+
+def expiry_labels(days_to_expiry, critical_days, warning_days):
+    """Expired / critical / warning / OK label for each day count until expiry"""
+    labels = ["🔴 Expired", f"🟠 Under {critical_days} days", f"🔵 Under {warning_days} days", "🟢 OK"]
+    return _bucket(days_to_expiry, [0, critical_days, warning_days], labels)
+
+def running_today(start_dates, end_dates, today=None):
+    """Whether today falls between each start date and its (optional) end date.
+    
+    ISO dates sort as strings, so this compares the stored text without parsing it.
+    """
+    day = _today(today).date().isoformat()
+    starts = pd.Series(start_dates).fillna("").astype(str)
+    ends = pd.Series(end_dates).fillna("").astype(str)
+    return (starts != "") & (starts <= day) & ((ends == "") | (ends >= day))
@@ -0,0 +1,218 @@
+import atexit
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+import database
+
+# Set PILLSCARE_WRITE_QUEUE=0 to run every write on its own connection instead of the writer thread
+enabled = os.getenv("PILLSCARE_WRITE_QUEUE", "1") != "0"
+
+# Writes queued while a transaction is open join the next one, up to this many per commit;
+# the writer can also wait a little for more writes before it begins (milliseconds, default 0)
+GROUP_COMMIT_MAX = 64
+GROUP_COMMIT_WINDOW = float(os.getenv("PILLSCARE_GROUP_COMMIT_MS", "0")) / 1000
+
+# Cross-process lock strategy: wait a short while inside SQLite, then back off with jitter and retry,
+# so writers in other server processes and background jobs get a turn instead of all waiting on one lock
+BUSY_TIMEOUT_MS = 250
+BUSY_RETRIES = 20
+BUSY_BACKOFF_MAX = 0.5
+
+# Errors that mean another connection holds the write lock
+BUSY_ERRORS = ("database is locked", "database table is locked", "database is busy")
+
+_lock = threading.Lock()
+_writer = None
+
+class WriteJob:
+    """A write submitted to the writer thread: func(cursor, *args, **kwargs) and the future for its result"""
+    __slots__ = ("func", "args", "kwargs", "future")
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+class WriterThread(threading.Thread):
+    """Serializes one process's writes on a single connection and commits them in groups"""
+
+    def __init__(self, db_path):
+        super().__init__(name="pillscare-writer", daemon=True)
+        self.db_path = db_path
+        self.jobs = queue.Queue()
+        self.stats = {'jobs': 0, 'commits': 0, 'busy_retries': 0, 'failed': 0, 'largest_group': 0}
+
+    def submit(self, func, args, kwargs):
+        job = WriteJob(func, args, kwargs)
+        self.jobs.put(job)
+        return job.future
+
+    def stop(self):
+        """Finish the queued writes and stop the thread"""
+        self.jobs.put(None)
+        self.join()
+
+    def run(self):
+        conn = database.get_db_connection()
+        # Transactions are begun explicitly, so the module's implicit BEGIN must stay out of the way
+        conn.isolation_level = None
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        
+        try:
+            while True:
+                group = self._next_group()
+                if not group:
+                    return
+                self._commit_group(conn, [job for job in group if job is not None])
+                if None in group:
+                    return
+        finally:
+            conn.close()
+
+    def _next_group(self):
+        """Block for one job, then take whatever else is queued (None means stop)"""
+        group = [self.jobs.get()]
+        deadline = time.monotonic() + GROUP_COMMIT_WINDOW
+        
+        while len(group) < GROUP_COMMIT_MAX and group[-1] is not None:
+            try:
+                group.append(self.jobs.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        
+        return group
+
+    def _commit_group(self, conn, group):
+        """Run a group of jobs in one transaction, each under its own savepoint, and settle their futures"""
+        for attempt in range(BUSY_RETRIES + 1):
+            outcomes = []
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                for job in group:
+                    conn.execute('SAVEPOINT write_job')
+                    try:
+                        outcomes.append((True, job.func(conn.cursor(), *job.args, **job.kwargs)))
+                    except Exception as e:
+                        # A failed job only undoes its own changes; the rest of the group still commits
+                        conn.execute('ROLLBACK TO write_job')
+                        outcomes.append((False, e))
+                    conn.execute('RELEASE write_job')
+                conn.execute('COMMIT')
+                break
+            
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if not is_busy_error(e) or attempt == BUSY_RETRIES:
+                    # The whole group was rolled back, so every job fails with the same error
+                    outcomes = [(False, e)] * len(group)
+                    break
+                self.stats['busy_retries'] += 1
+                backoff(attempt)
+        
+        self.stats['jobs'] += len(group)
+        self.stats['commits'] += 1
+        self.stats['largest_group'] = max(self.stats['largest_group'], len(group))
+        
+        for job, (succeeded, value) in zip(group, outcomes):
+            if succeeded:
+                job.future.set_result(value)
+            else:
+                self.stats['failed'] += 1
+                job.future.set_exception(value)
+
+def is_busy_error(error):
+    return isinstance(error, sqlite3.OperationalError) and any(text in str(error).lower() for text in BUSY_ERRORS)
+
+def backoff(attempt):
+    """Sleep for a jittered, exponentially growing interval before retrying a busy write"""
+    time.sleep(random.uniform(0, min(BUSY_BACKOFF_MAX, 0.005 * 2 ** attempt)))
+
+def _get_writer():
+    """Return this process's writer thread, starting it (or restarting it if DB_PATH changed)"""
+    global _writer
+    with _lock:
+        if _writer is not None and _writer.db_path != database.DB_PATH:
+            _writer.stop()
+            _writer = None
+        if _writer is None:
+            _writer = WriterThread(database.DB_PATH)
+            _writer.start()
+        return _writer
+
+def _run_directly(func, args, kwargs):
+    """Run one write in its own transaction on a new connection, retrying while the database is busy"""
+    conn = database.get_db_connection()
+    conn.isolation_level = None
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    
+    try:
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                result = func(conn.cursor(), *args, **kwargs)
+                conn.execute('COMMIT')
+                return result
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if not is_busy_error(e) or attempt == BUSY_RETRIES:
+                    raise
+                backoff(attempt)
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+    finally:
+        conn.close()
+
+def submit_write(func, *args, **kwargs):
+    """Queue func(cursor, *args, **kwargs) to run in a write transaction; returns a Future for its result.
+    
+    func runs on the writer thread under its own savepoint, so an exception rolls back
+    only its changes and is raised again by future.result(). It must not commit or
+    roll back itself; use a nested SAVEPOINT to undo part of its work.
+    """
+    if not enabled:
+        future = Future()
+        try:
+            future.set_result(_run_directly(func, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    writer = _get_writer()
+    if threading.current_thread() is writer:
+        # A job that writes again would wait on itself
+        raise RuntimeError("submit_write cannot be called from inside a write job")
+    return writer.submit(func, args, kwargs)
+
+def run_write(func, *args, **kwargs):
+    """Run func(cursor, *args, **kwargs) in a write transaction and return its result"""
+    return submit_write(func, *args, **kwargs).result()
+
+def log_write_error(future):
+    """Done-callback for submit_write futures nobody waits on, so a failed write is not lost silently"""
+    error = future.exception()
+    if error is not None:
+        print(f"Error in queued write: {error!r}")
+
+def get_writer_stats():
+    """Return job, commit and retry counters for this process's writer thread"""
+    with _lock:
+        return dict(_writer.stats) if _writer is not None else {}
+
+def shutdown():
+    """Commit any queued writes and stop the writer thread"""
+    global _writer
+    with _lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+atexit.register(shutdown)